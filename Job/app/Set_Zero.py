@@ -1,82 +1,46 @@
 import subprocess
-from google.cloud import firestore
+import walrus_cli
+from pipeline import Pipeline
+from showcase import update_showcase_reference
 
 def set_zero(showcase_obj_id, showcase_blob_id):
     showcase_site_id = "0x8ea2941b08cad8b5b667fab8cffc26d4fc8bdaa00366e9d2e0dd233f46ee84bc"
-    try:
+    pipeline = Pipeline("set_zero")
+
+    # ทุกขั้นต้องเรียงกัน: burn-blobs --all ต้องไม่ burn blob ที่ store ใหม่
+    @pipeline.step("update_site")
+    async def update_site():
         try:
-            update_result = subprocess.run(
-                ["site-builder", "update", "IVORY-SHOWCASE", showcase_site_id, "--epochs", "2"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if update_result.returncode == 0:
-                print("Site updated successfully.")
-            else:
-                print(f"Error updating site: {update_result.stderr}")
+            await walrus_cli.update_site_async("IVORY-SHOWCASE", showcase_site_id, "2")
+            print("Site updated successfully.")
+        except subprocess.CalledProcessError as e:
+            print(f"Error updating site: {e.stderr}")
         except Exception as e:
             print(f"Exception while updating site:", e)
 
+    @pipeline.step("burn_blobs", requires=["update_site"])
+    async def burn_blobs():
         try:
-            burn_result = subprocess.run(
-                ["walrus", "burn-blobs", "--all"],
-                input="y\n", 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if burn_result.returncode == 0:
-                print(f"Burned blob succefully")
-            else:
-                print(f"Error burning blob fail")
-
+            await walrus_cli.burn_blobs_async()
+            print(f"Burned blob succefully")
+        except subprocess.CalledProcessError:
+            print(f"Error burning blob fail")
         except Exception as e:
             print(f"Exception while burning blob:", e)
 
+    @pipeline.step("store", requires=["burn_blobs"])
+    def store():
         # Store the zipped file in Walrus
-        result = subprocess.run(
-            ["walrus", "store", "IVORY-SHOWCASE.zip", "--epochs", "2", "--deletable", "--force"],
-            check=True, capture_output=True, text=True
-        )
-            
-        stdout = result.stdout.strip()
-        new_showcase_blob_id = None
-        new_showcase_object_id = None
-
-        for line in stdout.splitlines():
-            if line.startswith("Blob ID:"):
-                new_showcase_blob_id = line.split(":", 1)[1].strip()
-            elif line.startswith("Sui object ID:"):
-                new_showcase_object_id = line.split(":", 1)[1].strip()
-
-        if not new_showcase_blob_id or not new_showcase_object_id:
-            raise RuntimeError("⚠️ ไม่พบค่า Blob ID หรือ Sui object ID จากผลลัพธ์ของคำสั่ง walrus store")
-
-        print(f"📦 new_showcase_blob_id: {new_showcase_blob_id}")
-        print(f"📦 new_showcase_object_id: {new_showcase_object_id}")
-
-        try:
-            db = firestore.Client()
-            doc_ref = db.collection("showcase-data").document("reference")
-            doc = doc_ref.get()
-
-            if doc.exists:
-               # ✅ อัปเดตค่าใหม่ที่ได้จาก STEP 7
-                doc_ref.update({
-                    "BlobID": new_showcase_blob_id,
-                    "ObjID": new_showcase_object_id
-                })
-
-                print("✅ STEP 8 DONE: Firestore document updated successfully.")
-                print(f"   🔁 Updated BlobID: {new_showcase_blob_id}")
-                print(f"   🔁 Updated ObjID: {new_showcase_object_id}")
-        except Exception as e:
-            raise RuntimeError(f"STEP 8 Error: {str(e)}")
-
-
-    except Exception as e:
-        print("Exception occurred:", e)
+        stored = walrus_cli.store_blob("IVORY-SHOWCASE.zip", "2")
+        print(f"📦 new_showcase_blob_id: {stored.blob_id}")
+        print(f"📦 new_showcase_object_id: {stored.object_id}")
+        return stored
+
+    @pipeline.step("update_reference", requires=["store"])
+    def update_reference():
+        # reset เขียนทับ reference เสมอ (ไม่เทียบกับ showcase เดิม)
+        stored = pipeline.results["store"]
+        update_showcase_reference(stored.blob_id, stored.object_id, "8")
+
+    if pipeline.run() is not None:
         return []
-    
-    
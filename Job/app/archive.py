@@ -0,0 +1,467 @@
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 1024 * 1024
+# local file header: signature ... filename length, extra length (30 bytes)
+LOCAL_HEADER_SIZE = 30
+# header id ของ extra field ZIP64
+ZIP64_EXTRA_ID = 0x0001
+# ไฟล์ที่ใหญ่กว่านี้จะถูกบีบอัดแบบ stream ตามลำดับ ไม่บีบอัดขนานในหน่วยความจำ
+IN_MEMORY_LIMIT = 16 * 1024 * 1024
+# ผลบีบอัดที่เก็บไว้ใช้ซ้ำกับไฟล์ที่เป็น hardlink กัน รวมไม่เกินค่านี้
+MAX_SHARED_BYTES = 64 * 1024 * 1024
+# ระดับการบีบอัด deflate (0-9, -1 = ค่าเริ่มต้นของ zlib) และจำนวน thread ที่ใช้บีบอัด
+COMPRESSION_LEVEL = int(os.environ.get("ZIP_COMPRESSION_LEVEL", "-1"))
+ZIP_WORKERS = int(os.environ.get("ZIP_WORKERS", "0")) or os.cpu_count() or 1
+# งบของการแตก zip ที่ผู้ใช้อัปโหลด (0 = ไม่จำกัด) เกินงบจะ fail ก่อนเขียนไฟล์ใดๆ
+EXTRACT_MAX_BYTES = int(os.environ.get("EXTRACT_MAX_BYTES", str(2 * 1024 ** 3)))
+EXTRACT_MAX_ENTRIES = int(os.environ.get("EXTRACT_MAX_ENTRIES", "100000"))
+# จำนวน thread ที่เขียนไฟล์ตอนแตก zip (ใช้เมื่อมีไฟล์มากพอ)
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+# ไฟล์ไม่ถึงนี้แตกทีละไฟล์ ไม่คุ้มเปิด thread
+PARALLEL_EXTRACT_MIN_FILES = 64
+# ไฟล์ที่บีบอัดมาแล้ว deflate ซ้ำไม่ได้อะไร จึงเก็บแบบ ZIP_STORED
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".mp3", ".mp4", ".m4a", ".webm", ".ogg",
+    ".zip", ".gz", ".br", ".zst", ".7z",
+}
+
+
+class ArchiveLimitError(ValueError):
+    # zip ใหญ่เกินหรือมี entry มากเกินงบ
+    pass
+
+
+class UnsafeArchiveError(ValueError):
+    # entry ที่ชี้ออกนอกโฟลเดอร์ปลายทาง (path traversal, absolute path)
+    pass
+
+
+def zip_name(rel_path):
+    return rel_path.replace(os.sep, "/")
+
+
+def under_prefix(name, prefixes):
+    return any(name == prefix or name.startswith(prefix.rstrip("/") + "/") for prefix in prefixes)
+
+
+def is_root_entry(name):
+    return "/" not in name.rstrip("/")
+
+
+def list_files(folder_path, skip_root=False):
+    # {ชื่อใน zip: path บน disk}
+    files = {}
+    for root, _, names in os.walk(folder_path):
+        if skip_root and root == folder_path:
+            continue
+        for file in names:
+            abs_path = os.path.join(root, file)
+            files[zip_name(os.path.relpath(abs_path, folder_path))] = abs_path
+    return files
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def is_unchanged(abs_path, info):
+    return os.path.getsize(abs_path) == info.file_size and file_crc32(abs_path) == info.CRC
+
+
+def is_reusable(name, abs_path, info, changed_prefixes):
+    # ไฟล์ใต้ changed_prefixes และไฟล์ระดับบนสุด (site-builder เขียนทับ) เทียบ CRC
+    # ไฟล์อื่นมาจากการแตก zip เดิม จึงเทียบแค่ขนาด ไม่อ่านเนื้อหา
+    if under_prefix(name, changed_prefixes) or is_root_entry(name):
+        return is_unchanged(abs_path, info)
+    return os.path.getsize(abs_path) == info.file_size
+
+
+def strip_zip64_extra(extra):
+    # ตัด extra field ZIP64 ออก (FileHeader จะเขียนใหม่เองถ้าต้องใช้) field อื่นคงไว้ตามเดิม
+    parts = []
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[offset:offset + 4])
+        end = offset + 4 + size
+        if header_id != ZIP64_EXTRA_ID:
+            parts.append(extra[offset:end])
+        offset = end
+    parts.append(extra[offset:])
+    return b"".join(parts)
+
+
+def compress_type_for(name):
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def compress_file(path, name, compress_type, level):
+    # บีบอัดทั้งไฟล์ในหน่วยความจำ (zlib ปล่อย GIL จึงรันขนานใน thread ได้) พร้อมคำนวณ CRC
+    compressor = None
+    if compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    parts = []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            parts.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        parts.append(compressor.flush())
+    data = b"".join(parts)
+
+    info = zipfile.ZipInfo.from_file(path, name)
+    info.compress_type = compress_type
+    info.file_size = size
+    info.compress_size = len(data)
+    info.CRC = crc
+    return info, data
+
+
+def read_raw_entry(src, info):
+    # อ่านข้อมูลที่บีบอัดแล้วของ entry ตรง ๆ โดยไม่ decompress
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(LOCAL_HEADER_SIZE)
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    src.fp.seek(info.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len)
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src.fp.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry {info.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def clone_info(info, name=None):
+    new_info = zipfile.ZipInfo(name or info.filename, info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    new_info.create_system = info.create_system
+    new_info.comment = info.comment
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+    # ขนาดรู้แล้ว จึงไม่ต้องมี data descriptor ต่อท้าย
+    new_info.flag_bits = info.flag_bits & ~0x08
+    new_info.extra = strip_zip64_extra(info.extra)
+    return new_info
+
+
+class ArchiveWriter:
+    # เขียน zip โดยใช้ข้อมูลที่บีบอัดแล้วซ้ำได้: entry จาก zip เดิม และไฟล์ที่เป็น hardlink กัน (inode เดียวกัน)
+    # จะถูกบีบอัดแค่ครั้งเดียว ไฟล์ใหม่ถูกบีบอัดขนานกันหลาย thread แต่เขียนลง zip ตามลำดับที่เพิ่มเข้ามาเสมอ
+
+    def __init__(self, zip_path, workers=ZIP_WORKERS, level=COMPRESSION_LEVEL, mode='w'):
+        self.zipf = zipfile.ZipFile(zip_path, mode, zipfile.ZIP_DEFLATED, compresslevel=level)
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        # งานเขียนที่รอตามลำดับ; จำกัดจำนวนที่บีบอัดล่วงหน้าไว้เพื่อคุมหน่วยความจำ
+        self.pending = deque()
+        self.window = max(1, workers) * 2
+        # (st_dev, st_ino) -> (zip ต้นทาง, info) หรือ (None, future ของผลบีบอัด)
+        self.by_inode = {}
+        self.shared_bytes = 0
+        self.stats = {"reused": 0, "compressed": 0, "stored": 0, "deduplicated": 0, "dropped": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.zipf.close()
+
+    def _enqueue(self, write):
+        self.pending.append(write)
+        while len(self.pending) > self.window:
+            self.pending.popleft()()
+
+    def flush(self):
+        while self.pending:
+            self.pending.popleft()()
+
+    def write_raw(self, info, chunks):
+        zipf = self.zipf
+        zip64 = max(info.file_size, info.compress_size) > zipfile.ZIP64_LIMIT
+
+        info.header_offset = zipf.fp.tell()
+        zipf.fp.write(info.FileHeader(zip64))
+        for chunk in chunks:
+            zipf.fp.write(chunk)
+
+        zipf.start_dir = zipf.fp.tell()
+        zipf.filelist.append(info)
+        zipf.NameToInfo[info.filename] = info
+        zipf._didModify = True
+
+    def _write_compressed(self, future, name):
+        info, data = future.result()
+        self.write_raw(clone_info(info, name), [data])
+
+    def copy_entry(self, src, info, name=None):
+        self._enqueue(lambda: self.write_raw(clone_info(info, name), read_raw_entry(src, info)))
+
+    def remember(self, abs_path, src, info):
+        # entry ที่คัดลอกจาก zip เดิม ใช้ซ้ำได้กับไฟล์อื่นที่ hardlink มาที่ inode เดียวกัน
+        st = os.stat(abs_path)
+        if st.st_nlink > 1:
+            self.by_inode[(st.st_dev, st.st_ino)] = (src, info)
+
+    def add_file(self, abs_path, name):
+        st = os.stat(abs_path)
+        key = (st.st_dev, st.st_ino)
+
+        if st.st_nlink > 1 and key in self.by_inode:
+            src, shared = self.by_inode[key]
+            if src is not None:
+                self.copy_entry(src, shared, name)
+            else:
+                self._enqueue(lambda: self._write_compressed(shared, name))
+            self.stats["deduplicated"] += 1
+            return
+
+        compress_type = compress_type_for(name)
+        self.stats["stored" if compress_type == zipfile.ZIP_STORED else "compressed"] += 1
+
+        if st.st_size > IN_MEMORY_LIMIT:
+            self._enqueue(lambda: self.zipf.write(abs_path, name, compress_type, self.level))
+            return
+
+        future = self.pool.submit(compress_file, abs_path, name, compress_type, self.level)
+        if st.st_nlink > 1 and self.shared_bytes + st.st_size <= MAX_SHARED_BYTES:
+            # ไฟล์นี้มีสำเนาอื่น: เก็บผลบีบอัดไว้ใช้ซ้ำ
+            self.by_inode[key] = (None, future)
+            self.shared_bytes += st.st_size
+        self._enqueue(lambda: self._write_compressed(future, name))
+
+
+def rewrite_archive(old_zip_path, folder_path, zip_path, changed_prefixes=(), skip_root=False):
+    # สร้าง zip ใหม่จาก folder_path โดยใช้ entry ที่บีบอัดแล้วจาก old_zip_path ซ้ำ
+    # เฉพาะไฟล์ใหม่และไฟล์ที่เปลี่ยน (ดู is_reusable) ที่ถูกบีบอัดใหม่ งานจึงแปรตามเว็บที่เปลี่ยน
+    # skip_root: ไม่ใส่ไฟล์ระดับบนสุด (เพิ่มทีหลังด้วย append_root_files)
+    files = list_files(folder_path, skip_root)
+
+    with zipfile.ZipFile(old_zip_path, 'r') as src, ArchiveWriter(zip_path) as writer:
+        # รอบแรกตัดสินว่า entry ไหนใช้ซ้ำได้ (เพื่อให้ไฟล์ใหม่ที่เป็น hardlink ของ entry เดิมใช้ซ้ำได้ทุกตัว)
+        plan = []
+        for info in src.infolist():
+            name = info.filename
+            if info.is_dir():
+                if os.path.isdir(os.path.join(folder_path, name)):
+                    plan.append((info, None))
+                continue
+            if skip_root and is_root_entry(name):
+                continue
+
+            abs_path = files.pop(name, None)
+            if abs_path is None:
+                writer.stats["dropped"] += 1
+            elif not is_reusable(name, abs_path, info, changed_prefixes):
+                plan.append((info, abs_path))
+            else:
+                writer.remember(abs_path, src, info)
+                plan.append((info, None))
+
+        for info, abs_path in plan:
+            if abs_path is None:
+                writer.copy_entry(src, info)
+                writer.stats["reused"] += 1
+            else:
+                writer.add_file(abs_path, info.filename)
+
+        for name in sorted(files):
+            writer.add_file(files[name], name)
+
+    return writer.stats
+
+
+def same_content(zip_path, other_zip_path):
+    # เทียบแค่ชื่อ, CRC และขนาดของทุก entry จาก central directory (ไม่สนเวลาแก้ไขไฟล์)
+    def entries(path):
+        with zipfile.ZipFile(path, 'r') as zipf:
+            return sorted((info.filename, info.CRC, info.file_size) for info in zipf.infolist())
+    return entries(zip_path) == entries(other_zip_path)
+
+
+def has_prefix(zip_path, prefix):
+    # อ่านแค่ central directory
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        return any(under_prefix(name, [prefix]) for name in zipf.namelist())
+
+
+def safe_path(root, name):
+    # root ต้องเป็น realpath แล้ว
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.isabs(name) or os.path.commonpath([root, path]) != root:
+        raise UnsafeArchiveError(f"Unsafe path in archive: {name}")
+    return path
+
+
+def check_budget(members, max_bytes, max_entries):
+    # เทียบกับขนาดที่ประกาศใน central directory ก่อนเขียนไฟล์ใดๆ
+    # (ZipExtFile อ่านไม่เกิน file_size ของ entry จึงเขียนจริงไม่เกินค่านี้)
+    if max_entries and len(members) > max_entries:
+        raise ArchiveLimitError(f"Archive has {len(members)} entries, limit is {max_entries}.")
+    total = sum(info.file_size for info in members)
+    if max_bytes and total > max_bytes:
+        raise ArchiveLimitError(f"Archive expands to {total} bytes, limit is {max_bytes}.")
+    return total
+
+
+def extract_files(zip_path, targets):
+    # แต่ละ thread เปิด zip ของตัวเอง และเขียนทีละ chunk (ไม่อ่านทั้งไฟล์เข้าหน่วยความจำ)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info, path in targets:
+            with zip_ref.open(info) as src, open(path, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+
+
+def extract_archive(zip_path, folder_path, skip_prefixes=(), max_bytes=EXTRACT_MAX_BYTES,
+                    max_entries=EXTRACT_MAX_ENTRIES):
+    # แทน ZipFile.extractall: ตรวจงบและ path ก่อน แล้วเขียนไฟล์ขนานกันเมื่อมีไฟล์จำนวนมาก
+    # คืนค่า {"entries", "bytes", "seconds"}
+    started = time.monotonic()
+    root = os.path.realpath(folder_path)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = [info for info in zip_ref.infolist()
+                   if not under_prefix(info.filename, skip_prefixes)]
+    total = check_budget(members, max_bytes, max_entries)
+
+    targets = []
+    directories = {root}
+    for info in members:
+        path = safe_path(root, info.filename)
+        if info.is_dir():
+            directories.add(path)
+        else:
+            directories.add(os.path.dirname(path))
+            targets.append((info, path))
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+
+    workers = min(EXTRACT_WORKERS, len(targets) // PARALLEL_EXTRACT_MIN_FILES + 1)
+    if workers <= 1:
+        extract_files(zip_path, targets)
+    else:
+        # แบ่งไฟล์แบบสลับกันให้แต่ละ thread ได้ขนาดใกล้กัน
+        batches = [targets[index::workers] for index in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(extract_files, zip_path, batch) for batch in batches]:
+                future.result()
+
+    return {"entries": len(targets), "bytes": total, "seconds": time.monotonic() - started}
+
+
+def describe_extract(stats):
+    mib = stats["bytes"] / (1024 * 1024)
+    rate = mib / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return f"{stats['entries']} files, {mib:.1f} MiB in {stats['seconds']:.2f}s ({rate:.1f} MiB/s)"
+
+
+def filter_archive(old_zip_path, zip_path, drop_prefixes=(), folder_path=None, skip_root=False):
+    # คัดลอกทุก entry จาก zip เดิมโดยไม่ decompress ยกเว้น entry ใต้ drop_prefixes
+    # ถ้ามี folder_path ไฟล์ระดับบนสุด (เช่น ws-resources.json ที่ site-builder เขียน) จะถูกเทียบและเขียนใหม่ถ้าเปลี่ยน
+    # skip_root: ไม่ใส่ไฟล์ระดับบนสุดเลย (เพิ่มทีหลังด้วย append_root_files)
+    root_files = {}
+    if folder_path and not skip_root:
+        for entry in os.scandir(folder_path):
+            if entry.is_file():
+                root_files[entry.name] = entry.path
+    with zipfile.ZipFile(old_zip_path, 'r') as src, ArchiveWriter(zip_path) as writer:
+        for info in src.infolist():
+            name = info.filename
+            if under_prefix(name, drop_prefixes):
+                writer.stats["dropped"] += 1
+                continue
+            if skip_root and not info.is_dir() and is_root_entry(name):
+                continue
+
+            abs_path = root_files.pop(name, None)
+            if abs_path is not None and not is_unchanged(abs_path, info):
+                writer.add_file(abs_path, name)
+            else:
+                writer.copy_entry(src, info)
+                writer.stats["reused"] += 1
+
+        for name in sorted(root_files):
+            writer.add_file(root_files[name], name)
+
+    return writer.stats
+
+
+def zip_folder(folder_path, zip_path, skip_root=False):
+    with ArchiveWriter(zip_path) as writer:
+        for root, _, files in os.walk(folder_path):
+            if skip_root and root == folder_path:
+                continue
+            for file in files:
+                abs_path = os.path.join(root, file)
+                rel_path = os.path.relpath(abs_path, folder_path)
+                writer.add_file(abs_path, rel_path)
+    return writer.stats
+
+
+def append_root_files(zip_path, folder_path, old_zip_path=None):
+    # ต่อท้ายไฟล์ระดับบนสุดของ folder_path ให้ zip ที่สร้างด้วย skip_root=True
+    # (ใช้ entry จาก zip เดิมซ้ำถ้าเนื้อหาไม่เปลี่ยน)
+    names = sorted(entry.name for entry in os.scandir(folder_path) if entry.is_file())
+    src = None
+    if old_zip_path and os.path.exists(old_zip_path):
+        try:
+            src = zipfile.ZipFile(old_zip_path, 'r')
+        except zipfile.BadZipFile as e:
+            print(f"⚠️ Cannot reuse {old_zip_path}:", str(e))
+
+    try:
+        with ArchiveWriter(zip_path, mode='a') as writer:
+            for name in names:
+                abs_path = os.path.join(folder_path, name)
+                info = src.NameToInfo.get(name) if src is not None else None
+                if info is not None and is_unchanged(abs_path, info):
+                    writer.copy_entry(src, info)
+                    writer.stats["reused"] += 1
+                else:
+                    writer.add_file(abs_path, name)
+    finally:
+        if src is not None:
+            src.close()
+    return writer.stats
+
+
+def build_archive(folder_path, zip_path, old_zip_path=None, changed_prefixes=(), skip_root=False):
+    # ใช้ zip เดิมซ้ำถ้ามี ไม่เช่นนั้นบีบอัดทั้งโฟลเดอร์
+    if old_zip_path and os.path.exists(old_zip_path):
+        try:
+            return rewrite_archive(old_zip_path, folder_path, zip_path, changed_prefixes, skip_root)
+        except zipfile.BadZipFile as e:
+            print(f"⚠️ Cannot reuse {old_zip_path}, zipping everything:", str(e))
+
+    return zip_folder(folder_path, zip_path, skip_root)
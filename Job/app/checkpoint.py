@@ -0,0 +1,99 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from clients import get_firestore_client
+
+# checkpoint ของ operation ที่ fail หลัง store showcase แล้ว: 'job-checkpoints/{key}'
+# เมื่อ Cloud Tasks retry งานเดิม จะทำต่อจากขั้นล่าสุดที่สำเร็จแทนการเริ่มใหม่ตั้งแต่ STEP 1
+CHECKPOINT_COLLECTION = "job-checkpoints"
+# checkpoint ที่เก่ากว่านี้ (วินาที) ไม่ถูกใช้ต่อ
+CHECKPOINT_TTL = int(os.environ.get("JOB_CHECKPOINT_TTL", "3600"))
+
+# checkpoint ที่ยังค้างอยู่ของ operation ปัจจุบัน (None = นอก operation)
+_open = ContextVar("open_checkpoints", default=None)
+
+
+class ResumableError(RuntimeError):
+    # operation fail แต่มี checkpoint ให้ทำต่อ: ส่ง error ออกไปเพื่อให้ Cloud Tasks retry
+    pass
+
+
+def checkpoint_key(operation, object_ids, document):
+    # operation เดียวกันกับ blob ชุดเดียวกันบน showcase (shard) เดียวกัน คือ checkpoint เดียวกัน
+    digest = hashlib.sha256(f"{operation}\n{document}\n".encode("utf-8"))
+    for object_id in object_ids:
+        digest.update(f"{object_id}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@contextmanager
+def scope():
+    # คืนค่ารายการ checkpoint ที่ยังไม่ถูกลบเมื่อ operation จบ
+    left = []
+    token = _open.set(left)
+    try:
+        yield left
+    finally:
+        _open.reset(token)
+
+
+class Checkpoint:
+    # results ของขั้นที่ประกาศ checkpoint=True และ state ของ operation (ต้องเป็นค่าที่ Firestore เก็บได้)
+    # state ถูกบันทึกพร้อมทุก checkpoint และถูกเขียนทับ (ในที่) ด้วยค่าที่บันทึกไว้ตอน resume
+
+    def __init__(self, operation, object_ids, document, state):
+        self.operation = operation
+        self.object_ids = list(object_ids)
+        self.key = checkpoint_key(operation, self.object_ids, document)
+        self.state = state
+
+    def reference(self):
+        return get_firestore_client().collection(CHECKPOINT_COLLECTION).document(self.key)
+
+    def _track(self, is_open):
+        left = _open.get()
+        if left is None:
+            return
+        if is_open and self not in left:
+            left.append(self)
+        elif not is_open and self in left:
+            left.remove(self)
+
+    def load(self):
+        # คืนค่า {step: result} ของขั้นที่สำเร็จแล้ว ({} = เริ่มใหม่)
+        snapshot = self.reference().get()
+        if not snapshot.exists:
+            return {}
+        data = snapshot.to_dict()
+        if time.time() - data.get("UpdatedAt", 0) > CHECKPOINT_TTL:
+            print(f"⚠️ Checkpoint {self.key} is too old, starting over")
+            return {}
+
+        for name, value in data.get("State", {}).items():
+            current = self.state.get(name)
+            if isinstance(current, dict):
+                current.clear()
+                current.update(value)
+            elif isinstance(current, list):
+                current[:] = value
+            else:
+                self.state[name] = value
+        self._track(True)
+        return data.get("Results", {})
+
+    def save(self, results):
+        self.reference().set({
+            "Operation": self.operation,
+            "ObjectIDs": self.object_ids,
+            "Steps": list(results),
+            "Results": results,
+            "State": self.state,
+            "UpdatedAt": time.time(),
+        })
+        self._track(True)
+
+    def clear(self):
+        self.reference().delete()
+        self._track(False)
@@ -0,0 +1,8 @@
+from functools import lru_cache
+from google.cloud import firestore
+
+
+# สร้าง Firestore client ครั้งเดียวต่อ process แล้วใช้ซ้ำ (สำคัญในโหมด server)
+@lru_cache(maxsize=None)
+def get_firestore_client():
+    return firestore.Client()
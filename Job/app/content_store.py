@@ -0,0 +1,107 @@
+import hashlib
+import os
+
+# ที่เก็บไฟล์แบบ content-addressed (sha256) ไฟล์ที่เนื้อหาเหมือนกันใน showcase จะเป็น hardlink ไปที่ object เดียวกัน
+# ต้องอยู่ filesystem เดียวกับ working directory (ว่าง = ปิด)
+STORE_DIR = os.environ.get("CONTENT_STORE_DIR", ".content-store")
+# ไฟล์ที่ site-builder เขียนทับในที่ จึงห้ามแชร์ inode กับไฟล์อื่น
+SKIP_NAMES = {"ws-resources.json"}
+CHUNK_SIZE = 1024 * 1024
+# จำนวนโฟลเดอร์ (จาก 256) ที่ collect_garbage ตรวจต่อครั้ง: ครบทั้ง store ทุก 256 / GC_BUCKETS ครั้ง
+GC_BUCKETS = int(os.environ.get("CONTENT_STORE_GC_BUCKETS", "16"))
+GC_CURSOR_FILE = "gc-cursor"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+def object_path(digest):
+    return os.path.join(STORE_DIR, digest[:2], digest[2:])
+
+
+def add_file(path):
+    # คืนค่า True ถ้าไฟล์ถูกแทนด้วย hardlink ไปยัง object ที่มีอยู่แล้ว
+    obj = object_path(file_digest(path))
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+    try:
+        # เนื้อหาใหม่: ไฟล์นี้กลายเป็น object เอง
+        os.link(path, obj)
+        return False
+    except FileExistsError:
+        pass
+
+    if os.path.samefile(path, obj):
+        return False
+
+    tmp_path = path + ".cas-tmp"
+    os.link(obj, tmp_path)
+    os.replace(tmp_path, path)
+    return True
+
+
+def dedupe_tree(folder_path):
+    stats = {"files": 0, "linked": 0, "bytes_saved": 0}
+    if not STORE_DIR:
+        return stats
+
+    for root, _, files in os.walk(folder_path):
+        for name in files:
+            if name in SKIP_NAMES:
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.path.islink(path):
+                    continue
+                size = os.path.getsize(path)
+                stats["files"] += 1
+                if add_file(path):
+                    stats["linked"] += 1
+                    stats["bytes_saved"] += size
+            except OSError as e:
+                print(f"⚠️ Cannot dedupe {path}:", str(e))
+    return stats
+
+
+def collect_garbage(buckets=None):
+    # ลบ object ที่ไม่มีไฟล์ใดใน workspace/cache ชี้อยู่แล้ว (เหลือ link เดียวคือตัว object เอง)
+    # ทีละ GC_BUCKETS โฟลเดอร์ (object แบ่งตาม 2 ตัวแรกของ digest) ต่อจากรอบก่อน ไม่ไล่ทั้ง store ทุกครั้ง
+    removed = 0
+    if not STORE_DIR or not os.path.isdir(STORE_DIR):
+        return removed
+
+    if buckets is None:
+        buckets = GC_BUCKETS
+    cursor_path = os.path.join(STORE_DIR, GC_CURSOR_FILE)
+    try:
+        with open(cursor_path) as f:
+            cursor = int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        cursor = 0
+
+    for index in range(cursor, cursor + min(buckets, 256)):
+        bucket = os.path.join(STORE_DIR, f"{index % 256:02x}")
+        try:
+            names = os.listdir(bucket)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            path = os.path.join(bucket, name)
+            try:
+                if os.stat(path).st_nlink == 1:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+
+    tmp_path = cursor_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str((cursor + buckets) % 256))
+    os.replace(tmp_path, cursor_path)
+    return removed
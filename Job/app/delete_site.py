@@ -1,495 +1,241 @@
+import asyncio
 import shutil
 import subprocess
-import zipfile, os
-from google.cloud import firestore
+import os
+import walrus_cli
+import workspace
+from archive import has_prefix
+from checkpoint import Checkpoint
+from errors import StepError, client_error_for, describe_error
+from pipeline import Pipeline
+from publish import IO_CONCURRENCY, SHOWCASE_SITE_NAME, load_blob_attributes
+from shards import REFERENCE_DOCUMENT
+from site_manifest import delete_manifests
+from site_registry import unregister_sites
+from showcase import (
+    NEW_SHOWCASE_ZIP, SHOWCASE_MAX_REBASES, ShowcaseConflict, delete_showcase_blob, download_showcase,
+    prepare_showcase_archive, rebase_showcase, store_showcase, sync_showcase_site,
+    update_showcase_reference,
+)
+
+SHOWCASE_SITE_ID = "0x43781dff393952358f7df65ddbea9eaaca31d63c87be44bf72dca78269dc8cbc"
 
-def dlete_walrus_site(object_id, showcase_obj_id, showcase_blob_id):
-    status = "2"  # Default status
-    client_error_description = ""
-    showcase_site_id = "0x8ea2941b08cad8b5b667fab8cffc26d4fc8bdaa00366e9d2e0dd233f46ee84bc"
 
-    try:
+def dlete_walrus_site(object_id, showcase_obj_id, showcase_blob_id):
+    dlete_walrus_sites([object_id], showcase_obj_id, showcase_blob_id)
+
+
+def dlete_walrus_sites(object_ids, showcase_obj_id, showcase_blob_id,
+                       showcase_site_id=SHOWCASE_SITE_ID, document=REFERENCE_DOCUMENT,
+                       destroy_resources=True, reason=""):
+    # ลบหลายเว็บออกจาก showcase ในรอบเดียว (ดาวน์โหลด/update/store showcase ครั้งเดียว)
+    # showcase_site_id/document: showcase (shard) ที่เว็บเหล่านี้อยู่
+    # destroy_resources=False: เอาออกจาก showcase อย่างเดียว ไม่ destroy site/burn blob (เช่น เว็บหมดอายุ)
+    # reason: client_error_description ของเว็บที่เอาออกสำเร็จ
+    results = {
+        object_id: {"status": "2", "client_error_description": ""}
+        for object_id in object_ids
+    }
+    attributes_by_id = {}
+    site_prefixes = {}
+    # blob ที่ยังอยู่ในรอบลบนี้ (error ของ showcase จะถูกบันทึกให้ทุกตัวในนี้)
+    pending = list(object_ids)
+    showcase_root = workspace.path(SHOWCASE_SITE_NAME)
+    showcase_zip_filename = f"{showcase_root}.zip"
+    # showcase ที่ใช้เป็นฐาน เปลี่ยนเมื่อ rebase
+    base = {"blob_id": showcase_blob_id, "obj_id": showcase_obj_id}
+    # ค่าที่ขั้นหลัง store ใช้ บันทึกไว้พร้อม checkpoint เพื่อทำต่อได้ตอน retry
+    checkpoint = Checkpoint("delete_site", object_ids, document, {
+        "results": results, "attributes": attributes_by_id, "pending": pending, "base": base,
+    })
+    pipeline = Pipeline("delete_site", max_reruns=SHOWCASE_MAX_REBASES, checkpoint=checkpoint)
+
+    def epochs():
+        # showcase อยู่ได้นานเท่ากับ epochs ที่มากที่สุดของเว็บที่ลบ
+        return str(max(int(attributes_by_id[object_id]["epochs"]) for object_id in pending))
+
+    @pipeline.step("check")
+    def check():
         # STEP 0: Check arguments
         if showcase_blob_id is None or showcase_obj_id is None:
-            client_error_description = "Internal error. Please try again later."
-            description = "Can't get showcase info"
-            raise ValueError(description)
-
-        # STEP 1: Get blob attributes
-        print("🔹 STEP 1: Get blob attributes from " + object_id)
-        try:
-            result = subprocess.run(
-                ["walrus", "get-blob-attribute", object_id],
-                check=True, capture_output=True, text=True
-            )
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Unable to retrieve project information."
-            raise RuntimeError(f"STEP 1 Error: {e.stderr or e.stdout or str(e)}")
-
-        attributes = {}
-        for line in result.stdout.strip().splitlines():
-            if ':' in line:
-                key, value = line.split(':', 1)
-                attributes[key.strip()] = value.strip()
-        print("✅ STEP 1 DONE: Attributes loaded.")
-
-        # STEP 2: Check blob attributes
-        print("🔹 STEP 2: Validate required blob attributes")
-        required_attributes = [
-            "site-name", "owner", "epochs",
-            "start_date", "end_date", "status", "blobId"
-        ]
-        missing = [attr for attr in required_attributes if attr not in attributes]
-        if missing:
-            client_error_description = "Internal error. Please try again later."
-            description = f"Missing required attribute(s): {', '.join(missing)}"
-            raise ValueError(description)
-        print("✅ STEP 2 DONE: All required attributes are present.")
-
-        # STEP 3: READ SHOWCASE FILE AND EXTRACT IT
-        print("🔹 STEP 3: Read SHOWCASE file and extract it")
-        showcase_site_name = "Site"
-        showcase_zip_filename = f"{showcase_site_name}.zip"
-
-        try:
-            subprocess.run(
-                ["walrus", "read", showcase_blob_id, "--out", showcase_zip_filename],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 3.1 DONE: Downloaded blob as {showcase_zip_filename}")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to download the showcase file."
-            raise RuntimeError(f"STEP 3.1 Error: {e.stderr or e.stdout or str(e)}")
-
-        try:
-            os.makedirs(showcase_site_name, exist_ok=True)
-            with zipfile.ZipFile(showcase_zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(showcase_site_name)
-            print(f"✅ STEP 3.2 DONE: Extracted to ./{showcase_site_name}")
-        except Exception as e:
-            client_error_description = "Failed to extract the showcase zip file."
-            raise RuntimeError(f"STEP 3.2 Error: {str(e)}")
-        
+            raise StepError("Can't get showcase info", "Internal error. Please try again later.")
+
+    @pipeline.step("load_attributes", requires=["check"])
+    async def load_attributes():
+        # STEP 1-2: Get and validate blob attributes (blob ที่ fail จะถูกตัดออก ไม่กระทบตัวอื่น)
+        slots = asyncio.Semaphore(IO_CONCURRENCY)
+
+        async def load(object_id):
+            async with slots:
+                attributes_by_id[object_id] = await asyncio.to_thread(load_blob_attributes, object_id)
+
+        outcomes = await asyncio.gather(*[load(object_id) for object_id in object_ids],
+                                        return_exceptions=True)
+        for object_id, outcome in zip(object_ids, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ Error ({object_id}):", describe_error(outcome))
+                results[object_id]["client_error_description"] = client_error_for(outcome)
+
+        pending[:] = [object_id for object_id in object_ids if object_id in attributes_by_id]
+        if not pending:
+            raise StepError("No site to delete.")
+        for object_id in pending:
+            attributes = attributes_by_id[object_id]
+            site_prefixes[object_id] = f"{attributes['owner']}/{attributes['site-name']}"
+
+    @pipeline.step("download_showcase", requires=["load_attributes"])
+    def fetch_showcase():
+        # STEP 3: READ SHOWCASE FILE (ไม่มี cache: ดาวน์โหลดแค่ zip ไม่แตกไฟล์ ลบเว็บจาก zip โดยตรง
+        # แล้วแตก showcase ใหม่ครั้งเดียวตอน update site หลังสลับ reference สำเร็จ)
+        print("🔹 STEP 3: Read SHOWCASE file")
+        download_showcase(base["blob_id"], showcase_root, "3", extract=False, document=document)
+
+    @pipeline.step("remove_sites", requires=["download_showcase"],
+                   client_error_description="Failed to delete static site from showcase structure.")
+    def remove_sites():
         # STEP 4: Delete Site path fron showcase site
-        print("🔹STEP 4: Delete Site path from showcase site")
-        site_name = attributes["site-name"]
-        owner = attributes["owner"]
-        showcase_root = showcase_site_name
-        destination_dir = os.path.join(showcase_root, owner)
-        target_dir = os.path.join(destination_dir, site_name)
-
-        if not os.path.exists(target_dir):
-            raise RuntimeError(f"Source folder '{target_dir}' does not exist.")
-        
-        try:
+        print(f"🔹STEP 4: Delete {len(pending)} site path(s) from showcase site")
+        for object_id in list(pending):
+            target_dir = os.path.join(showcase_root, site_prefixes[object_id])
+
+            # ตรวจจาก central directory ของ zip แทนการดูใน tree
+            if not has_prefix(showcase_zip_filename, site_prefixes[object_id]):
+                print(f"❌ Error ({object_id}): Source folder '{target_dir}' does not exist.")
+                results[object_id]["client_error_description"] = \
+                    "Unexpected error occurred. Please try again later."
+                pending.remove(object_id)
+                continue
+
             if os.path.exists(target_dir):
                 shutil.rmtree(target_dir)
 
-            print(f"✅ STEP 4 DONE: Delete {site_name} from {target_dir}")
-        except Exception as e:
-            client_error_description = "Failed to delete static site from showcase structure."
-            raise RuntimeError(f"STEP 5 Error: {str(e)}")
-        
-        # STEP 5: UPDATE SITE
-        print("🔹 STEP 5: Update site using site-builder CLI")
-        try:
-            epochs = attributes["epochs"]
-
-            subprocess.run(
-                ["site-builder", "update", showcase_root, showcase_site_id, "--epochs", "2"],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 5 DONE: Site updated with site-builder in ./{showcase_root}")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Site update failed during Deleting."
-            raise RuntimeError(f"STEP 5 Error: {e.stderr or e.stdout or str(e)}")
-        
+            print(f"✅ STEP 4 DONE: Delete {site_prefixes[object_id]} from {target_dir}")
+
+        if not pending:
+            raise StepError("No site to delete.")
+
+    @pipeline.step("prepare_archive", requires=["remove_sites"],
+                   client_error_description="Unexpected error during zipping or storing.")
+    def prepare_archive():
+        # STEP 6.0: กรอง entry ออกจาก zip เดิม (ไม่มี tree: กรองทั้ง zip รวมไฟล์ระดับบนสุดใน STEP 6)
+        if not os.path.isdir(showcase_root):
+            return None
+        return prepare_showcase_archive(
+            showcase_root, removed_prefixes=[site_prefixes[object_id] for object_id in pending])
+
+    @pipeline.step("store", requires=["prepare_archive"], checkpoint=True)
+    def store():
         # STEP 6: STORE NEW SHOWCASE SITE IN WALRUS
         print("🔹 STEP 6: Zip and store updated showcase site into Walrus")
-        try:
-            new_showcase_zip = "new_showcase.zip"
-
-            # Zip the showcase_root folder (e.g., 'site')
-            def zip_folder(folder_path, zip_path):
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, _, files in os.walk(folder_path):
-                        for file in files:
-                            abs_path = os.path.join(root, file)
-                            rel_path = os.path.relpath(abs_path, folder_path)
-                            zipf.write(abs_path, rel_path)
-
-            zip_folder(showcase_site_name, new_showcase_zip)
-            print(f"✅ STEP 6.1 DONE: Zipped {showcase_site_name} -> {new_showcase_zip}")
-
-            # Store the zipped file in Walrus
-            result = subprocess.run(
-                ["walrus", "store", new_showcase_zip, "--epochs", "2", "--deletable", "--force"],
-                check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 6.2 DONE: Stored new showcase site in Walrus")
-            
-            stdout = result.stdout.strip()
-            new_showcase_blob_id = None
-            new_showcase_object_id = None
-
-            for line in stdout.splitlines():
-                if line.startswith("Blob ID:"):
-                    new_showcase_blob_id = line.split(":", 1)[1].strip()
-                elif line.startswith("Sui object ID:"):
-                    new_showcase_object_id = line.split(":", 1)[1].strip()
-
-            if not new_showcase_blob_id or not new_showcase_object_id:
-                client_error_description = "Cannot get showcase Site id from Walrus."
-                raise RuntimeError("⚠️ ไม่พบค่า Blob ID หรือ Sui object ID จากผลลัพธ์ของคำสั่ง walrus store")
-
-            print(f"📦 new_showcase_blob_id: {new_showcase_blob_id}")
-            print(f"📦 new_showcase_object_id: {new_showcase_object_id}")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to store updated site in Walrus."
-            raise RuntimeError(f"STEP 6 Error: {e.stderr or e.stdout or str(e)}")
-        except Exception as e:
-            client_error_description = "Unexpected error during zipping or storing."
-            raise RuntimeError(f"STEP 6 Error: {str(e)}")
-        
+        return store_showcase(showcase_root, "6", epochs=epochs(),
+                              removed_prefixes=[site_prefixes[object_id] for object_id in pending],
+                              prepared=pipeline.results["prepare_archive"])
+
+    @pipeline.step("update_reference", requires=["store"], checkpoint=True)
+    async def update_reference():
         # STEP 7: UPDATE Firestore Document with new BlobID and ObjID
+        # (สลับเฉพาะเมื่อยังชี้ไปที่ showcase ที่ใช้เป็นฐาน ไม่เช่นนั้น rebase แล้วทำ STEP 3-7 ใหม่)
         print("🔹 STEP 7: Update Firestore with new BlobID and ObjID")
-
-        try:
-            db = firestore.Client()
-            doc_ref = db.collection("showcase-data").document("reference")
-            doc = doc_ref.get()
-
-            if doc.exists:
-                # ✅ อัปเดตค่าใหม่ที่ได้จาก STEP 6
-                doc_ref.update({
-                    "BlobID": new_showcase_blob_id,
-                    "ObjID": new_showcase_object_id
-                })
-
-                print("✅ STEP 7 DONE: Firestore document updated successfully.")
-                print(f"   🔁 Updated BlobID: {new_showcase_blob_id}")
-                print(f"   🔁 Updated ObjID: {new_showcase_object_id}")
-                status = "3"
-        except Exception as e:
-            client_error_description = "Error while updating Firestore."
-            raise RuntimeError(f"STEP 7 Error: {str(e)}")
-        
-        # STEP 8: DELETE OLD SHOWCASE BLOB
+        new_showcase_blob_id, new_showcase_object_id = pipeline.results["store"]
+        try:
+            return await asyncio.to_thread(
+                update_showcase_reference, new_showcase_blob_id, new_showcase_object_id, "7",
+                expected_blob_id=base["blob_id"], document=document)
+        except ShowcaseConflict as conflict:
+            await rebase_showcase(conflict, base, new_showcase_blob_id, "download_showcase")
+
+    @pipeline.step("update_site", requires=["update_reference"], checkpoint=True)
+    async def update_site():
+        # STEP 5: UPDATE SITE หลังสลับ reference สำเร็จ (ถ้าต้อง rebase เว็บจริงยังไม่ถูกแตะ)
+        if not pipeline.results["update_reference"]:
+            return
+        print("🔹 STEP 5: Update site using site-builder CLI")
+        await sync_showcase_site(showcase_root, pipeline.results["store"][0], "5",
+                                 "Site update failed during Deleting.",
+                                 showcase_site_id=showcase_site_id, epochs=epochs(),
+                                 document=document, archive_path=workspace.path(NEW_SHOWCASE_ZIP))
+        for object_id in pending:
+            results[object_id]["status"] = "3"
+            results[object_id]["client_error_description"] = reason
+
+    # STEP 8-10: ลบ blob showcase เดิม, destroy site และ burn blob ของผู้ใช้พร้อมกัน
+    # (ขั้นที่สำเร็จแล้วถูกบันทึกใน checkpoint ไม่ทำซ้ำตอน resume)
+    @pipeline.step("delete_old_blob", requires=["update_reference"], checkpoint=True)
+    async def delete_old_blob():
         print("🔹 STEP 8: Delete old showcase blob from Walrus")
-
-        try:
-            result = subprocess.run(
-                 ["walrus", "delete", "--blob-id", showcase_blob_id, "--yes", "--no-status-check"],
-                 check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 8 DONE: Old showcase blob deleted successfully.")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to delete old showcase blob from Walrus."
-            raise RuntimeError(f"STEP 8 Error: {e.stderr or e.stdout or str(e)}")
-        except Exception as e:
-            client_error_description = "Unexpected error during blob deletion."
-            raise RuntimeError(f"STEP 8 Error: {str(e)}")
-        
-        # STEP 9: Destroy SITE FROM WALRUS
-        print("🔹 STEP 9: Destroy site from Walrus")
-        if attributes.get("site_id") is not None:
-            try:
-                site_id = attributes["site_id"]
-                result = subprocess.run(
-                    ["site-builder", "destroy", site_id],
-                    check=True, capture_output=True, text=True
-                )
-                print(f"✅ STEP 9 DONE: Site {site_id} destroyed from Walrus")
-            except subprocess.CalledProcessError as e:
-                client_error_description = "Failed to destroy site from Walrus."
-                raise RuntimeError(f"STEP 9 Error: {e.stderr or e.stdout or str(e)}")
-        else :
-            print("user not have site id yet")
-
-        # STEP 10: Destroy SITE FROM WALRUS
+        await delete_showcase_blob(base["blob_id"], "8")
+
+    @pipeline.step("destroy_sites", requires=["update_reference"], checkpoint=True)
+    async def destroy_sites():
+        if not destroy_resources:
+            return
+        print(f"🔹 STEP 9: Destroy {len(pending)} site(s) from Walrus")
+        slots = asyncio.Semaphore(IO_CONCURRENCY)
+
+        async def destroy(object_id, site_id):
+            async with slots:
+                await destroy_site(object_id, site_id)
+
+        destroying = {}
+        for object_id in pending:
+            site_id = attributes_by_id[object_id].get("site_id")
+            if site_id is not None:
+                destroying[object_id] = destroy(object_id, site_id)
+            else:
+                print(f"user not have site id yet ({object_id})")
+
+        outcomes = await asyncio.gather(*destroying.values(), return_exceptions=True)
+        for object_id, outcome in zip(destroying, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ Error ({object_id}):", describe_error(outcome))
+                results[object_id]["client_error_description"] = client_error_for(outcome)
+
+    @pipeline.step("burn_blobs", requires=["update_reference"], checkpoint=True)
+    async def burn():
+        if not destroy_resources:
+            return
         print("🔹 STEP 10: Destroy Blob from Walrus")
-        try:
-            result = subprocess.run(
-                ["walrus", "burn-blobs", "--object-ids", object_id],
-                input="y\n",check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 10 DONE: Blob {object_id} destroyed from Walrus")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to destroy Blob from Walrus."
-            raise RuntimeError(f"STEP 10 Error: {e.stderr or e.stdout or str(e)}")
-
-    except subprocess.CalledProcessError as e:
-        description = f"Subprocess error: {e.stderr or str(e)}"
-        if not client_error_description:
-            client_error_description = "Internal system error. Please try again later."
-        print("❌ Error:", description)
-    except Exception as e:
-        description = str(e)
-        if not client_error_description:
-            client_error_description = "Unexpected error occurred. Please try again later."
-        print("❌ Error:", description)
-    finally:
-        print("🔹 LAST STEP: Updating blob attributes...")
-        attr_command = [
-            "walrus", "set-blob-attribute", object_id,
-            "--attr", "status", status,
-            "--attr", "client_error_description", client_error_description
-        ]
-
-        try:
-            subprocess.run(attr_command, check=True, capture_output=True, text=True)
-            print("✅ LAST STEP DONE: Blob attributes updated.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ LAST STEP FAILED Cannot update blob attributes:", e.stderr or str(e))
-
+        await burn_blobs(pending)
 
-import shutil
-import subprocess
-import zipfile, os
-from google.cloud import firestore
+    @pipeline.on_error
+    def record_error(e):
+        for object_id in pending:
+            results[object_id]["client_error_description"] = client_error_for(e)
 
-def dlete_walrus_site(object_id, showcase_obj_id, showcase_blob_id):
-    status = "2"  # Default status
-    client_error_description = ""
-    showcase_site_id = "0x43781dff393952358f7df65ddbea9eaaca31d63c87be44bf72dca78269dc8cbc"
-
-    try:
-        # STEP 0: Check arguments
-        if showcase_blob_id is None or showcase_obj_id is None:
-            client_error_description = "Internal error. Please try again later."
-            description = "Can't get showcase info"
-            raise ValueError(description)
-
-        # STEP 1: Get blob attributes
-        print("🔹 STEP 1: Get blob attributes from " + object_id)
-        try:
-            result = subprocess.run(
-                ["walrus", "get-blob-attribute", object_id],
-                check=True, capture_output=True, text=True
-            )
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Unable to retrieve project information."
-            raise RuntimeError(f"STEP 1 Error: {e.stderr or e.stdout or str(e)}")
-
-        attributes = {}
-        for line in result.stdout.strip().splitlines():
-            if ':' in line:
-                key, value = line.split(':', 1)
-                attributes[key.strip()] = value.strip()
-        print("✅ STEP 1 DONE: Attributes loaded.")
-
-        # STEP 2: Check blob attributes
-        print("🔹 STEP 2: Validate required blob attributes")
-        required_attributes = [
-            "site-name", "owner", "epochs",
-            "start_date", "end_date", "status", "blobId"
-        ]
-        missing = [attr for attr in required_attributes if attr not in attributes]
-        if missing:
-            client_error_description = "Internal error. Please try again later."
-            description = f"Missing required attribute(s): {', '.join(missing)}"
-            raise ValueError(description)
-        print("✅ STEP 2 DONE: All required attributes are present.")
-
-        # STEP 3: READ SHOWCASE FILE AND EXTRACT IT
-        print("🔹 STEP 3: Read SHOWCASE file and extract it")
-        showcase_site_name = "Site"
-        showcase_zip_filename = f"{showcase_site_name}.zip"
+    @pipeline.finally_step
+    def write_attributes():
+        # attribute ถูกเขียนจริงตอนจบ operation (walrus_cli.attribute_batch) ซึ่ง log ผลของแต่ละ blob เอง
+        print("🔹 LAST STEP: Queue blob attributes...")
+        for object_id in object_ids:
+            walrus_cli.set_blob_attributes(object_id, dict(results[object_id]))
+            print(f"✅ LAST STEP DONE: Blob attributes queued ({object_id}).")
 
+        removed = [object_id for object_id in object_ids if results[object_id]["status"] == "3"]
         try:
-            subprocess.run(
-                ["walrus", "read", showcase_blob_id, "--out", showcase_zip_filename],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 3.1 DONE: Downloaded blob as {showcase_zip_filename}")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to download the showcase file."
-            raise RuntimeError(f"STEP 3.1 Error: {e.stderr or e.stdout or str(e)}")
-
-        try:
-            os.makedirs(showcase_site_name, exist_ok=True)
-            with zipfile.ZipFile(showcase_zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(showcase_site_name)
-            print(f"✅ STEP 3.2 DONE: Extracted to ./{showcase_site_name}")
-        except Exception as e:
-            client_error_description = "Failed to extract the showcase zip file."
-            raise RuntimeError(f"STEP 3.2 Error: {str(e)}")
-        
-        # STEP 4: Delete Site path fron showcase site
-        print("🔹STEP 4: Delete Site path from showcase site")
-        site_name = attributes["site-name"]
-        owner = attributes["owner"]
-        showcase_root = showcase_site_name
-        destination_dir = os.path.join(showcase_root, owner)
-        target_dir = os.path.join(destination_dir, site_name)
-
-        if not os.path.exists(target_dir):
-            raise RuntimeError(f"Source folder '{target_dir}' does not exist.")
-        
-        try:
-            if os.path.exists(target_dir):
-                shutil.rmtree(target_dir)
-
-            print(f"✅ STEP 4 DONE: Delete {site_name} from {target_dir}")
+            unregister_sites(removed)
         except Exception as e:
-            client_error_description = "Failed to delete static site from showcase structure."
-            raise RuntimeError(f"STEP 5 Error: {str(e)}")
-        
-        # STEP 5: UPDATE SITE
-        print("🔹 STEP 5: Update site using site-builder CLI")
+            print(f"⚠️ Cannot unregister removed sites:", str(e))
         try:
-            epochs = attributes["epochs"]
-
-            subprocess.run(
-                ["site-builder", "update", showcase_root, showcase_site_id, "--epochs", epochs],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 5 DONE: Site updated with site-builder in ./{showcase_root}")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Site update failed during Deleting."
-            raise RuntimeError(f"STEP 5 Error: {e.stderr or e.stdout or str(e)}")
-        
-        # STEP 6: STORE NEW SHOWCASE SITE IN WALRUS
-        print("🔹 STEP 6: Zip and store updated showcase site into Walrus")
-        try:
-            new_showcase_zip = "new_showcase.zip"
-
-            # Zip the showcase_root folder (e.g., 'site')
-            def zip_folder(folder_path, zip_path):
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, _, files in os.walk(folder_path):
-                        for file in files:
-                            abs_path = os.path.join(root, file)
-                            rel_path = os.path.relpath(abs_path, folder_path)
-                            zipf.write(abs_path, rel_path)
-
-            zip_folder(showcase_site_name, new_showcase_zip)
-            print(f"✅ STEP 6.1 DONE: Zipped {showcase_site_name} -> {new_showcase_zip}")
-
-            # Store the zipped file in Walrus
-            result = subprocess.run(
-                ["walrus", "store", new_showcase_zip, "--epochs", epochs, "--deletable", "--force"],
-                check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 6.2 DONE: Stored new showcase site in Walrus")
-            
-            stdout = result.stdout.strip()
-            new_showcase_blob_id = None
-            new_showcase_object_id = None
-
-            for line in stdout.splitlines():
-                if line.startswith("Blob ID:"):
-                    new_showcase_blob_id = line.split(":", 1)[1].strip()
-                elif line.startswith("Sui object ID:"):
-                    new_showcase_object_id = line.split(":", 1)[1].strip()
-
-            if not new_showcase_blob_id or not new_showcase_object_id:
-                client_error_description = "Cannot get showcase Site id from Walrus."
-                raise RuntimeError("⚠️ ไม่พบค่า Blob ID หรือ Sui object ID จากผลลัพธ์ของคำสั่ง walrus store")
-
-            print(f"📦 new_showcase_blob_id: {new_showcase_blob_id}")
-            print(f"📦 new_showcase_object_id: {new_showcase_object_id}")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to store updated site in Walrus."
-            raise RuntimeError(f"STEP 6 Error: {e.stderr or e.stdout or str(e)}")
+            delete_manifests(removed)
         except Exception as e:
-            client_error_description = "Unexpected error during zipping or storing."
-            raise RuntimeError(f"STEP 6 Error: {str(e)}")
-        
-        # STEP 7: UPDATE Firestore Document with new BlobID and ObjID
-        print("🔹 STEP 7: Update Firestore with new BlobID and ObjID")
+            print(f"⚠️ Cannot delete manifests of removed sites:", str(e))
 
-        try:
-            db = firestore.Client()
-            doc_ref = db.collection("showcase-data").document("reference")
-            doc = doc_ref.get()
-
-            if doc.exists:
-                # ✅ อัปเดตค่าใหม่ที่ได้จาก STEP 6
-                doc_ref.update({
-                    "BlobID": new_showcase_blob_id,
-                    "ObjID": new_showcase_object_id
-                })
-
-                print("✅ STEP 7 DONE: Firestore document updated successfully.")
-                print(f"   🔁 Updated BlobID: {new_showcase_blob_id}")
-                print(f"   🔁 Updated ObjID: {new_showcase_object_id}")
-                status = "3"
-        except Exception as e:
-            client_error_description = "Error while updating Firestore."
-            raise RuntimeError(f"STEP 7 Error: {str(e)}")
-        
-        # STEP 8: DELETE OLD SHOWCASE BLOB
-        print("🔹 STEP 8: Delete old showcase blob from Walrus")
+    pipeline.run()
 
-        try:
-            result = subprocess.run(
-                 ["walrus", "delete", "--blob-id", showcase_blob_id, "--yes", "--no-status-check"],
-                 check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 8 DONE: Old showcase blob deleted successfully.")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to delete old showcase blob from Walrus."
-            raise RuntimeError(f"STEP 8 Error: {e.stderr or e.stdout or str(e)}")
-        except Exception as e:
-            client_error_description = "Unexpected error during blob deletion."
-            raise RuntimeError(f"STEP 8 Error: {str(e)}")
-        
-        # STEP 9: Destroy SITE FROM WALRUS
-        print("🔹 STEP 9: Destroy site from Walrus")
-        if attributes.get("site_id") is not None:
-            try:
-                site_id = attributes["site_id"]
-                result = subprocess.run(
-                    ["site-builder", "destroy", site_id],
-                    check=True, capture_output=True, text=True
-                )
-                print(f"✅ STEP 9 DONE: Site {site_id} destroyed from Walrus")
-            except subprocess.CalledProcessError as e:
-                client_error_description = "Failed to destroy site from Walrus."
-                raise RuntimeError(f"STEP 9 Error: {e.stderr or e.stdout or str(e)}")
-        else :
-            print("user not have site id yet")
-
-        # STEP 10: Destroy SITE FROM WALRUS
-        print("🔹 STEP 10: Destroy Blob from Walrus")
-        try:
-            result = subprocess.run(
-                ["walrus", "burn-blobs", "--object-ids", object_id],
-                input="y\n",check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 10 DONE: Blob {object_id} destroyed from Walrus")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to destroy Blob from Walrus."
-            raise RuntimeError(f"STEP 10 Error: {e.stderr or e.stdout or str(e)}")
 
+async def destroy_site(object_id, site_id):
+    try:
+        await walrus_cli.destroy_site_async(site_id)
+        print(f"✅ STEP 9 DONE: Site {site_id} destroyed from Walrus ({object_id})")
     except subprocess.CalledProcessError as e:
-        description = f"Subprocess error: {e.stderr or str(e)}"
-        if not client_error_description:
-            client_error_description = "Internal system error. Please try again later."
-        print("❌ Error:", description)
-    except Exception as e:
-        description = str(e)
-        if not client_error_description:
-            client_error_description = "Unexpected error occurred. Please try again later."
-        print("❌ Error:", description)
-    finally:
-        print("🔹 LAST STEP: Updating blob attributes...")
-        attr_command = [
-            "walrus", "set-blob-attribute", object_id,
-            "--attr", "status", status,
-            "--attr", "client_error_description", client_error_description
-        ]
+        raise StepError(f"STEP 9 Error: {describe_error(e)}",
+                        "Failed to destroy site from Walrus.")
 
-        try:
-            subprocess.run(attr_command, check=True, capture_output=True, text=True)
-            print("✅ LAST STEP DONE: Blob attributes updated.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ LAST STEP FAILED Cannot update blob attributes:", e.stderr or str(e))
 
+async def burn_blobs(object_ids):
+    try:
+        await walrus_cli.burn_blobs_async(object_ids)
+        print(f"✅ STEP 10 DONE: Blob {' '.join(object_ids)} destroyed from Walrus")
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP 10 Error: {describe_error(e)}",
+                        "Failed to destroy Blob from Walrus.")
@@ -0,0 +1,22 @@
+import subprocess
+
+
+class StepError(RuntimeError):
+    # error ของแต่ละ STEP พร้อมข้อความที่จะแสดงให้ผู้ใช้ (client_error_description)
+    def __init__(self, message, client_error_description=""):
+        super().__init__(message)
+        self.client_error_description = client_error_description
+
+
+def describe_error(e):
+    if isinstance(e, subprocess.CalledProcessError):
+        return e.stderr or e.stdout or str(e)
+    return str(e)
+
+
+def client_error_for(e):
+    if isinstance(e, StepError) and e.client_error_description:
+        return e.client_error_description
+    if isinstance(e, subprocess.CalledProcessError):
+        return "Internal system error. Please try again later."
+    return "Unexpected error occurred. Please try again later."
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import timedelta
+import os
+import subprocess
+import walrus_cli
+from errors import StepError, describe_error
+from pipeline import Pipeline
+from sweep_expired import parse_date
+from walrus_info import walrus_info
+
+# จำนวน walrus extend ที่รันพร้อมกัน
+EXTEND_CONCURRENCY = int(os.environ.get("JOB_EXTEND_CONCURRENCY", "4"))
+DEFAULT_EXTEND_EPOCHS = 2
+
+
+def parse_extend_args(value):
+    # "[epochs] [object_id ...]" เช่น "5 0xabc 0xdef" หรือ "0xabc" (ต่อ DEFAULT_EXTEND_EPOCHS epoch)
+    tokens = (value or "").replace(",", " ").split()
+    if tokens and tokens[0].isdigit():
+        return int(tokens[0]), tokens[1:]
+    return DEFAULT_EXTEND_EPOCHS, tokens
+
+
+def extend_blobs(epochs, object_ids, showcase_object_ids):
+    # ต่ออายุ blob ของ showcase (ทุก shard) และของเว็บผู้ใช้ในที่ ไม่ต้อง store เนื้อหาใหม่
+    # blob ที่ต่อไม่สำเร็จ (เช่น ไม่ได้เป็นเจ้าของ) ไม่กระทบตัวอื่น
+    failed = {}
+    pipeline = Pipeline("extend")
+    slots = asyncio.Semaphore(EXTEND_CONCURRENCY)
+
+    async def extend(object_id):
+        async with slots:
+            try:
+                await walrus_cli.extend_blob_async(object_id, epochs)
+                print(f"✅ Extended {object_id} by {epochs} epoch(s)")
+            except subprocess.CalledProcessError as e:
+                failed[object_id] = describe_error(e)
+                print(f"❌ Error ({object_id}):", failed[object_id])
+
+    @pipeline.step("check")
+    def check():
+        if epochs < 1:
+            raise StepError(f"Invalid epochs: {epochs}")
+        print(f"🔹 Extend {len(showcase_object_ids)} showcase blob(s) and "
+              f"{len(object_ids)} site blob(s) by {epochs} epoch(s)")
+
+    @pipeline.step("extend_showcase", requires=["check"])
+    async def extend_showcase():
+        await asyncio.gather(*[extend(object_id) for object_id in showcase_object_ids])
+
+    @pipeline.step("extend_sites", requires=["check"])
+    async def extend_sites():
+        await asyncio.gather(*[extend(object_id) for object_id in object_ids])
+
+    @pipeline.step("update_end_dates", requires=["extend_sites"])
+    async def update_end_dates():
+        # end_date ของเว็บที่ต่ออายุแล้ว เลื่อนไป epochs * ความยาว epoch (sweep_expired ใช้ค่านี้)
+        extended = [object_id for object_id in object_ids if object_id not in failed]
+        if not extended:
+            return
+        epoch_days = walrus_info().epoch_duration_days
+        if not epoch_days:
+            print("⚠️ Unknown epoch duration, end_date not updated")
+            return
+        duration = timedelta(days=epoch_days * epochs)
+
+        async def update(object_id):
+            async with slots:
+                try:
+                    attributes = await asyncio.to_thread(walrus_cli.get_blob_attributes, object_id)
+                    end_date = parse_date(attributes["end_date"]) + duration
+                    await asyncio.to_thread(walrus_cli.set_blob_attributes, object_id, {
+                        "end_date": end_date.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                    })
+                except Exception as e:
+                    print(f"⚠️ Cannot update end_date of {object_id}:", describe_error(e))
+
+        await asyncio.gather(*[update(object_id) for object_id in extended])
+
+    @pipeline.finally_step
+    def report():
+        total = len(object_ids) + len(showcase_object_ids)
+        print(f"✅ Extended {total - len(failed)}/{total} blob(s)")
+
+    pipeline.run()
+    return failed
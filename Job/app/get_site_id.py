@@ -1,131 +1,171 @@
-import re
+import shutil
 import subprocess
-import zipfile, os
+import os
+import metrics
+import walrus_cli
+import workspace
+from archive import ArchiveLimitError, UnsafeArchiveError, describe_extract, extract_archive
+from errors import StepError, client_error_for
+from pipeline import Pipeline
+from site_manifest import build_manifest, manifest_digest, save_manifest
 
-def get_site_id(object_id):
-    site_status = "2"  
-    client_error_description = ""
-    site_id = ""
+def get_site_id(object_id, attributes=None, site_dir=None):
+    # attributes/site_dir: ส่งมาจาก publish ที่อ่าน attribute และแตกไฟล์เว็บไว้แล้ว จะได้ไม่ต้องทำซ้ำ
+    state = {
+        "site_status": "2",
+        "client_error_description": "",
+        "site_id": "",
+        "attributes": attributes,
+        "site_name": None,
+        # manifest ของเนื้อหาที่จะ deploy และผลเทียบกับที่ deploy ล่าสุด
+        "files": None,
+        "digest": None,
+        "unchanged": False,
+    }
+    pipeline = Pipeline("get_site_id")
 
-    try:
-        # STEP 1: Get blob attributes
+    # STEP 1: Get blob attributes
+    @pipeline.step("load_attributes", client_error_description="Unable to retrieve project information.")
+    def load_attributes():
         print("🔹 STEP 1: Get blob attributes from " + object_id)
-        try:
-            result = subprocess.run(
-                ["walrus", "get-blob-attribute", object_id],
-                check=True, capture_output=True, text=True
-            )
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Unable to retrieve project information."
-            raise RuntimeError(f"STEP 1 Error: {e.stderr or e.stdout or str(e)}")
-
-        attributes = {}
-        for line in result.stdout.strip().splitlines():
-            if ':' in line:
-                key, value = line.split(':', 1)
-                attributes[key.strip()] = value.strip()
-        print("✅ STEP 1 DONE: Attributes loaded.")
+        if state["attributes"] is None:
+            state["attributes"] = walrus_cli.get_blob_attributes(object_id)
+            print("✅ STEP 1 DONE: Attributes loaded.")
+        else:
+            print("✅ STEP 1 DONE: Attributes provided by caller.")
 
-        # STEP 2: Check blob attributes
+    # STEP 2: Check blob attributes
+    @pipeline.step("validate_attributes", requires=["load_attributes"])
+    def validate_attributes():
         print("🔹 STEP 2: Validate required blob attributes")
+        attributes = state["attributes"]
         required_attributes = [
             "site-name", "owner", "epochs",
             "start_date", "end_date", "site_status", "blobId", "status"
         ]
         missing = [attr for attr in required_attributes if attr not in attributes]
         if missing:
-            client_error_description = "Internal error. Please try again later."
-            description = f"Missing required attribute(s): {', '.join(missing)}"
-            raise ValueError(description)
-        
+            raise StepError(f"Missing required attribute(s): {', '.join(missing)}",
+                            "Internal error. Please try again later.")
+
         if attributes["status"] != "1" :
-            client_error_description = "Internal error. Please try again later. "
-            description = "Showcase status still fail. pls try publish on showcase site again before use this service."
-            raise ValueError(description)
-        
+            raise StepError("Showcase status still fail. pls try publish on showcase site again before use this service.",
+                            "Internal error. Please try again later. ")
+
         print("✅ STEP 2 DONE: All required attributes are present.")
 
-        # STEP 3: READ STATIC FILE AND EXTRACT IT
+        # blob เดิมที่ deploy ไปแล้ว (blob ID มาจากเนื้อหา): ไม่ต้องดาวน์โหลดและไม่ต้อง update
+        if (deployed(attributes) and attributes.get("site_digest")
+                and attributes.get("site_blob_id") == attributes["blobId"]
+                and attributes.get("site_epochs") == attributes["epochs"]):
+            state["digest"] = attributes["site_digest"]
+            state["unchanged"] = True
+
+    # STEP 3: READ STATIC FILE AND EXTRACT IT
+    @pipeline.step("download_site", requires=["validate_attributes"])
+    def download_site():
         print("🔹 STEP 3: Read static file and extract it")
+        attributes = state["attributes"]
         blob_id = attributes["blobId"]
-        site_name = attributes["site-name"]
+        site_name = workspace.path(attributes["site-name"])
         zip_filename = f"{site_name}.zip"
 
+        if state["unchanged"]:
+            print(f"✅ STEP 3 DONE: Blob {blob_id} is already deployed")
+            return
+
+        if site_dir is not None and os.path.isdir(site_dir):
+            state["site_name"] = site_dir
+            print(f"✅ STEP 3 DONE: Using extracted site at ./{site_dir}")
+            return
+
         try:
-            subprocess.run(
-                ["walrus", "read", blob_id, "--out", zip_filename],
-                check=True, capture_output=True, text=True
-            )
+            walrus_cli.read_blob(blob_id, zip_filename)
+            metrics.add_file_size("archive_bytes", zip_filename)
             print(f"✅ STEP 3.1 DONE: Downloaded blob as {zip_filename}")
         except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to download the site file."
-            raise RuntimeError(f"STEP 3.1 Error: {e.stderr or e.stdout or str(e)}")
+            raise StepError(f"STEP 3.1 Error: {e.stderr or e.stdout or str(e)}",
+                            "Failed to download the site file.")
 
         try:
+            # เริ่มจากโฟลเดอร์ว่าง ไม่ให้ไฟล์จากงานก่อนหน้าปนเข้า manifest
+            shutil.rmtree(site_name, ignore_errors=True)
             os.makedirs(site_name, exist_ok=True)
-            with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(site_name)
-            print(f"✅ STEP 3.2 DONE: Extracted to ./{site_name}")
+            stats = extract_archive(zip_filename, site_name)
+            metrics.add_value("extracted_bytes", stats["bytes"])
+            print(f"✅ STEP 3.2 DONE: Extracted to ./{site_name} ({describe_extract(stats)})")
+        except ArchiveLimitError as e:
+            raise StepError(f"STEP 3.2 Error: {str(e)}", "The site file is too large.")
+        except UnsafeArchiveError as e:
+            raise StepError(f"STEP 3.2 Error: {str(e)}", "The site file contains invalid paths.")
         except Exception as e:
-            client_error_description = "Failed to extract the site zip file."
-            raise RuntimeError(f"STEP 3.2 Error: {str(e)}")
-        
-        # STEP 4: PUBLISH SITE
+            raise StepError(f"STEP 3.2 Error: {str(e)}", "Failed to extract the site zip file.")
+        state["site_name"] = site_name
+
+    # STEP 3.3: เทียบ manifest ของเนื้อหากับที่ deploy ล่าสุด
+    @pipeline.step("compare_manifest", requires=["download_site"])
+    def compare_manifest():
+        attributes = state["attributes"]
+        if state["unchanged"]:
+            return
+        state["files"] = build_manifest(state["site_name"])
+        state["digest"] = manifest_digest(state["files"], attributes["epochs"])
+        state["unchanged"] = deployed(attributes) and attributes.get("site_digest") == state["digest"]
+        print(f"✅ STEP 3.3 DONE: {len(state['files'])} files, digest {state['digest']}"
+              + (" (unchanged)" if state["unchanged"] else ""))
+
+    # STEP 4: PUBLISH SITE
+    @pipeline.step("publish_site", requires=["compare_manifest"],
+                   client_error_description="Site update failed during publishing.")
+    async def publish_site():
         print("🔹 STEP 4: PUBLISH site using site-builder CLI")
-        try:
-            epochs = attributes["epochs"]
-            if "site_id" not in attributes or attributes["site_id"] is None:
-                result = subprocess.run(
-                    ["site-builder", "publish", site_name, "--epochs", epochs],
-                    check=True, capture_output=True, text=True
-                )
-
-                output = result.stdout
-
-                # ใช้ regex เพื่อดึง site object ID
-                match = re.search(r"New site object ID:\s+(0x[a-fA-F0-9]+)", output)
-                if match:
-                    site_id = match.group(1)
-                    print(f"✅ STEP 4 DONE: Site published with site-builder in ./{site_name}")
-                    print(f"🆔 Site ID: {site_id}")
-                else:
-                    raise ValueError("Site ID not found in the output.")
-            else :
-                site_id = attributes["site_id"]
-                subprocess.run(
-                    ["site-builder", "update",  "--epochs", epochs, site_name, site_id],
-                    check=True, capture_output=True, text=True
-                )
-
-            site_status = "1"
+        attributes = state["attributes"]
+        site_name = state["site_name"]
+        epochs = attributes["epochs"]
+        if state["unchanged"]:
+            state["site_id"] = attributes["site_id"]
+            print(f"⏭️ STEP 4 SKIPPED: Site {state['site_id']} content is unchanged")
+        elif "site_id" not in attributes or attributes["site_id"] is None:
+            state["site_id"] = await walrus_cli.publish_site_async(site_name, epochs)
+            print(f"✅ STEP 4 DONE: Site published with site-builder in ./{site_name}")
+            print(f"🆔 Site ID: {state['site_id']}")
+        else :
+            state["site_id"] = attributes["site_id"]
+            await walrus_cli.update_site_async(site_name, state["site_id"], epochs)
 
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Site update failed during publishing."
-            raise RuntimeError(f"STEP 4 Error: {e.stderr or e.stdout or str(e)}")
-        
-
-    except subprocess.CalledProcessError as e:
-        description = f"Subprocess error: {e.stderr or str(e)}"
-        if not client_error_description:
-            client_error_description = "Internal system error. Please try again later."
-        print("❌ Error:", description)
-    except Exception as e:
-        description = str(e)
-        if not client_error_description:
-            client_error_description = "Unexpected error occurred. Please try again later."
-        print("❌ Error:", description)
-    finally:
-        print("🔹 LAST STEP: Updating blob attributes...")
-        attr_command = [
-            "walrus", "set-blob-attribute", object_id,
-            "--attr", "site_status", site_status,
-            "--attr", "client_error_description", client_error_description
-        ]
-        if site_status == "1":
-            attr_command += ["--attr", "site_id", site_id]
+        state["site_status"] = "1"
 
-        try:
-            subprocess.run(attr_command, check=True, capture_output=True, text=True)
-            print("✅ LAST STEP DONE: Blob attributes updated.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ LAST STEP FAILED Cannot update blob attributes:", e.stderr or str(e))
+    @pipeline.on_error
+    def record_error(e):
+        state["client_error_description"] = client_error_for(e)
+
+    @pipeline.finally_step
+    def write_attributes():
+        # attribute ถูกเขียนจริงตอนจบ operation (walrus_cli.attribute_batch) ซึ่ง log ผลเอง
+        print("🔹 LAST STEP: Queue blob attributes...")
+        attrs = {
+            "site_status": state["site_status"],
+            "client_error_description": state["client_error_description"],
+        }
+        if state["site_status"] == "1":
+            attrs["site_id"] = state["site_id"]
+            attrs["site_digest"] = state["digest"]
+            attrs["site_blob_id"] = state["attributes"]["blobId"]
+            attrs["site_epochs"] = state["attributes"]["epochs"]
+
+        walrus_cli.set_blob_attributes(object_id, attrs)
+        print("✅ LAST STEP DONE: Blob attributes queued.")
+
+        if state["site_status"] == "1" and state["files"] is not None:
+            try:
+                save_manifest(object_id, state["files"], state["digest"],
+                              state["attributes"]["blobId"], state["site_id"])
+            except Exception as e:
+                print(f"⚠️ Cannot save site manifest:", str(e))
+
+    pipeline.run()
+
+
+def deployed(attributes):
+    # เว็บที่ site-builder สร้างสำเร็จแล้ว จึง update ซ้ำได้
+    return attributes.get("site_id") is not None and attributes.get("site_status") == "1"
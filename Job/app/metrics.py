@@ -0,0 +1,148 @@
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# ไฟล์ Prometheus textfile (node_exporter textfile collector) ที่เขียนตอนจบ operation (ว่าง = ไม่เขียน)
+METRICS_FILE = os.environ.get("JOB_METRICS_FILE", "")
+# ปิด JSON log ของแต่ละ step ได้ด้วย JOB_METRICS_LOG=0
+LOG_ENABLED = os.environ.get("JOB_METRICS_LOG", "1") != "0"
+PREFIX = "ivory_job"
+
+_lock = threading.Lock()
+# {(operation, step): record} เก็บค่าล่าสุดของแต่ละ step (gauge) จึงไม่โตขึ้นเรื่อย ๆ ใน server mode
+_latest = {}
+_commands = {}
+# ค่าเพิ่มเติมของ step ที่กำลังรัน (เช่น archive_bytes) ส่งต่อไปยัง asyncio task และ thread ผ่าน context
+_current = contextvars.ContextVar("metrics_step", default=None)
+
+
+def _io_bytes():
+    # rchar/wchar ของ process (รวม pipe/socket), ไม่มี /proc ใช้จำนวน block จาก getrusage แทน
+    try:
+        with open("/proc/self/io") as f:
+            values = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(values["rchar"]), int(values["wchar"])
+    except (OSError, KeyError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+def _snapshot():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    read_bytes, written_bytes = _io_bytes()
+    return {
+        "wall": time.monotonic(),
+        "child_cpu": children.ru_utime + children.ru_stime,
+        "read": read_bytes,
+        "written": written_bytes,
+    }
+
+
+def _peak_rss():
+    # ru_maxrss เป็น KiB บน Linux
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024)
+
+
+def add_value(key, value):
+    # เพิ่มค่าให้ step ที่กำลังรันอยู่ (ไม่มี step = ไม่บันทึก)
+    values = _current.get()
+    if values is not None:
+        values[key] = values.get(key, 0) + value
+
+
+def add_file_size(key, path):
+    try:
+        add_value(key, os.path.getsize(path))
+    except OSError:
+        pass
+
+
+@contextmanager
+def measure(operation, step):
+    # ตัวนับ CPU/I/O เป็นของทั้ง process: step ที่รันพร้อมกันจะเห็นค่าที่ซ้อนกัน
+    values = {}
+    token = _current.set(values)
+    started = _snapshot()
+    ok = False
+    try:
+        yield values
+        ok = True
+    finally:
+        _current.reset(token)
+        ended = _snapshot()
+        peak_rss, child_peak_rss = _peak_rss()
+        record = {
+            "operation": operation,
+            "step": step,
+            "ok": ok,
+            "wall_seconds": round(ended["wall"] - started["wall"], 6),
+            "child_cpu_seconds": round(ended["child_cpu"] - started["child_cpu"], 6),
+            "read_bytes": ended["read"] - started["read"],
+            "written_bytes": ended["written"] - started["written"],
+            "peak_rss_bytes": peak_rss,
+            "child_peak_rss_bytes": child_peak_rss,
+            **values,
+        }
+        with _lock:
+            _latest[(operation, step)] = record
+        log("job_step", record)
+
+
+def record_commands(operation, stats):
+    # stats จาก walrus_cli.command_stats()
+    with _lock:
+        for command, values in stats.items():
+            _commands[(operation, command)] = dict(values)
+    log("job_commands", {"operation": operation, "commands": stats})
+
+
+def log(kind, record):
+    if LOG_ENABLED:
+        print(json.dumps({"severity": "INFO", "message": f"{kind} {record.get('operation')}",
+                          "metric": kind, **record}), flush=True)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render():
+    with _lock:
+        steps = [dict(record) for record in _latest.values()]
+        commands = {key: dict(values) for key, values in _commands.items()}
+
+    gauges = {}
+    for record in steps:
+        labels = f'operation="{_label(record["operation"])}",step="{_label(record["step"])}"'
+        for key, value in record.items():
+            if key in ("operation", "step") or not isinstance(value, (int, float)):
+                continue
+            gauges.setdefault(f"{PREFIX}_step_{key}", []).append((labels, float(value)))
+    for (operation, command), values in commands.items():
+        labels = f'operation="{_label(operation)}",command="{_label(command)}"'
+        for key, value in values.items():
+            gauges.setdefault(f"{PREFIX}_command_{key}", []).append((labels, float(value)))
+
+    lines = []
+    for name in sorted(gauges):
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in gauges[name]:
+            lines.append(f"{name}{{{labels}}} {value:g}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path=None):
+    path = path or METRICS_FILE
+    if not path:
+        return
+    # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อไม่ให้ collector อ่านไฟล์ที่เขียนไม่เสร็จ
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
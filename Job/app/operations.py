@@ -0,0 +1,252 @@
+from publish import publish_walrus_site, publish_walrus_sites
+from get_site_id import get_site_id
+from delete_site import dlete_walrus_site, dlete_walrus_sites
+from Set_Zero import set_zero
+from shard_showcase import retire_legacy_showcase, shard_showcase
+from site_registry import register_sites, tracked_sites
+from sweep_expired import EXPIRED_DESCRIPTION, find_expired_sites, find_published_sites
+from clients import get_firestore_client
+from extend import extend_blobs, parse_extend_args
+from shards import REFERENCE_DOCUMENT, SHOWCASE_COLLECTION, load_shard_count, shard_document, shard_for
+import checkpoint
+import metrics
+import walrus_cli
+import workspace
+import os
+import json
+
+KEYSTORE_PATH = "/root/.sui/sui_config/sui.keystore"
+
+# operation ที่ต้องมี object_id
+OBJECT_OPERATIONS = {
+    "publish": "publish",
+    "get_site_id": "get site id",
+    "delete_site": "delete site",
+    "publish_batch": "batch publish",
+    "delete_batch": "batch delete",
+    "shard_showcase": "shard showcase",
+}
+# sweep_expired: object_id (ไม่บังคับ) คือรายการ blob ที่จะตรวจ ถ้าไม่มีจะตรวจทุกเว็บใน showcase-sites
+# extend: object_id (ไม่บังคับ) คือ "[epochs] [object_id ...]" ต่ออายุ showcase และ blob ที่ระบุ
+# backfill_registry: ลงทะเบียนเว็บที่อยู่ใน showcase ก่อนมี showcase-sites (รันครั้งเดียว ซ้ำได้)
+# retire_legacy_showcase: เลิกใช้ showcase เดียวแบบเดิม หลังแยก shard และตรวจ shard แล้ว
+OPERATIONS = set(OBJECT_OPERATIONS) | {
+    "set_zero", "sweep_expired", "extend", "backfill_registry", "retire_legacy_showcase",
+}
+# operation ที่แก้ showcase: เมื่อแยก shard แล้วต้องทำทีละ shard ของ blob
+SHOWCASE_OPERATIONS = {"publish", "delete_site", "publish_batch", "delete_batch"}
+
+
+def write_keystore():
+    # ✅ อ่าน keystore จาก environment
+    keystore_content = os.environ.get("SUI_KEYSTORE_CONTENT")
+    if keystore_content:
+        try:
+            os.makedirs(os.path.dirname(KEYSTORE_PATH), exist_ok=True)
+            with open(KEYSTORE_PATH, "w") as f:
+                json.dump([keystore_content], f, indent=2)
+            print("✅ sui.keystore created successfully.")
+        except Exception as e:
+            print(f"❌ Failed to write keystore: {e}")
+
+
+def load_showcase_reference(document=REFERENCE_DOCUMENT):
+    showcase_blob_id = None
+    showcase_obj_id = None
+    data = {}
+
+    db = get_firestore_client()
+    doc_ref = db.collection(SHOWCASE_COLLECTION).document(document)
+    doc = doc_ref.get()
+
+    if doc.exists:
+        data = doc.to_dict()
+        showcase_blob_id = data.get("BlobID", "❌ ไม่มี BlobID")
+        showcase_obj_id = data.get("ObjID", "❌ ไม่มี ObjID")
+
+        print(f"📄 Document ID: {doc.id}")
+        print(f"   BlobID: {showcase_blob_id}")
+        print(f"   ObjID: {showcase_obj_id}")
+        if data.get("SiteID"):
+            print(f"   SiteID: {data['SiteID']}")
+        print(f"   Version: {data.get('Version', 0)}")
+    else:
+        print(f"❌ Document '{document}' ไม่พบใน collection '{SHOWCASE_COLLECTION}'")
+
+    return showcase_obj_id, showcase_blob_id, data
+
+
+def parse_object_ids(value):
+    # รับได้ทั้ง list (จาก JSON payload) และ string คั่นด้วย comma/ช่องว่าง
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v for v in (value or "").replace(",", " ").split() if v]
+
+
+def validate_operation(operation, object_id):
+    if operation not in OPERATIONS:
+        return f"Unknown operation: {operation}"
+    if operation in OBJECT_OPERATIONS and not object_id:
+        return f"Missing object_id for {OBJECT_OPERATIONS[operation]} operation."
+    if operation == "shard_showcase" and not str(object_id).isdigit():
+        return f"Invalid shard count: {object_id}"
+    return None
+
+
+def run_operation(operation, object_id):
+    error = validate_operation(operation, object_id)
+    if error:
+        print(f"❌ {error}")
+        return False
+
+    with walrus_cli.command_stats() as stats:
+        try:
+            run_in_scope(operation, object_id)
+        finally:
+            metrics.record_commands(operation, stats)
+            metrics.write_textfile()
+    return True
+
+
+def run_in_scope(operation, object_id):
+    # ไฟล์ทั้งหมดของ operation อยู่ใน workspace ของตัวเอง และถูกลบเมื่อจบ
+    # blob attribute ที่ทุกขั้นเขียน (เช่น publish แล้ว get_site_id) รวมเป็น set-blob-attribute เดียวตอนจบ
+    # cache ของ blob attribute ใช้ได้แค่ภายใน operation เดียว
+    with metrics.measure(operation, "total"), workspace.scope(), walrus_cli.attribute_cache(), \
+            walrus_cli.attribute_batch(), checkpoint.scope() as left:
+        dispatch_operation(operation, object_id)
+    # fail หลัง store showcase แล้ว: ให้ Cloud Tasks retry แล้วทำต่อจาก checkpoint
+    if left:
+        raise checkpoint.ResumableError(
+            f"{operation} failed after {len(left)} checkpoint(s), retry to resume.")
+
+
+def group_by_shard(object_ids, shard_count):
+    # owner อ่านจาก blob attribute (cache ภายใน operation จึงไม่อ่านซ้ำตอน publish/delete)
+    groups = {}
+    for object_id in object_ids:
+        try:
+            index = shard_for(walrus_cli.get_blob_attributes(object_id)["owner"], shard_count)
+        except Exception as e:
+            # publish/delete ของ shard แรกจะบันทึก error ของ blob นี้เอง
+            print(f"⚠️ Cannot find shard of {object_id}:", str(e))
+            index = 0
+        groups.setdefault(index, []).append(object_id)
+    return groups
+
+
+def dispatch_sharded(operation, object_ids, shard_count, **delete_options):
+    # แต่ละ shard มี reference ของตัวเอง: job ที่แก้คนละ shard จึงไม่ชนกัน
+    for index, shard_object_ids in sorted(group_by_shard(object_ids, shard_count).items()):
+        document = shard_document(index)
+        with metrics.measure(operation, "load_showcase_reference"):
+            showcase_obj_id, showcase_blob_id, data = load_showcase_reference(document)
+        site_id = data.get("SiteID")
+
+        if operation in ("publish", "publish_batch"):
+            if not data.get("URL"):
+                # ไม่มี URL ของ shard: ลิงก์ของเว็บจะชี้ไปที่ showcase เดิมที่ไม่ถูกอัปเดตแล้ว
+                print(f"❌ Showcase shard '{document}' has no URL, "
+                      f"not publishing {len(shard_object_ids)} site(s)")
+                for object_id in shard_object_ids:
+                    walrus_cli.set_blob_attributes(object_id, {
+                        "status": "2",
+                        "client_error_description": "Internal error. Please try again later.",
+                    })
+                continue
+            publish_walrus_sites(shard_object_ids, showcase_obj_id, showcase_blob_id,
+                                 showcase_site_id=site_id, document=document,
+                                 showcase_base_url=data["URL"])
+        else:
+            dlete_walrus_sites(shard_object_ids, showcase_obj_id, showcase_blob_id,
+                               showcase_site_id=site_id, document=document, **delete_options)
+
+
+def sweep_expired_sites(object_id, shard_count):
+    # เอาเว็บที่หมดอายุออกจาก showcase ในการ rebuild ครั้งเดียว (ต่อ shard) และตั้ง status ของแต่ละ blob
+    object_ids = parse_object_ids(object_id)
+    if not object_ids:
+        with metrics.measure("sweep_expired", "load_tracked_sites"):
+            object_ids = tracked_sites()
+
+    try:
+        with metrics.measure("sweep_expired", "scan"):
+            expired = find_expired_sites(object_ids)
+    except Exception as e:
+        print("❌ Error: Cannot scan for expired sites:", str(e))
+        return
+    if not expired:
+        return
+
+    # site ของผู้ใช้หมดอายุไปพร้อม blob แล้ว จึงไม่ต้อง destroy/burn
+    delete_options = {"destroy_resources": False, "reason": EXPIRED_DESCRIPTION}
+    if shard_count:
+        dispatch_sharded("delete_batch", expired, shard_count, **delete_options)
+        return
+    with metrics.measure("sweep_expired", "load_showcase_reference"):
+        showcase_obj_id, showcase_blob_id, _ = load_showcase_reference()
+    dlete_walrus_sites(expired, showcase_obj_id, showcase_blob_id, **delete_options)
+
+
+def backfill_registry():
+    with metrics.measure("backfill_registry", "scan"):
+        published = find_published_sites()
+    with metrics.measure("backfill_registry", "register_sites"):
+        register_sites(published)
+    print(f"✅ Registered {len(published)} site(s) in showcase-sites")
+
+
+def extend_showcase_and_sites(value, shard_count):
+    epochs, object_ids = parse_extend_args(value)
+    # showcase เดิมยังถูกต่ออายุจนกว่าจะ retire_legacy_showcase (ลบ document 'reference' แล้ว)
+    documents = [shard_document(index) for index in range(shard_count)] + [REFERENCE_DOCUMENT]
+    showcase_object_ids = []
+    with metrics.measure("extend", "load_showcase_reference"):
+        for document in documents:
+            showcase_obj_id, _, _ = load_showcase_reference(document)
+            if showcase_obj_id is not None:
+                showcase_object_ids.append(showcase_obj_id)
+    extend_blobs(epochs, object_ids, showcase_object_ids)
+
+
+def dispatch_operation(operation, object_id):
+    with metrics.measure(operation, "load_shard_count"):
+        shard_count = load_shard_count()
+    if operation == "backfill_registry":
+        backfill_registry()
+        return
+    if operation == "extend":
+        extend_showcase_and_sites(object_id, shard_count)
+        return
+    if operation == "sweep_expired":
+        sweep_expired_sites(object_id, shard_count)
+        return
+    if shard_count and operation in SHOWCASE_OPERATIONS:
+        dispatch_sharded(operation, parse_object_ids(object_id), shard_count)
+        return
+    if shard_count and operation == "set_zero":
+        # set_zero รีเซ็ตได้เฉพาะ showcase เดียวแบบเดิม (burn-blobs --all จะ burn blob ของทุก shard)
+        print(f"❌ set_zero is not supported after the showcase is split into {shard_count} shards")
+        return
+
+    # showcase reference เปลี่ยนทุกครั้งที่ publish/delete จึงต้องอ่านใหม่ทุก operation
+    with metrics.measure(operation, "load_showcase_reference"):
+        showcase_obj_id, showcase_blob_id, _ = load_showcase_reference()
+
+    # ✅ ทำตาม operation
+    if operation == "publish":
+        publish_walrus_site(object_id, showcase_obj_id, showcase_blob_id)
+    elif operation == "get_site_id":
+        get_site_id(object_id)
+    elif operation == "delete_site":
+        dlete_walrus_site(object_id, showcase_obj_id, showcase_blob_id)
+    elif operation == "publish_batch":
+        publish_walrus_sites(parse_object_ids(object_id), showcase_obj_id, showcase_blob_id)
+    elif operation == "delete_batch":
+        dlete_walrus_sites(parse_object_ids(object_id), showcase_obj_id, showcase_blob_id)
+    elif operation == "set_zero":
+        set_zero(showcase_obj_id, showcase_blob_id)
+    elif operation == "shard_showcase":
+        shard_showcase(int(object_id), showcase_obj_id, showcase_blob_id)
+    elif operation == "retire_legacy_showcase":
+        retire_legacy_showcase(showcase_obj_id, showcase_blob_id)
@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import metrics
+import workspace
+from errors import StepError, client_error_for, describe_error
+
+
+class Rerun(StepError):
+    # ขอให้รันขั้น step และทุกขั้นที่ขึ้นกับมันใหม่ (เช่น showcase ถูก job อื่นเปลี่ยนไประหว่างทำงาน)
+    # ถ้าเกิน max_reruns จะกลายเป็น error ปกติ
+    def __init__(self, step, message, client_error_description=""):
+        super().__init__(message, client_error_description)
+        self.step = step
+
+
+class Step:
+    def __init__(self, name, func, requires, client_error_description, checkpoint=False):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.client_error_description = client_error_description
+        self.checkpoint = checkpoint
+
+
+async def _call(func, *args):
+    # ขั้นแบบ async (asyncio subprocess) รันใน event loop, ขั้นปกติ (งาน I/O ที่ block) รันใน thread
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+class Pipeline:
+    # ขั้นตอนของ operation ที่ประกาศพร้อม dependency: ขั้นที่ไม่ขึ้นต่อกันรันพร้อมกันเสมอ
+    # ขั้นแรกที่ fail จะยกเลิกขั้นที่เหลือ ส่ง error ให้ on_error แล้วรัน finally_step ทุกครั้ง
+    # name คือชื่อ operation ที่ใช้เป็น label ของ metrics แต่ละขั้น
+    # checkpoint (checkpoint.Checkpoint): บันทึกผลของขั้นที่ประกาศ checkpoint=True
+    # ถ้ามี checkpoint ค้างจากครั้งก่อน ขั้นนั้นและทุกขั้นก่อนหน้าถือว่าสำเร็จแล้ว ไม่รันซ้ำ
+
+    def __init__(self, name, max_reruns=0, checkpoint=None):
+        self.name = name
+        self.max_reruns = max_reruns
+        self.checkpoint = checkpoint
+        self.steps = {}
+        self.results = {}
+        # ขั้นที่ไม่ได้รันเพราะ resume จาก checkpoint
+        self.restored = set()
+        self.error_handlers = []
+        self.finalizers = []
+
+    def step(self, name, requires=(), client_error_description="", checkpoint=False):
+        # dependency ต้องประกาศก่อนเสมอ จึงไม่มีวงวน
+        def register(func):
+            unknown = [dep for dep in requires if dep not in self.steps]
+            if unknown:
+                raise ValueError(f"Unknown step(s) required by {name}: {', '.join(unknown)}")
+            self.steps[name] = Step(name, func, requires, client_error_description, checkpoint)
+            return func
+        return register
+
+    def on_error(self, func):
+        self.error_handlers.append(func)
+        return func
+
+    def finally_step(self, func):
+        self.finalizers.append(func)
+        return func
+
+    def run(self):
+        # คืนค่า error ของขั้นที่ fail (StepError) หรือ None ถ้าสำเร็จทุกขั้น
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        error = None
+        try:
+            if self.checkpoint is not None:
+                await asyncio.to_thread(self.restore)
+            await self._run_steps()
+            if self.checkpoint is not None:
+                await asyncio.to_thread(self.clear_checkpoint)
+        except Exception as e:
+            error = e
+            print("❌ Error:", describe_error(e))
+            for handler in self.error_handlers:
+                await _call(handler, e)
+        finally:
+            with metrics.measure(self.name, "finally"):
+                for func in self.finalizers:
+                    await _call(func)
+        return error
+
+    def restore(self):
+        try:
+            saved = {name: result for name, result in self.checkpoint.load().items()
+                     if name in self.steps}
+        except Exception as e:
+            print(f"⚠️ Cannot load checkpoint of {self.name}:", describe_error(e))
+            return
+        if not saved:
+            return
+        self.results.update(saved)
+        self.restored = set(saved) | self.ancestors(saved)
+        print(f"⏩ Resuming {self.name} after {', '.join(saved)}")
+
+    def save_checkpoint(self):
+        # checkpoint เป็นแค่ทางลัดตอน retry: บันทึกไม่สำเร็จก็ทำงานต่อได้
+        try:
+            self.checkpoint.save({name: self.results[name] for name, step in self.steps.items()
+                                  if step.checkpoint and name in self.results})
+        except Exception as e:
+            print(f"⚠️ Cannot save checkpoint of {self.name}:", describe_error(e))
+
+    def clear_checkpoint(self):
+        try:
+            self.checkpoint.clear()
+        except Exception as e:
+            print(f"⚠️ Cannot clear checkpoint of {self.name}:", describe_error(e))
+
+    async def _run_step(self, step):
+        try:
+            with metrics.measure(self.name, step.name):
+                self.results[step.name] = await _call(step.func)
+            if workspace.QUOTA_BYTES:
+                await asyncio.to_thread(workspace.check_quota)
+            if step.checkpoint and self.checkpoint is not None:
+                await asyncio.to_thread(self.save_checkpoint)
+        except StepError:
+            raise
+        except Exception as e:
+            # จุดเดียวที่แปลง error ของแต่ละขั้นเป็น client_error_description
+            raise StepError(f"STEP {step.name} Error: {describe_error(e)}",
+                            step.client_error_description or client_error_for(e)) from e
+
+    def dependents(self, name):
+        # ขั้น name และทุกขั้นที่ขึ้นกับมัน (steps เรียงตามลำดับประกาศ จึงไล่ครั้งเดียวพอ)
+        found = {name}
+        for step in self.steps.values():
+            if any(dep in found for dep in step.requires):
+                found.add(step.name)
+        return found
+
+    def ancestors(self, names):
+        # ทุกขั้นที่ขั้นใน names ขึ้นกับ (ทางตรงหรือทางอ้อม)
+        found = set()
+        stack = list(names)
+        while stack:
+            for dep in self.steps[stack.pop()].requires:
+                if dep not in found:
+                    found.add(dep)
+                    stack.append(dep)
+        return found
+
+    async def _run_steps(self):
+        waiting = {name: step for name, step in self.steps.items() if name not in self.restored}
+        running = {}
+        done = set(self.restored)
+        reruns = 0
+
+        while waiting or running:
+            for name, step in list(waiting.items()):
+                if all(dep in done for dep in step.requires):
+                    running[asyncio.create_task(self._run_step(step))] = name
+                    del waiting[name]
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            rerun = None
+            for task in finished:
+                name = running.pop(task)
+                error = task.exception()
+                if error is None:
+                    done.add(name)
+                elif isinstance(error, Rerun) and rerun is None and reruns < self.max_reruns:
+                    rerun = error
+                else:
+                    for other in running:
+                        other.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                    raise error
+
+            if rerun is not None:
+                reruns += 1
+                again = self.dependents(rerun.step)
+                # ขั้นที่ข้ามไปตอน resume ไม่มีไฟล์ใน workspace นี้ ต้องรันจริงก่อน
+                again |= self.ancestors(again) & self.restored
+                self.restored -= again
+                for name in again:
+                    self.results.pop(name, None)
+                print(f"🔁 {rerun} Rerunning from {rerun.step} ({reruns}/{self.max_reruns})")
+                stale = [task for task, name in running.items() if name in again]
+                for task in stale:
+                    task.cancel()
+                    del running[task]
+                await asyncio.gather(*stale, return_exceptions=True)
+                done -= again
+                waiting.update((name, self.steps[name]) for name in again)
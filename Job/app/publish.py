@@ -1,258 +1,298 @@
+import asyncio
 import shutil
 import subprocess
-import zipfile, os
-from google.cloud import firestore
+import os
+import content_store
+import metrics
+import walrus_cli
+import workspace
+from archive import ArchiveLimitError, UnsafeArchiveError, describe_extract, extract_archive
+from checkpoint import Checkpoint
+from errors import StepError, client_error_for, describe_error
 from get_site_id import get_site_id
+from pipeline import Pipeline
+from shards import REFERENCE_DOCUMENT
+from site_registry import register_sites
+from showcase import (
+    NEW_SHOWCASE_ZIP, SHOWCASE_BASE_URL, SHOWCASE_MAX_REBASES, SHOWCASE_SITE_ID, ShowcaseConflict,
+    check_showcase_reference, delete_showcase_blob, download_showcase, prepare_showcase_archive,
+    rebase_showcase, store_showcase, sync_showcase_site, update_showcase_reference,
+)
+
+REQUIRED_ATTRIBUTES = [
+    "site-name", "owner", "epochs",
+    "start_date", "end_date", "status", "blobId"
+]
+# โฟลเดอร์พักไฟล์เว็บของผู้ใช้ (แยกตามลำดับ blob กันชื่อซ้ำ) อยู่จนจบ job เพื่อใส่ซ้ำตอน rebase
+# และส่งต่อให้ get_site_id
+STAGING_DIR = "staging"
+SHOWCASE_SITE_NAME = "Site"
+# ไฟล์ที่ site-builder เขียนทับในโฟลเดอร์เว็บ จึงต้องคัดลอกจริง ไม่ใช้ hardlink
+WS_RESOURCES = "ws-resources.json"
+# จำนวน walrus read/แตกไฟล์ (และคำสั่ง walrus/site-builder ต่อ blob) ที่ทำพร้อมกันได้
+IO_CONCURRENCY = int(os.environ.get("JOB_IO_CONCURRENCY", "4"))
 
-def publish_walrus_site(object_id, showcase_obj_id, showcase_blob_id):
-    status = "2"  # Default status
-    client_error_description = ""
-    showcase_url = ""
-    showcase_site_id = "0x8ea2941b08cad8b5b667fab8cffc26d4fc8bdaa00366e9d2e0dd233f46ee84bc"
 
-    try:
-        # STEP 0: Check arguments
-        if showcase_blob_id is None or showcase_obj_id is None:
-            client_error_description = "Internal error. Please try again later."
-            description = "Can't get showcase info"
-            raise ValueError(description)
+def publish_walrus_site(object_id, showcase_obj_id, showcase_blob_id):
+    publish_walrus_sites([object_id], showcase_obj_id, showcase_blob_id)
 
-        # STEP 1: Get blob attributes
-        print("🔹 STEP 1: Get blob attributes from " + object_id)
-        try:
-            result = subprocess.run(
-                ["walrus", "get-blob-attribute", object_id],
-                check=True, capture_output=True, text=True
-            )
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Unable to retrieve project information."
-            raise RuntimeError(f"STEP 1 Error: {e.stderr or e.stdout or str(e)}")
-
-        attributes = {}
-        for line in result.stdout.strip().splitlines():
-            if ':' in line:
-                key, value = line.split(':', 1)
-                attributes[key.strip()] = value.strip()
-        print("✅ STEP 1 DONE: Attributes loaded.")
-
-        # STEP 2: Check blob attributes
-        print("🔹 STEP 2: Validate required blob attributes")
-        required_attributes = [
-            "site-name", "owner", "epochs",
-            "start_date", "end_date", "status", "blobId"
-        ]
-        missing = [attr for attr in required_attributes if attr not in attributes]
-        if missing:
-            client_error_description = "Internal error. Please try again later."
-            description = f"Missing required attribute(s): {', '.join(missing)}"
-            raise ValueError(description)
-        print("✅ STEP 2 DONE: All required attributes are present.")
-
-        # STEP 3: READ STATIC FILE AND EXTRACT IT
-        print("🔹 STEP 3: Read static file and extract it")
-        blob_id = attributes["blobId"]
-        site_name = attributes["site-name"]
-        zip_filename = f"{site_name}.zip"
 
-        try:
-            subprocess.run(
-                ["walrus", "read", blob_id, "--out", zip_filename],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 3.1 DONE: Downloaded blob as {zip_filename}")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to download the site file."
-            raise RuntimeError(f"STEP 3.1 Error: {e.stderr or e.stdout or str(e)}")
+def load_blob_attributes(object_id):
+    # STEP 1: Get blob attributes
+    print("🔹 STEP 1: Get blob attributes from " + object_id)
+    try:
+        attributes = walrus_cli.get_blob_attributes(object_id)
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP 1 Error: {describe_error(e)}",
+                        "Unable to retrieve project information.")
+    print("✅ STEP 1 DONE: Attributes loaded.")
+
+    # STEP 2: Check blob attributes
+    print("🔹 STEP 2: Validate required blob attributes")
+    missing = [attr for attr in REQUIRED_ATTRIBUTES if attr not in attributes]
+    if missing:
+        raise StepError(f"Missing required attribute(s): {', '.join(missing)}",
+                        "Internal error. Please try again later.")
+    print("✅ STEP 2 DONE: All required attributes are present.")
+    return attributes
+
+
+def download_site(attributes, staging_dir):
+    # STEP 3: READ STATIC FILE AND EXTRACT IT
+    print("🔹 STEP 3: Read static file and extract it")
+    blob_id = attributes["blobId"]
+    site_name = attributes["site-name"]
+    zip_filename = os.path.join(staging_dir, f"{site_name}.zip")
+    site_dir = os.path.join(staging_dir, site_name)
 
-        try:
-            os.makedirs(site_name, exist_ok=True)
-            with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(site_name)
-            print(f"✅ STEP 3.2 DONE: Extracted to ./{site_name}")
-        except Exception as e:
-            client_error_description = "Failed to extract the site zip file."
-            raise RuntimeError(f"STEP 3.2 Error: {str(e)}")
+    try:
+        os.makedirs(staging_dir, exist_ok=True)
+        walrus_cli.read_blob(blob_id, zip_filename)
+        metrics.add_file_size("archive_bytes", zip_filename)
+        print(f"✅ STEP 3.1 DONE: Downloaded blob as {zip_filename}")
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP 3.1 Error: {describe_error(e)}",
+                        "Failed to download the site file.")
 
-        # STEP 4: READ SHOWCASE FILE AND EXTRACT IT
+    try:
+        os.makedirs(site_dir, exist_ok=True)
+        stats = extract_archive(zip_filename, site_dir)
+        metrics.add_value("extracted_bytes", stats["bytes"])
+        print(f"✅ STEP 3.2 DONE: Extracted to ./{site_dir} ({describe_extract(stats)})")
+    except ArchiveLimitError as e:
+        raise StepError(f"STEP 3.2 Error: {str(e)}", "The site file is too large.")
+    except UnsafeArchiveError as e:
+        raise StepError(f"STEP 3.2 Error: {str(e)}", "The site file contains invalid paths.")
+    except Exception as e:
+        raise StepError(f"STEP 3.2 Error: {str(e)}",
+                        "Failed to extract the site zip file.")
+
+    # ไฟล์ที่มีอยู่แล้วใน showcase (framework bundle, font, รูป) จะเป็น hardlink แทนสำเนาใหม่
+    content_store.dedupe_tree(site_dir)
+    return site_dir
+
+
+def snapshot_site(site_dir, snapshot_dir):
+    # สำเนาแบบ hardlink: ไม่คัดลอกข้อมูล ยกเว้นไฟล์ที่ site-builder จะเขียนทับ
+    def link_or_copy(src, dst):
+        if os.path.basename(src) != WS_RESOURCES:
+            try:
+                os.link(src, dst)
+                return dst
+            except OSError:
+                pass
+        return shutil.copy2(src, dst)
+
+    shutil.copytree(site_dir, snapshot_dir, copy_function=link_or_copy)
+    return snapshot_dir
+
+
+def publish_walrus_sites(object_ids, showcase_obj_id, showcase_blob_id,
+                         showcase_site_id=SHOWCASE_SITE_ID, document=REFERENCE_DOCUMENT,
+                         showcase_base_url=SHOWCASE_BASE_URL):
+    # showcase_site_id/document/showcase_base_url: showcase (shard) ที่เว็บเหล่านี้อยู่
+    # ผลลัพธ์แยกตาม blob เพื่อเขียน attribute ของแต่ละ blob เองตอนจบ
+    results = {
+        object_id: {"status": "2", "client_error_description": "", "showcase_url": ""}
+        for object_id in object_ids
+    }
+    attributes_by_id = {}
+    staged = {}
+    # attribute ที่เขียนสำเร็จตอนจบ สำหรับส่งต่อให้ get_site_id
+    written = {}
+    # blob ที่ยังอยู่ในรอบ publish นี้ (error ของ showcase จะถูกบันทึกให้ทุกตัวในนี้)
+    pending = list(object_ids)
+    showcase_root = workspace.path(SHOWCASE_SITE_NAME)
+    staging_root = workspace.path(STAGING_DIR)
+    # showcase ที่ใช้เป็นฐาน เปลี่ยนเมื่อ rebase
+    base = {"blob_id": showcase_blob_id, "obj_id": showcase_obj_id}
+    # ค่าที่ขั้นหลัง store ใช้ บันทึกไว้พร้อม checkpoint เพื่อทำต่อได้ตอน retry
+    checkpoint = Checkpoint("publish", object_ids, document, {
+        "results": results, "attributes": attributes_by_id, "pending": pending, "base": base,
+    })
+    pipeline = Pipeline("publish", max_reruns=SHOWCASE_MAX_REBASES, checkpoint=checkpoint)
+
+    def site_prefix(object_id):
+        attributes = attributes_by_id[object_id]
+        return f"{attributes['owner']}/{attributes['site-name']}"
+
+    @pipeline.step("check")
+    def check():
+        # STEP 0: Check arguments
+        if showcase_blob_id is None or showcase_obj_id is None:
+            raise StepError("Can't get showcase info", "Internal error. Please try again later.")
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    @pipeline.step("stage_sites", requires=["check"])
+    async def stage_sites():
+        # STEP 1-3: เตรียมเว็บของแต่ละ blob พร้อมกัน (blob ที่ fail จะถูกตัดออก ไม่กระทบตัวอื่น)
+        slots = asyncio.Semaphore(IO_CONCURRENCY)
+
+        def stage_site(object_id, staging_dir):
+            attributes = load_blob_attributes(object_id)
+            attributes_by_id[object_id] = attributes
+            staged[object_id] = download_site(attributes, staging_dir)
+
+        async def stage_site_limited(object_id, staging_dir):
+            async with slots:
+                await asyncio.to_thread(stage_site, object_id, staging_dir)
+
+        outcomes = await asyncio.gather(*[
+            stage_site_limited(object_id, os.path.join(staging_root, str(index)))
+            for index, object_id in enumerate(object_ids)
+        ], return_exceptions=True)
+        for object_id, outcome in zip(object_ids, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ Error ({object_id}):", describe_error(outcome))
+                results[object_id]["client_error_description"] = client_error_for(outcome)
+
+        pending[:] = [object_id for object_id in object_ids if object_id in staged]
+        if not pending:
+            raise StepError("No site to publish.")
+
+    @pipeline.step("download_showcase", requires=["check"])
+    def fetch_showcase():
+        # STEP 4: READ SHOWCASE FILE AND EXTRACT IT (พร้อมกับเตรียมเว็บของผู้ใช้)
         print("🔹 STEP 4: Read SHOWCASE file and extract it")
-        if site_name == "site":
-            showcase_site_name = "Site"
-        else:
-            showcase_site_name = "site"
-        showcase_zip_filename = f"{showcase_site_name}.zip"
+        download_showcase(base["blob_id"], showcase_root, "4", document=document)
 
-        try:
-            subprocess.run(
-                ["walrus", "read", showcase_blob_id, "--out", showcase_zip_filename],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 4.1 DONE: Downloaded blob as {showcase_zip_filename}")
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to download the showcase file."
-            raise RuntimeError(f"STEP 4.1 Error: {e.stderr or e.stdout or str(e)}")
+    @pipeline.step("add_sites", requires=["stage_sites", "download_showcase"],
+                   client_error_description="Failed to move static site into showcase structure.")
+    def add_sites():
+        # STEP 5: ADD STATIC SITES TO SHOWCASE
+        print(f"🔹 STEP 5: ADD {len(pending)} STATIC SITE(S) TO SHOWCASE")
+        for object_id in pending:
+            site_dir = staged[object_id]
+            target_dir = os.path.join(showcase_root, site_prefix(object_id))
 
-        try:
-            os.makedirs(showcase_site_name, exist_ok=True)
-            with zipfile.ZipFile(showcase_zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(showcase_site_name)
-            print(f"✅ STEP 4.2 DONE: Extracted to ./{showcase_site_name}")
-        except Exception as e:
-            client_error_description = "Failed to extract the showcase zip file."
-            raise RuntimeError(f"STEP 4.2 Error: {str(e)}")
-        
-        # STEP 5: ADD STATIC SITE TO SHOWCASE
-        print("🔹 STEP 5: ADD STATIC SITE TO SHOWCASE")
-        owner = attributes["owner"]
-        showcase_root = showcase_site_name
-        destination_dir = os.path.join(showcase_root, owner)
-        target_dir = os.path.join(destination_dir, site_name)
-
-        if not os.path.exists(site_name):
-            raise RuntimeError(f"Source folder '{site_name}' does not exist.")
-        
-        try:
-            os.makedirs(destination_dir, exist_ok=True)
+            if not os.path.exists(site_dir):
+                raise RuntimeError(f"Source folder '{site_dir}' does not exist.")
+
+            os.makedirs(os.path.dirname(target_dir), exist_ok=True)
 
             if os.path.exists(target_dir):
                 shutil.rmtree(target_dir)
 
-            shutil.move(site_name, target_dir)
+            # สำเนาแบบ hardlink: ไฟล์ใน staging ยังอยู่ให้ใส่ซ้ำได้ถ้าต้อง rebase
+            snapshot_site(site_dir, target_dir)
 
-            print(f"✅ STEP 5 DONE: Moved {site_name} to {target_dir}")
-        except Exception as e:
-            client_error_description = "Failed to move static site into showcase structure."
-            raise RuntimeError(f"STEP 5 Error: {str(e)}")
-        
-        # STEP 6: UPDATE SITE
-        print("🔹 STEP 6: Update site using site-builder CLI")
-        try:
-            epochs = attributes["epochs"]
-
-            subprocess.run(
-                ["site-builder", "update", showcase_root, showcase_site_id, "--epochs", "2"],
-                check=True, capture_output=True, text=True
-            )
-            print(f"✅ STEP 6 DONE: Site updated with site-builder in ./{showcase_root}")
-            showcase_url = target_dir[5:]
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Site update failed during publishing."
-            raise RuntimeError(f"STEP 6 Error: {e.stderr or e.stdout or str(e)}")
-        
+            print(f"✅ STEP 5 DONE: Copied {site_dir} to {target_dir}")
+
+    @pipeline.step("prepare_archive", requires=["add_sites"],
+                   client_error_description="Unexpected error during zipping or storing.")
+    def prepare_archive():
+        # STEP 7.0: zip showcase (ยกเว้นไฟล์ระดับบนสุด)
+        return prepare_showcase_archive(
+            showcase_root, changed_prefixes=[site_prefix(object_id) for object_id in pending])
+
+    @pipeline.step("store", requires=["prepare_archive"], checkpoint=True)
+    def store():
         # STEP 7: STORE NEW SHOWCASE SITE IN WALRUS
         print("🔹 STEP 7: Zip and store updated showcase site into Walrus")
-        try:
-            new_showcase_zip = "new_showcase.zip"
-
-            # Zip the showcase_root folder (e.g., 'site')
-            def zip_folder(folder_path, zip_path):
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, _, files in os.walk(folder_path):
-                        for file in files:
-                            abs_path = os.path.join(root, file)
-                            rel_path = os.path.relpath(abs_path, folder_path)
-                            zipf.write(abs_path, rel_path)
-
-            zip_folder(showcase_site_name, new_showcase_zip)
-            print(f"✅ STEP 7.1 DONE: Zipped {showcase_site_name} -> {new_showcase_zip}")
-
-            # Store the zipped file in Walrus
-            result = subprocess.run(
-                ["walrus", "store", new_showcase_zip, "--epochs", "2", "--deletable", "--force"],
-                check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 7.2 DONE: Stored new showcase site in Walrus")
-            
-            stdout = result.stdout.strip()
-            new_showcase_blob_id = None
-            new_showcase_object_id = None
-
-            for line in stdout.splitlines():
-                if line.startswith("Blob ID:"):
-                    new_showcase_blob_id = line.split(":", 1)[1].strip()
-                elif line.startswith("Sui object ID:"):
-                    new_showcase_object_id = line.split(":", 1)[1].strip()
-
-            if not new_showcase_blob_id or not new_showcase_object_id:
-                client_error_description = "Cannot get showcase Site id from Walrus."
-                raise RuntimeError("⚠️ ไม่พบค่า Blob ID หรือ Sui object ID จากผลลัพธ์ของคำสั่ง walrus store")
-
-            print(f"📦 new_showcase_blob_id: {new_showcase_blob_id}")
-            print(f"📦 new_showcase_object_id: {new_showcase_object_id}")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to store updated site in Walrus."
-            raise RuntimeError(f"STEP 7 Error: {e.stderr or e.stdout or str(e)}")
-        except Exception as e:
-            client_error_description = "Unexpected error during zipping or storing."
-            raise RuntimeError(f"STEP 7 Error: {str(e)}")
-        
+        return store_showcase(showcase_root, "7", prepared=pipeline.results["prepare_archive"],
+                              base_blob_id=base["blob_id"])
+
+    @pipeline.step("update_reference", requires=["store"], checkpoint=True)
+    async def update_reference():
         # STEP 8: UPDATE Firestore Document with new BlobID and ObjID
+        # (สลับเฉพาะเมื่อยังชี้ไปที่ showcase ที่ใช้เป็นฐาน ไม่เช่นนั้น rebase แล้วทำ STEP 4-8 ใหม่)
         print("🔹 STEP 8: Update Firestore with new BlobID and ObjID")
-
+        if pipeline.results["store"] is None:
+            # เว็บทุกตัวอยู่ใน showcase เดิมแล้ว (เนื้อหาเหมือนเดิม): reference ไม่ต้องเปลี่ยน
+            # แต่ถ้า job อื่นเปลี่ยนไปก่อน ต้อง rebase เหมือนกรณีเนื้อหาเปลี่ยน
+            try:
+                return await asyncio.to_thread(check_showcase_reference, base["blob_id"], "8",
+                                               document=document)
+            except ShowcaseConflict as conflict:
+                await rebase_showcase(conflict, base, None, "download_showcase")
+        new_showcase_blob_id, new_showcase_object_id = pipeline.results["store"]
         try:
-            db = firestore.Client()
-            doc_ref = db.collection("showcase-data").document("reference")
-            doc = doc_ref.get()
-
-            if doc.exists:
-                # ✅ อัปเดตค่าใหม่ที่ได้จาก STEP 7
-                doc_ref.update({
-                    "BlobID": new_showcase_blob_id,
-                    "ObjID": new_showcase_object_id
-                })
-
-                print("✅ STEP 8 DONE: Firestore document updated successfully.")
-                print(f"   🔁 Updated BlobID: {new_showcase_blob_id}")
-                print(f"   🔁 Updated ObjID: {new_showcase_object_id}")
-                status = "1"
-        except Exception as e:
-            client_error_description = "Error while updating Firestore."
-            raise RuntimeError(f"STEP 8 Error: {str(e)}")
-        
+            return await asyncio.to_thread(
+                update_showcase_reference, new_showcase_blob_id, new_showcase_object_id, "8",
+                expected_blob_id=base["blob_id"], document=document)
+        except ShowcaseConflict as conflict:
+            await rebase_showcase(conflict, base, new_showcase_blob_id, "download_showcase")
+
+    @pipeline.step("update_site", requires=["update_reference"], checkpoint=True)
+    async def update_site():
+        # STEP 6: UPDATE SITE หลังสลับ reference สำเร็จ (ถ้าต้อง rebase เว็บจริงยังไม่ถูกแตะ)
+        if not pipeline.results["update_reference"]:
+            return
+        print("🔹 STEP 6: Update site using site-builder CLI")
+        stored = pipeline.results["store"]
+        await sync_showcase_site(showcase_root, stored[0] if stored else base["blob_id"], "6",
+                                 "Site update failed during publishing.",
+                                 showcase_site_id=showcase_site_id, document=document,
+                                 archive_path=workspace.path(NEW_SHOWCASE_ZIP) if stored else None)
+        for object_id in pending:
+            results[object_id]["showcase_url"] = site_prefix(object_id)
+            results[object_id]["status"] = "1"
+
+    @pipeline.step("delete_old_blob", requires=["update_reference"], checkpoint=True)
+    async def delete_old_blob():
         # STEP 9: DELETE OLD SHOWCASE BLOB
+        if pipeline.results["store"] is None:
+            return
         print("🔹 STEP 9: Delete old showcase blob from Walrus")
+        await delete_showcase_blob(base["blob_id"], "9")
+
+    @pipeline.on_error
+    def record_error(e):
+        for object_id in pending:
+            results[object_id]["client_error_description"] = client_error_for(e)
+
+    @pipeline.finally_step
+    def write_attributes():
+        # attribute ถูกเขียนจริงตอนจบ operation (walrus_cli.attribute_batch) ซึ่ง log ผลของแต่ละ blob เอง
+        print("🔹 LAST STEP: Queue blob attributes...")
+        for object_id in object_ids:
+            result = results[object_id]
+            attrs = {
+                "status": result["status"],
+                "client_error_description": result["client_error_description"],
+            }
+            if result["status"] == "1":
+                attrs["showcase_url"] = result["showcase_url"]
+                attrs["showcase_base_url"] = showcase_base_url
+
+            walrus_cli.set_blob_attributes(object_id, attrs)
+            written[object_id] = attrs
+            print(f"✅ LAST STEP DONE: Blob attributes queued ({object_id}).")
 
         try:
-            result = subprocess.run(
-                 ["walrus", "delete", "--blob-id", showcase_blob_id, "--yes", "--no-status-check"],
-                 check=True, capture_output=True, text=True
-            )
-            print("✅ STEP 9 DONE: Old showcase blob deleted successfully.")
-
-        except subprocess.CalledProcessError as e:
-            client_error_description = "Failed to delete old showcase blob from Walrus."
-            raise RuntimeError(f"STEP 9 Error: {e.stderr or e.stdout or str(e)}")
+            register_sites({object_id: attributes_by_id[object_id] for object_id in object_ids
+                            if results[object_id]["status"] == "1"})
         except Exception as e:
-            client_error_description = "Unexpected error during blob deletion."
-            raise RuntimeError(f"STEP 9 Error: {str(e)}")
-
-    except subprocess.CalledProcessError as e:
-        description = f"Subprocess error: {e.stderr or str(e)}"
-        if not client_error_description:
-            client_error_description = "Internal system error. Please try again later."
-        print("❌ Error:", description)
-    except Exception as e:
-        description = str(e)
-        if not client_error_description:
-            client_error_description = "Unexpected error occurred. Please try again later."
-        print("❌ Error:", description)
-    finally:
-        print("🔹 LAST STEP: Updating blob attributes...")
-        attr_command = [
-            "walrus", "set-blob-attribute", object_id,
-            "--attr", "status", status,
-            "--attr", "client_error_description", client_error_description
-        ]
-        if status == "1":
-            attr_command += ["--attr", "showcase_url", showcase_url]
-
-        try:
-            subprocess.run(attr_command, check=True, capture_output=True, text=True)
-            print("✅ LAST STEP DONE: Blob attributes updated.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ LAST STEP FAILED Cannot update blob attributes:", e.stderr or str(e))
-
-        if attributes.get("site_id") is not None:
-            get_site_id(object_id)
-
+            print(f"⚠️ Cannot register published sites:", str(e))
+
+        for object_id in object_ids:
+            attributes = attributes_by_id.get(object_id, {})
+            if attributes.get("site_id") is not None:
+                if object_id in written:
+                    get_site_id(object_id, attributes={**attributes, **written[object_id]},
+                                site_dir=staged.get(object_id))
+                else:
+                    get_site_id(object_id)
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    pipeline.run()
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from clients import get_firestore_client
+from operations import run_operation, validate_operation, write_keystore
+import workspace
+
+# จำนวน operation ที่รันพร้อมกันได้ (แต่ละ operation มี workspace ของตัวเอง
+# แต่ operation ที่แก้ showcase เดียวกันจะต้อง rebase กัน จึงเริ่มที่ 1)
+MAX_CONCURRENCY = int(os.environ.get("JOB_MAX_CONCURRENCY", "1"))
+# เวลารอคิวสูงสุด (วินาที) ก่อนตอบ 429 ให้ Cloud Tasks retry ภายหลัง
+QUEUE_TIMEOUT = float(os.environ.get("JOB_QUEUE_TIMEOUT", "600"))
+DEFAULT_PORT = 8080
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # health check
+        self.send_json(200, {"success": True})
+
+    def do_POST(self):
+        # payload เดียวกับที่ TaskService.createTask ส่งมา: {"arg1": operation, "arg2": object_id}
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            operation = payload.get("arg1")
+            object_id = payload.get("arg2")
+        except (ValueError, AttributeError) as e:
+            self.send_json(400, {"success": False, "error": f"Invalid payload: {e}"})
+            return
+
+        error = validate_operation(operation, object_id)
+        if error:
+            print(f"❌ {error}")
+            self.send_json(400, {"success": False, "error": error})
+            return
+
+        if not self.slots.acquire(timeout=QUEUE_TIMEOUT):
+            self.send_json(429, {"success": False, "error": "Too many running operations."})
+            return
+
+        try:
+            print(f"Operation: {operation}")
+            print(f"Object ID: {object_id}")
+            run_operation(operation, object_id)
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json(500, {"success": False, "error": str(e)})
+            return
+        finally:
+            self.slots.release()
+
+        self.send_json(200, {"success": True, "operation": operation, "object_id": object_id})
+
+
+def serve(port=None):
+    port = port or int(os.environ.get("PORT", DEFAULT_PORT))
+
+    # keystore และ client ถูกเตรียมครั้งเดียว แล้วใช้ซ้ำทุก request
+    write_keystore()
+    get_firestore_client()
+    workspace.preallocate(MAX_CONCURRENCY)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), JobRequestHandler)
+    print(f"✅ Job server listening on port {port} (concurrency {MAX_CONCURRENCY})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
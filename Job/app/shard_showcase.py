@@ -0,0 +1,233 @@
+import asyncio
+import shutil
+import subprocess
+import os
+import walrus_cli
+import workspace
+from google.cloud import firestore
+from clients import get_firestore_client
+from errors import StepError, describe_error
+from pipeline import Pipeline
+from publish import IO_CONCURRENCY, SHOWCASE_SITE_NAME, WS_RESOURCES, snapshot_site
+from shards import (
+    REFERENCE_DOCUMENT, SHARDS_DOCUMENT, SHOWCASE_COLLECTION, load_shard_count, shard_document,
+    shard_for, shard_url,
+)
+from showcase import (
+    NEW_SHOWCASE_ZIP, SHOWCASE_EPOCHS, SHOWCASE_SITE_ID, cache_showcase, delete_showcase_blob,
+    download_showcase, store_showcase,
+)
+from site_registry import register_sites
+from sweep_expired import find_published_sites
+
+# โฟลเดอร์ของแต่ละ shard ระหว่าง migrate
+SHARD_SITE_NAME = "Shard"
+# โฟลเดอร์ระดับบนสุดที่ชื่อขึ้นต้นแบบนี้คือ owner (Sui address) ที่เหลือ (เช่น assets) อยู่ทุก shard
+OWNER_PREFIX = "0x"
+
+
+def shard_showcase(shard_count, showcase_obj_id, showcase_blob_id):
+    # แยก showcase เดียว (document 'reference') เป็น shard_count shard ตาม owner
+    # แต่ละ shard เป็นเว็บ/blob ของตัวเอง ไฟล์และโฟลเดอร์ที่ไม่ใช่ owner (หน้า index, assets) อยู่ทุก shard
+    # publish/delete ที่สลับ 'reference' ระหว่าง migrate ทำให้ migrate ยกเลิก (ต้องรันใหม่)
+    # และหลังสลับไปใช้ shard แล้ว job ที่ยังเขียน 'reference' จะ fail ไม่หายไปเงียบๆ
+    # document 'reference' เดิมไม่ถูกแตะ: ลบ document 'shards' เพื่อ rollback กลับไปใช้ showcase เดียว
+    # (จนกว่าจะ retire_legacy_showcase) เว็บที่ย้ายแล้วได้ showcase_base_url ของ shard ตัวเอง
+    showcase_root = workspace.path(SHOWCASE_SITE_NAME)
+    shard_roots = [workspace.path(f"{SHARD_SITE_NAME}-{index}") for index in range(shard_count)]
+    site_ids = {}
+    stored = {}
+    # document ของ shard ถูกเขียนแล้ว: blob ที่ store ไว้ถูกอ้างถึง ห้ามลบตอน error
+    referenced = []
+    pipeline = Pipeline("shard_showcase")
+
+    @pipeline.step("check")
+    def check():
+        # STEP 0: Check arguments
+        if showcase_blob_id is None or showcase_obj_id is None:
+            raise StepError("Can't get showcase info")
+        if shard_count < 1:
+            raise StepError(f"Invalid shard count: {shard_count}")
+        try:
+            shard_url(0)
+        except ValueError as e:
+            raise StepError(str(e))
+        current = load_shard_count()
+        if current:
+            raise StepError(f"Showcase is already split into {current} shards.")
+        for shard_root in shard_roots:
+            shutil.rmtree(shard_root, ignore_errors=True)
+
+    @pipeline.step("download_showcase", requires=["check"])
+    def fetch_showcase():
+        # STEP 1: READ SHOWCASE FILE AND EXTRACT IT
+        print("🔹 STEP 1: Read SHOWCASE file and extract it")
+        download_showcase(showcase_blob_id, showcase_root, "1")
+
+    @pipeline.step("split", requires=["download_showcase"])
+    def split():
+        # STEP 2: แยกโฟลเดอร์ของแต่ละ owner ไปที่ shard ของตัวเอง (hardlink ไม่คัดลอกข้อมูล)
+        print(f"🔹 STEP 2: Split showcase into {shard_count} shard(s) by owner")
+        for shard_root in shard_roots:
+            os.makedirs(shard_root)
+
+        owners = [0] * shard_count
+        for entry in os.scandir(showcase_root):
+            if entry.is_dir() and entry.name.startswith(OWNER_PREFIX):
+                index = shard_for(entry.name, shard_count)
+                snapshot_site(entry.path, os.path.join(shard_roots[index], entry.name))
+                owners[index] += 1
+            elif entry.is_dir():
+                for shard_root in shard_roots:
+                    snapshot_site(entry.path, os.path.join(shard_root, entry.name))
+            elif entry.name != WS_RESOURCES:
+                for shard_root in shard_roots:
+                    shutil.copy2(entry.path, shard_root)
+
+        for index, count in enumerate(owners):
+            print(f"✅ STEP 2 DONE: {shard_roots[index]} has {count} owner(s)")
+
+    @pipeline.step("publish_shards", requires=["split"])
+    async def publish_shards():
+        # STEP 3: PUBLISH แต่ละ shard เป็นเว็บใหม่พร้อมกัน
+        print(f"🔹 STEP 3: Publish {shard_count} shard site(s) using site-builder CLI")
+        slots = asyncio.Semaphore(IO_CONCURRENCY)
+
+        async def publish(index):
+            async with slots:
+                try:
+                    site_ids[index] = await walrus_cli.publish_site_async(shard_roots[index],
+                                                                          SHOWCASE_EPOCHS)
+                except subprocess.CalledProcessError as e:
+                    raise StepError(f"STEP 3 Error ({shard_roots[index]}): {describe_error(e)}")
+                print(f"✅ STEP 3 DONE: {shard_roots[index]} published as {site_ids[index]}")
+
+        await asyncio.gather(*[publish(index) for index in range(shard_count)])
+
+    @pipeline.step("store_shards", requires=["publish_shards"])
+    def store_shards():
+        # STEP 4: STORE แต่ละ shard (ทีละ shard เพราะใช้ zip ชั่วคราวไฟล์เดียวกัน)
+        print(f"🔹 STEP 4: Zip and store {shard_count} shard(s) into Walrus")
+        for index, shard_root in enumerate(shard_roots):
+            stored[index] = store_showcase(shard_root, f"4.{index}")
+            cache_showcase(shard_root, workspace.path(NEW_SHOWCASE_ZIP), stored[index][0],
+                           f"4.{index}", document=shard_document(index))
+
+    @pipeline.step("write_references", requires=["store_shards"])
+    def write_references():
+        # STEP 5: เขียน document ของทุก shard ก่อน แล้วจึงเขียน 'shards'
+        # job ที่เริ่มหลังจากนี้จึงจะเปลี่ยนไปใช้ shard (ไม่มีช่วงที่เห็น shard ไม่ครบ)
+        print("🔹 STEP 5: Write shard references to Firestore")
+        db = get_firestore_client()
+        collection = db.collection(SHOWCASE_COLLECTION)
+
+        @firestore.transactional
+        def switch(transaction):
+            # สลับเฉพาะเมื่อ showcase เดิมยังเป็น blob ที่แยกมา ไม่เช่นนั้นเว็บที่ publish ระหว่างนี้จะหาย
+            reference = collection.document(REFERENCE_DOCUMENT).get(transaction=transaction)
+            if not reference.exists or reference.to_dict().get("BlobID") != showcase_blob_id:
+                raise StepError("STEP 5 Error: Showcase changed during the migration, "
+                                "run shard_showcase again.")
+            transaction.set(collection.document(SHARDS_DOCUMENT), {"Count": shard_count})
+
+        try:
+            for index in range(shard_count):
+                blob_id, object_id = stored[index]
+                collection.document(shard_document(index)).set({
+                    "BlobID": blob_id,
+                    "ObjID": object_id,
+                    "SiteID": site_ids[index],
+                    "URL": shard_url(index),
+                    "Version": 1,
+                })
+                print(f"   🔁 {shard_document(index)}: {blob_id} ({site_ids[index]})")
+            referenced.append(True)
+            switch(db.transaction())
+        except StepError:
+            referenced.clear()
+            raise
+        except Exception as e:
+            raise StepError(f"STEP 5 Error: {str(e)}", "Error while updating Firestore.")
+        print(f"✅ STEP 5 DONE: Showcase split into {shard_count} shard(s)")
+
+    @pipeline.step("update_site_urls", requires=["write_references"])
+    def update_site_urls():
+        # STEP 6: เว็บที่อยู่ใน showcase ชี้ showcase_base_url ไปที่ shard ของตัวเอง และลงทะเบียนใน showcase-sites
+        # (shard ใช้งานแล้ว จึงไม่ fail ทั้ง migration: รัน backfill_registry/แก้ attribute ซ้ำได้ภายหลัง)
+        print("🔹 STEP 6: Point published sites at their shard")
+        try:
+            published = find_published_sites()
+            for object_id, attributes in published.items():
+                if attributes.get("owner"):
+                    url = shard_url(shard_for(attributes["owner"], shard_count))
+                    walrus_cli.set_blob_attributes(object_id, {"showcase_base_url": url})
+            register_sites(published)
+        except Exception as e:
+            print(f"⚠️ STEP 6 FAILED Cannot update showcase_base_url of published sites:",
+                  describe_error(e))
+            return
+        print(f"✅ STEP 6 DONE: {len(published)} site(s) point at their shard")
+
+    @pipeline.on_error
+    async def delete_stored(e):
+        # blob ของ shard ที่ store แล้วไม่มีใครอ้างถึง (เว็บที่ publish แล้วต้อง destroy เอง)
+        if referenced:
+            return
+        for blob_id, _ in stored.values():
+            try:
+                await walrus_cli.delete_blob_async(blob_id)
+                print(f"🧹 Deleted unused shard blob {blob_id}")
+            except subprocess.CalledProcessError as error:
+                print(f"⚠️ Cannot delete unused shard blob {blob_id}:", describe_error(error))
+        for index, site_id in site_ids.items():
+            print(f"⚠️ Shard site {site_id} ({shard_roots[index]}) is not referenced")
+
+    @pipeline.finally_step
+    def cleanup():
+        for shard_root in shard_roots:
+            shutil.rmtree(shard_root, ignore_errors=True)
+        shutil.rmtree(showcase_root, ignore_errors=True)
+
+    pipeline.run()
+
+
+def retire_legacy_showcase(showcase_obj_id, showcase_blob_id, showcase_site_id=SHOWCASE_SITE_ID):
+    # เลิกใช้ showcase เดียวแบบเดิมหลังแยก shard แล้ว (เว็บที่ลบหลัง migrate ยังค้างอยู่ในนั้น)
+    # destroy เว็บ, ลบ document 'reference' แล้วลบ blob หลังจากนี้ rollback ไปใช้ showcase เดียวไม่ได้
+    pipeline = Pipeline("retire_legacy_showcase")
+
+    @pipeline.step("check")
+    def check():
+        # STEP 0: Check arguments
+        if not load_shard_count():
+            raise StepError("Showcase is not split into shards yet.")
+        if showcase_blob_id is None or showcase_obj_id is None:
+            raise StepError("Legacy showcase is already retired.")
+
+    @pipeline.step("destroy_site", requires=["check"])
+    async def destroy_site():
+        # STEP 1: DESTROY LEGACY SHOWCASE SITE
+        print(f"🔹 STEP 1: Destroy legacy showcase site {showcase_site_id}")
+        try:
+            await walrus_cli.destroy_site_async(showcase_site_id)
+        except subprocess.CalledProcessError as e:
+            raise StepError(f"STEP 1 Error: {describe_error(e)}")
+        print(f"✅ STEP 1 DONE: Site {showcase_site_id} destroyed")
+
+    @pipeline.step("delete_reference", requires=["destroy_site"])
+    def delete_reference():
+        # STEP 2: ลบ document 'reference' (extend จะไม่ต่ออายุ blob เดิมอีก)
+        print("🔹 STEP 2: Delete legacy showcase reference")
+        try:
+            get_firestore_client().collection(SHOWCASE_COLLECTION).document(REFERENCE_DOCUMENT).delete()
+        except Exception as e:
+            raise StepError(f"STEP 2 Error: {str(e)}", "Error while updating Firestore.")
+        print(f"✅ STEP 2 DONE: Document '{REFERENCE_DOCUMENT}' deleted")
+
+    @pipeline.step("delete_blob", requires=["delete_reference"])
+    async def delete_blob():
+        # STEP 3: DELETE LEGACY SHOWCASE BLOB
+        print("🔹 STEP 3: Delete legacy showcase blob from Walrus")
+        await delete_showcase_blob(showcase_blob_id, "3")
+
+    pipeline.run()
@@ -0,0 +1,40 @@
+import hashlib
+import os
+from clients import get_firestore_client
+
+# document ใน collection 'showcase-data'
+# - 'reference': showcase เดียวแบบเดิม (ใช้เมื่อยังไม่มี 'shards' และเก็บไว้สำหรับ rollback)
+# - 'shards': {Count} จำนวน shard เมื่อแยก showcase ตาม owner แล้ว
+# - 'reference-{i}': {BlobID, ObjID, SiteID, Version, URL} ของ shard ที่ i
+SHOWCASE_COLLECTION = "showcase-data"
+REFERENCE_DOCUMENT = "reference"
+SHARDS_DOCUMENT = "shards"
+# URL ของเว็บแต่ละ shard (เช่น "https://kursui-{shard}.wal.app") ต้องตั้งก่อน migrate
+SHOWCASE_SHARD_URL = os.environ.get("SHOWCASE_SHARD_URL", "")
+
+
+def shard_for(owner, count):
+    # owner เดียวกันอยู่ shard เดียวกันเสมอ (ต้องไม่ขึ้นกับ PYTHONHASHSEED)
+    digest = hashlib.sha256(owner.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_document(index):
+    return f"{REFERENCE_DOCUMENT}-{index}"
+
+
+def shard_url(index):
+    # ไม่มี URL = frontend ลิงก์ไปที่ showcase เดียวแบบเดิม ซึ่งไม่ถูกอัปเดตหลัง migrate แล้ว
+    if "{shard}" not in SHOWCASE_SHARD_URL:
+        raise ValueError(f"SHOWCASE_SHARD_URL must contain '{{shard}}', got '{SHOWCASE_SHARD_URL}'")
+    return SHOWCASE_SHARD_URL.format(shard=index)
+
+
+def load_shard_count():
+    # 0 = ยังไม่ได้แยก shard (ใช้ document 'reference' เดิม)
+    db = get_firestore_client()
+    doc = db.collection(SHOWCASE_COLLECTION).document(SHARDS_DOCUMENT).get()
+    if not doc.exists:
+        return 0
+    return int(doc.to_dict().get("Count") or 0)
+
@@ -0,0 +1,344 @@
+import asyncio
+import shutil
+import subprocess
+import os
+import content_store
+import metrics
+import showcase_cache
+import walrus_cli
+import workspace
+from google.cloud import firestore
+from archive import (
+    append_root_files, build_archive, describe_extract, extract_archive, filter_archive, same_content,
+)
+from clients import get_firestore_client
+from errors import StepError, describe_error
+from pipeline import Rerun
+from walrus_info import walrus_info
+from shards import REFERENCE_DOCUMENT, SHARDS_DOCUMENT, SHOWCASE_COLLECTION
+
+SHOWCASE_SITE_ID = "0x8ea2941b08cad8b5b667fab8cffc26d4fc8bdaa00366e9d2e0dd233f46ee84bc"
+# URL ของ showcase เดียวแบบเดิม (showcase_base_url ของเว็บที่ publish ก่อนแยก shard)
+SHOWCASE_BASE_URL = os.environ.get("SHOWCASE_BASE_URL", "https://kursui.wal.app")
+SHOWCASE_EPOCHS = "2"
+NEW_SHOWCASE_ZIP = "new_showcase.zip"
+# จำนวนครั้งที่ rebase ได้เมื่อ job อื่นเปลี่ยน showcase ไปก่อน (ดู update_showcase_reference)
+SHOWCASE_MAX_REBASES = int(os.environ.get("SHOWCASE_MAX_REBASES", "3"))
+
+
+class ShowcaseConflict(StepError):
+    # showcase-data/reference ไม่ได้ชี้ไปที่ showcase ที่ job นี้ใช้เป็นฐานแล้ว
+    def __init__(self, blob_id, object_id):
+        super().__init__(f"Showcase reference was changed to {blob_id} by another job.",
+                         "Showcase is busy. Please try again later.")
+        self.blob_id = blob_id
+        self.object_id = object_id
+
+
+def cache_slot(document):
+    # showcase เดียวแบบเดิมใช้ cache ที่เดิม, แต่ละ shard มี cache ของตัวเอง
+    return "" if document == REFERENCE_DOCUMENT else document
+
+
+def download_showcase(showcase_blob_id, showcase_site_name, step, extract=True,
+                      document=REFERENCE_DOCUMENT):
+    # extract=False: ไม่มี cache ก็ดาวน์โหลดแค่ zip ไม่แตกไฟล์ (ผู้เรียกทำงานกับ zip เท่านั้น)
+    showcase_zip_filename = f"{showcase_site_name}.zip"
+
+    # เริ่มจากโฟลเดอร์ว่างเสมอ ไม่ให้ไฟล์เก่าจากงานก่อนหน้าปนเข้า showcase
+    shutil.rmtree(showcase_site_name, ignore_errors=True)
+
+    if showcase_cache.checkout(showcase_blob_id, showcase_site_name, showcase_zip_filename,
+                               cache_slot(document)):
+        print(f"✅ STEP {step} DONE: Loaded showcase {showcase_blob_id} from local cache ./{showcase_site_name}")
+        return
+
+    try:
+        walrus_cli.read_blob(showcase_blob_id, showcase_zip_filename)
+        metrics.add_file_size("archive_bytes", showcase_zip_filename)
+        print(f"✅ STEP {step}.1 DONE: Downloaded blob as {showcase_zip_filename}")
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP {step}.1 Error: {describe_error(e)}",
+                        "Failed to download the showcase file.")
+
+    if extract:
+        extract_showcase(showcase_zip_filename, showcase_site_name, step)
+
+
+def extract_showcase(showcase_zip_filename, showcase_site_name, step):
+    try:
+        os.makedirs(showcase_site_name, exist_ok=True)
+        # showcase ประกอบจากเว็บที่ผ่านงบตอนแตกไฟล์มาแล้ว จึงไม่จำกัดขนาดรวม
+        stats = extract_archive(showcase_zip_filename, showcase_site_name,
+                                max_bytes=0, max_entries=0)
+        metrics.add_value("extracted_bytes", stats["bytes"])
+        print(f"✅ STEP {step}.2 DONE: Extracted to ./{showcase_site_name} ({describe_extract(stats)})")
+    except Exception as e:
+        raise StepError(f"STEP {step}.2 Error: {str(e)}",
+                        "Failed to extract the showcase zip file.")
+
+    # ไฟล์ที่ซ้ำกันใน showcase ที่เพิ่งแตกออกมาจะกลายเป็น hardlink (tree จาก cache ผ่านขั้นนี้มาแล้ว)
+    stats = content_store.dedupe_tree(showcase_site_name)
+    if stats["linked"]:
+        print(f"   🔗 Deduplicated {stats['linked']} files ({stats['bytes_saved']} bytes)")
+
+
+async def update_showcase_site(showcase_root, step, client_error_description,
+                               showcase_site_id=SHOWCASE_SITE_ID, epochs=SHOWCASE_EPOCHS):
+    try:
+        await walrus_cli.update_site_async(showcase_root, showcase_site_id, epochs)
+        print(f"✅ STEP {step} DONE: Site updated with site-builder in ./{showcase_root}")
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP {step} Error: {describe_error(e)}", client_error_description)
+
+
+async def sync_showcase_site(showcase_root, showcase_blob_id, step, client_error_description,
+                             showcase_site_id=SHOWCASE_SITE_ID, epochs=SHOWCASE_EPOCHS,
+                             document=REFERENCE_DOCUMENT, archive_path=None):
+    # อัปเดตเว็บ showcase ให้ตรงกับ blob ที่ reference ชี้อยู่ เรียกหลังสลับ reference สำเร็จแล้วเท่านั้น
+    # (job ที่แพ้ตอนสลับจึงไม่ทับเว็บของ job ที่ชนะ) resume จาก checkpoint ไม่มี tree ใน workspace นี้
+    # จึงโหลดจาก blob ที่ store ไว้ แล้วเก็บ tree (หลัง site-builder แก้ ws-resources.json) ลง cache
+    # archive_path: zip ของ showcase_blob_id ที่ store ใน job นี้ (None = zip ที่ดาวน์โหลดมา)
+    # ถ้ายังไม่มี tree (resume หรือ delete ที่ทำงานกับ zip อย่างเดียว) แตกจาก zip นี้หรือดาวน์โหลด
+    # job ที่สลับ reference ทีหลังจะอัปเดตเว็บเอง: ถ้า reference เปลี่ยนไปก่อนเริ่ม ไม่ต้องอัปเดต
+    # ถ้าเปลี่ยนระหว่างอัปเดต job นั้นอาจอัปเดตเสร็จก่อน เว็บจริงจึงอาจเก่ากว่า reference:
+    # อัปเดตซ้ำด้วย showcase ล่าสุดจนกว่า reference จะไม่เปลี่ยนระหว่างอัปเดต
+    if await asyncio.to_thread(showcase_reference_blob_id, document) != showcase_blob_id:
+        print(f"⚠️ STEP {step} SKIPPED: Showcase reference moved on, the newer job updates the site.")
+        return
+    if archive_path is None or not os.path.exists(archive_path):
+        archive_path = f"{showcase_root}.zip"
+    if not os.path.isdir(showcase_root):
+        if os.path.exists(archive_path):
+            await asyncio.to_thread(extract_showcase, archive_path, showcase_root, step)
+        else:
+            await asyncio.to_thread(download_showcase, showcase_blob_id, showcase_root, step,
+                                    document=document)
+
+    for _ in range(SHOWCASE_MAX_REBASES + 1):
+        await update_showcase_site(showcase_root, step, client_error_description,
+                                   showcase_site_id=showcase_site_id, epochs=epochs)
+        current_blob_id = await asyncio.to_thread(showcase_reference_blob_id, document)
+        if current_blob_id is None or current_blob_id == showcase_blob_id:
+            cache_showcase(showcase_root, archive_path, showcase_blob_id, step, document)
+            return
+
+        print(f"⚠️ STEP {step}: Showcase reference moved on to {current_blob_id} during the update, "
+              f"updating the site again")
+        showcase_blob_id = current_blob_id
+        archive_path = f"{showcase_root}.zip"
+        await asyncio.to_thread(download_showcase, showcase_blob_id, showcase_root, step,
+                                document=document)
+    print(f"⚠️ STEP {step}: Showcase keeps changing, leaving the site to the newer job.")
+
+
+def showcase_reference_blob_id(document=REFERENCE_DOCUMENT):
+    # BlobID ที่ document (showcase เดิมหรือ shard) ชี้อยู่ตอนนี้ (None = ไม่มี document)
+    try:
+        doc = get_firestore_client().collection(SHOWCASE_COLLECTION).document(document).get()
+    except Exception as e:
+        raise StepError(f"Cannot read showcase reference: {str(e)}", "Error while updating Firestore.")
+    if not doc.exists:
+        return None
+    return doc.to_dict().get("BlobID")
+
+
+def cache_showcase(showcase_root, archive_path, showcase_blob_id, step, document=REFERENCE_DOCUMENT):
+    # ย้าย tree และ zip ของ showcase_blob_id เข้า cache ให้ job ถัดไป (ไม่ต้องดาวน์โหลด/แตกไฟล์/dedupe ใหม่)
+    try:
+        showcase_cache.refresh(showcase_root, archive_path, showcase_blob_id, cache_slot(document))
+        print(f"✅ STEP {step}.3 DONE: Cached showcase {showcase_blob_id}")
+    except Exception as e:
+        showcase_cache.invalidate(cache_slot(document))
+        print(f"⚠️ STEP {step}.3 Cannot cache showcase:", str(e))
+    content_store.collect_garbage()
+
+
+def build_showcase_archive(showcase_root, changed_prefixes=(), removed_prefixes=None,
+                           skip_root=False):
+    # Zip the showcase_root folder (e.g., 'site')
+    # entry ที่ไม่เปลี่ยนถูกคัดลอกจาก zip ของ showcase เดิม ({showcase_root}.zip) โดยไม่บีบอัดใหม่
+    old_showcase_zip = f"{showcase_root}.zip"
+    if removed_prefixes is not None and os.path.exists(old_showcase_zip):
+        # ลบอย่างเดียว: กรอง entry จาก zip เดิม ไม่ต้องไล่อ่านทั้ง tree
+        # ไม่มี tree (delete ที่ไม่ได้แตกไฟล์): ไฟล์ระดับบนสุดคัดลอกจาก zip เดิมทั้งหมด
+        folder_path = showcase_root if os.path.isdir(showcase_root) else None
+        return filter_archive(old_showcase_zip, workspace.path(NEW_SHOWCASE_ZIP), drop_prefixes=removed_prefixes,
+                              folder_path=folder_path, skip_root=skip_root)
+    return build_archive(showcase_root, workspace.path(NEW_SHOWCASE_ZIP), old_zip_path=old_showcase_zip,
+                         changed_prefixes=changed_prefixes, skip_root=skip_root)
+
+
+def prepare_showcase_archive(showcase_root, changed_prefixes=(), removed_prefixes=None):
+    # zip ทุกอย่างยกเว้นไฟล์ระดับบนสุด (ws-resources.json ที่ site-builder เขียนทับ)
+    # แล้วส่งผลให้ store_showcase(prepared=...) ต่อท้ายไฟล์ระดับบนสุด
+    return build_showcase_archive(showcase_root, changed_prefixes, removed_prefixes, skip_root=True)
+
+
+def check_blob_size(path):
+    # ไม่ส่ง zip ที่ใหญ่เกินกว่าที่ walrus รับได้ (ค่าจาก walrus info ที่ cache ไว้ทั้ง epoch)
+    try:
+        limit = walrus_info().maximum_blob_size_bytes
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️ Cannot get walrus info:", describe_error(e))
+        return
+    size = os.path.getsize(path)
+    if limit and size > limit:
+        raise StepError(f"Showcase archive is {size} bytes, walrus accepts at most {limit} bytes.",
+                        "Showcase is too large to store in Walrus.")
+
+
+def store_showcase(showcase_root, step, epochs=SHOWCASE_EPOCHS, changed_prefixes=(),
+                   removed_prefixes=None, prepared=None, base_blob_id=None):
+    # คืนค่า (blob_id, object_id) ใหม่ หรือ None ถ้าเนื้อหาเหมือน showcase base_blob_id ทุกไฟล์
+    # (ไม่ store ซ้ำ ผู้เรียกไม่ต้องสลับ reference หรือลบ blob เดิม; ต่ออายุด้วย operation extend)
+    # zip ใหม่อยู่ที่ workspace.path(NEW_SHOWCASE_ZIP) ให้ผู้เรียกเก็บเข้า cache ด้วย cache_showcase
+    new_showcase_zip = workspace.path(NEW_SHOWCASE_ZIP)
+    old_showcase_zip = f"{showcase_root}.zip"
+    try:
+        if prepared is None:
+            stats = build_showcase_archive(showcase_root, changed_prefixes, removed_prefixes)
+        else:
+            root_stats = append_root_files(new_showcase_zip, showcase_root, old_showcase_zip)
+            stats = {key: prepared[key] + root_stats[key] for key in prepared}
+        print(f"✅ STEP {step}.1 DONE: Zipped {showcase_root} -> {new_showcase_zip}")
+        print(f"   ♻️ Reused {stats['reused']} entries, compressed {stats['compressed']}, "
+              f"stored {stats['stored']}, deduplicated {stats['deduplicated']}, dropped {stats['dropped']}")
+
+        metrics.add_file_size("archive_bytes", new_showcase_zip)
+
+        if (base_blob_id is not None and os.path.exists(old_showcase_zip)
+                and same_content(new_showcase_zip, old_showcase_zip)):
+            stored = None
+            print(f"✅ STEP {step}.2 DONE: Showcase content unchanged, keeping blob {base_blob_id}")
+        else:
+            check_blob_size(new_showcase_zip)
+
+            # Store the zipped file in Walrus
+            stored = walrus_cli.store_blob(new_showcase_zip, epochs)
+            print(f"✅ STEP {step}.2 DONE: Stored new showcase site in Walrus")
+    except StepError:
+        raise
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP {step} Error: {describe_error(e)}",
+                        "Failed to store updated site in Walrus.")
+    except walrus_cli.WalrusOutputError as e:
+        raise StepError(str(e), "Cannot get showcase Site id from Walrus.")
+    except Exception as e:
+        raise StepError(f"STEP {step} Error: {str(e)}",
+                        "Unexpected error during zipping or storing.")
+
+    if stored is None:
+        return None
+    # tree ยังอยู่ใน workspace: site-builder update ใช้ tree นี้หลังสลับ reference แล้วจึงเข้า cache
+    print(f"📦 new_showcase_blob_id: {stored.blob_id}")
+    print(f"📦 new_showcase_object_id: {stored.object_id}")
+    return stored.blob_id, stored.object_id
+
+
+def update_showcase_reference(new_showcase_blob_id, new_showcase_object_id, step,
+                              expected_blob_id=None, document=REFERENCE_DOCUMENT):
+    # คืนค่า True เมื่ออัปเดต document (showcase เดิมหรือ shard) สำเร็จ
+    # expected_blob_id: สลับเฉพาะเมื่อ reference ยังชี้ไปที่ showcase ที่ใช้เป็นฐาน (ใน transaction)
+    # ไม่เช่นนั้น raise ShowcaseConflict พร้อม BlobID/ObjID ปัจจุบันเพื่อให้ผู้เรียก rebase
+    try:
+        db = get_firestore_client()
+        doc_ref = db.collection(SHOWCASE_COLLECTION).document(document)
+
+        @firestore.transactional
+        def swap(transaction):
+            doc = doc_ref.get(transaction=transaction)
+            if not doc.exists:
+                return None
+
+            if document == REFERENCE_DOCUMENT and db.collection(SHOWCASE_COLLECTION).document(
+                    SHARDS_DOCUMENT).get(transaction=transaction).exists:
+                # shard_showcase สลับไปใช้ shard ระหว่าง job นี้: ห้ามเขียน showcase เดิมที่ไม่มีใครอ่านแล้ว
+                raise StepError("Showcase was split into shards by another job.",
+                                "Showcase is busy. Please try again later.")
+
+            data = doc.to_dict()
+            if data.get("BlobID") == new_showcase_blob_id:
+                # ชี้ไปที่ showcase ใหม่อยู่แล้ว (ทำซ้ำหลัง resume จาก checkpoint)
+                return int(data.get("Version") or 0)
+            if expected_blob_id is not None and data.get("BlobID") != expected_blob_id:
+                raise ShowcaseConflict(data.get("BlobID"), data.get("ObjID"))
+
+            # ✅ อัปเดตค่าใหม่ที่ได้จากการ store พร้อมเลข version
+            version = int(data.get("Version") or 0) + 1
+            transaction.update(doc_ref, {
+                "BlobID": new_showcase_blob_id,
+                "ObjID": new_showcase_object_id,
+                "Version": version,
+            })
+            return version
+
+        version = swap(db.transaction())
+        if version is None:
+            return False
+
+        print(f"✅ STEP {step} DONE: Firestore document updated successfully.")
+        print(f"   🔁 Updated BlobID: {new_showcase_blob_id}")
+        print(f"   🔁 Updated ObjID: {new_showcase_object_id}")
+        print(f"   🔁 Version: {version}")
+        return True
+    except StepError:
+        raise
+    except Exception as e:
+        raise StepError(f"STEP {step} Error: {str(e)}", "Error while updating Firestore.")
+
+
+def check_showcase_reference(expected_blob_id, step, document=REFERENCE_DOCUMENT):
+    # showcase ไม่เปลี่ยน: ไม่ต้องสลับ แต่ยังต้องยืนยันว่า reference ชี้ไปที่ showcase ที่ใช้เป็นฐาน
+    # ไม่เช่นนั้น raise ShowcaseConflict (job อื่นเปลี่ยนไปแล้ว เว็บจริงต้องไม่ถูกทับด้วย tree เก่า)
+    # คืนค่า False ถ้าไม่มี document
+    try:
+        db = get_firestore_client()
+        doc_ref = db.collection(SHOWCASE_COLLECTION).document(document)
+
+        @firestore.transactional
+        def read(transaction):
+            doc = doc_ref.get(transaction=transaction)
+            if not doc.exists:
+                return None
+            data = doc.to_dict()
+            if data.get("BlobID") != expected_blob_id:
+                raise ShowcaseConflict(data.get("BlobID"), data.get("ObjID"))
+            return int(data.get("Version") or 0)
+
+        version = read(db.transaction())
+    except ShowcaseConflict:
+        raise
+    except Exception as e:
+        raise StepError(f"STEP {step} Error: {str(e)}", "Error while updating Firestore.")
+    if version is None:
+        return False
+    print(f"✅ STEP {step} DONE: Showcase unchanged, reference kept at {expected_blob_id} "
+          f"(Version {version}).")
+    return True
+
+
+async def rebase_showcase(conflict, base, unused_blob_id, from_step):
+    # showcase ที่เพิ่ง store ไม่มีใครอ้างถึงแล้ว: ลบทิ้ง แล้วให้ pipeline ทำใหม่บน showcase ล่าสุด
+    # (unused_blob_id = None: ไม่ได้ store showcase ใหม่ ไม่มีอะไรต้องลบ)
+    print(f"⚠️ {conflict} Rebasing onto {conflict.blob_id}")
+    if unused_blob_id is not None:
+        try:
+            await walrus_cli.delete_blob_async(unused_blob_id)
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️ Cannot delete unused showcase blob {unused_blob_id}:", describe_error(e))
+    base["blob_id"] = conflict.blob_id
+    base["obj_id"] = conflict.object_id
+    raise Rerun(from_step, str(conflict), conflict.client_error_description)
+
+
+async def delete_showcase_blob(showcase_blob_id, step):
+    try:
+        await walrus_cli.delete_blob_async(showcase_blob_id)
+        print(f"✅ STEP {step} DONE: Old showcase blob deleted successfully.")
+    except subprocess.CalledProcessError as e:
+        raise StepError(f"STEP {step} Error: {describe_error(e)}",
+                        "Failed to delete old showcase blob from Walrus.")
+    except Exception as e:
+        raise StepError(f"STEP {step} Error: {str(e)}",
+                        "Unexpected error during blob deletion.")
@@ -0,0 +1,84 @@
+import os
+import shutil
+import threading
+
+# cache ของ showcase ที่แตกไฟล์แล้ว (ว่าง = ปิด cache) ควรอยู่ filesystem เดียวกับ working directory
+# เพื่อให้การย้าย tree เป็นแค่ rename
+# slot: แยก cache ตาม showcase (shard) ค่าว่างคือ showcase เดียวแบบเดิม
+CACHE_DIR = os.environ.get("SHOWCASE_CACHE_DIR", ".showcase-cache")
+TREE_DIR = "tree"
+ARCHIVE_FILE = "archive.zip"
+BLOB_ID_FILE = "BLOB_ID"
+
+_lock = threading.Lock()
+
+
+def _tree_path(slot=""):
+    return os.path.join(CACHE_DIR, slot, TREE_DIR)
+
+
+def _archive_path(slot=""):
+    return os.path.join(CACHE_DIR, slot, ARCHIVE_FILE)
+
+
+def _blob_id_path(slot=""):
+    return os.path.join(CACHE_DIR, slot, BLOB_ID_FILE)
+
+
+def cached_blob_id(slot=""):
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(_blob_id_path(slot)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def invalidate(slot=""):
+    # ลบ tag ก่อนเสมอ เพื่อไม่ให้มีใครเห็น tree ที่ลบไม่เสร็จ
+    try:
+        os.remove(_blob_id_path(slot))
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(_tree_path(slot), ignore_errors=True)
+    try:
+        os.remove(_archive_path(slot))
+    except FileNotFoundError:
+        pass
+
+
+def checkout(showcase_blob_id, dest, archive_dest, slot=""):
+    # ย้าย tree และ zip ที่ cache ไว้ไปที่ dest/archive_dest ถ้า BlobID ตรงกัน
+    # (คืนค่า False ถ้าต้องดาวน์โหลดใหม่)
+    if not CACHE_DIR:
+        return False
+
+    with _lock:
+        if (cached_blob_id(slot) != showcase_blob_id or not os.path.isdir(_tree_path(slot))
+                or not os.path.isfile(_archive_path(slot))):
+            invalidate(slot)
+            return False
+
+        # tree ถูกย้ายออกไปแก้ไข cache จึงว่างจนกว่าจะ store showcase ใหม่สำเร็จ
+        os.remove(_blob_id_path(slot))
+        shutil.move(_tree_path(slot), dest)
+        os.replace(_archive_path(slot), archive_dest)
+        return True
+
+
+def refresh(showcase_root, archive_path, showcase_blob_id, slot=""):
+    # เก็บ tree และ zip ของ showcase ที่เพิ่ง store สำเร็จ โดยติด tag เป็น BlobID ใหม่
+    if not CACHE_DIR:
+        return
+
+    with _lock:
+        os.makedirs(os.path.join(CACHE_DIR, slot), exist_ok=True)
+        invalidate(slot)
+        shutil.move(showcase_root, _tree_path(slot))
+        shutil.move(archive_path, _archive_path(slot))
+
+        tmp_path = _blob_id_path(slot) + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(showcase_blob_id)
+        os.replace(tmp_path, _blob_id_path(slot))
@@ -0,0 +1,44 @@
+import hashlib
+import os
+from clients import get_firestore_client
+from content_store import file_digest
+
+# manifest ของเว็บที่ deploy ล่าสุด: sha256 ของทุกไฟล์ + digest รวม
+# digest เก็บใน blob attribute (site_digest) เพื่อเทียบได้โดยไม่ต้องอ่าน Firestore
+# รายการไฟล์เต็มเก็บใน Firestore 'site-manifests/{object_id}'
+MANIFEST_COLLECTION = "site-manifests"
+
+
+def build_manifest(folder_path):
+    # {path ภายในเว็บ: sha256} ต้องคำนวณก่อน site-builder เขียน ws-resources.json ทับ
+    files = {}
+    for root, _, names in os.walk(folder_path):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, folder_path).replace(os.sep, "/")] = file_digest(path)
+    return files
+
+
+def manifest_digest(files, epochs):
+    # epochs รวมอยู่ใน digest: เปลี่ยน epochs ต้อง update ใหม่แม้เนื้อหาเหมือนเดิม
+    digest = hashlib.sha256(f"epochs:{epochs}\n".encode("utf-8"))
+    for path in sorted(files):
+        digest.update(f"{path}\0{files[path]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_manifest(object_id, files, digest, blob_id, site_id):
+    db = get_firestore_client()
+    db.collection(MANIFEST_COLLECTION).document(object_id).set({
+        "Digest": digest,
+        "BlobID": blob_id,
+        "SiteID": site_id,
+        "Files": files,
+    })
+
+
+def delete_manifests(object_ids):
+    # เว็บที่ถูกเอาออกจาก showcase แล้ว (destroy หรือหมดอายุ) ไม่ต้องเทียบ manifest อีก
+    collection = get_firestore_client().collection(MANIFEST_COLLECTION)
+    for object_id in object_ids:
+        collection.document(object_id).delete()
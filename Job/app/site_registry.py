@@ -0,0 +1,27 @@
+from clients import get_firestore_client
+
+# เว็บที่อยู่ใน showcase: 'showcase-sites/{object_id}' เขียนเมื่อ publish สำเร็จ ลบเมื่อเอาออกจาก showcase
+# ใช้หาเว็บที่หมดอายุ (sweep_expired) โดยไม่ต้องรู้ว่า blob อยู่ใน wallet ของใคร
+REGISTRY_COLLECTION = "showcase-sites"
+
+
+def register_sites(entries):
+    # entries: {object_id: attributes}
+    collection = get_firestore_client().collection(REGISTRY_COLLECTION)
+    for object_id, attributes in entries.items():
+        collection.document(object_id).set({
+            "Owner": attributes.get("owner"),
+            "SiteName": attributes.get("site-name"),
+            "EndDate": attributes.get("end_date"),
+        })
+
+
+def unregister_sites(object_ids):
+    collection = get_firestore_client().collection(REGISTRY_COLLECTION)
+    for object_id in object_ids:
+        collection.document(object_id).delete()
+
+
+def tracked_sites():
+    collection = get_firestore_client().collection(REGISTRY_COLLECTION)
+    return [doc.id for doc in collection.stream()]
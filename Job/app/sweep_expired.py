@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timezone
+import os
+import walrus_cli
+from errors import describe_error
+from walrus_info import walrus_info
+
+# จำนวน get-blob-attribute ที่อ่านพร้อมกันตอนหาเว็บที่หมดอายุ
+SWEEP_CONCURRENCY = int(os.environ.get("JOB_SWEEP_CONCURRENCY", "8"))
+EXPIRED_DESCRIPTION = "Site has expired."
+
+
+def parse_date(value):
+    # ISO 8601 จาก frontend (toISOString) เช่น 2026-01-01T00:00:00.000Z
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def expiry_cutoff():
+    # เว็บที่ end_date ไม่เกินเวลาเริ่ม epoch ปัจจุบัน หมดอายุแล้ว
+    info = walrus_info()
+    print(f"📅 Current epoch: {info.current_epoch} (started {info.start_time})")
+    return info.start_time or datetime.now(timezone.utc)
+
+
+def is_expired(attributes, cutoff):
+    # เฉพาะเว็บที่ยังอยู่ใน showcase (status 1)
+    if attributes.get("status") != "1" or not attributes.get("end_date"):
+        return False
+    return parse_date(attributes["end_date"]) <= cutoff
+
+
+async def scan(object_ids, cutoff):
+    slots = asyncio.Semaphore(SWEEP_CONCURRENCY)
+    expired = set()
+
+    async def check(object_id):
+        async with slots:
+            try:
+                attributes = await asyncio.to_thread(walrus_cli.get_blob_attributes, object_id)
+                if is_expired(attributes, cutoff):
+                    expired.add(object_id)
+                    print(f"⌛ {object_id} expired on {attributes['end_date']} "
+                          f"({attributes.get('owner')}/{attributes.get('site-name')})")
+            except Exception as e:
+                print(f"⚠️ Cannot check {object_id}:", describe_error(e))
+
+    await asyncio.gather(*[check(object_id) for object_id in object_ids])
+    return [object_id for object_id in object_ids if object_id in expired]
+
+
+async def scan_published(object_ids):
+    slots = asyncio.Semaphore(SWEEP_CONCURRENCY)
+    published = {}
+
+    async def check(object_id):
+        async with slots:
+            try:
+                attributes = await asyncio.to_thread(walrus_cli.get_blob_attributes, object_id)
+            except Exception as e:
+                print(f"⚠️ Cannot check {object_id}:", describe_error(e))
+                return
+            if attributes.get("status") == "1" and attributes.get("showcase_url"):
+                published[object_id] = attributes
+
+    await asyncio.gather(*[check(object_id) for object_id in object_ids])
+    return {object_id: published[object_id] for object_id in object_ids if object_id in published}
+
+
+def find_published_sites():
+    # เว็บที่อยู่ใน showcase จาก blob ทั้งหมดใน wallet (รวมเว็บที่ publish ก่อนมี showcase-sites)
+    object_ids = walrus_cli.list_blob_object_ids()
+    print(f"🔹 Scanning {len(object_ids)} blob(s) for published sites")
+    published = asyncio.run(scan_published(object_ids))
+    print(f"✅ Found {len(published)} published site(s)")
+    return published
+
+
+def find_expired_sites(object_ids):
+    # คืนค่า object_id ของเว็บที่หมดอายุ เรียงตามลำดับเดิม
+    print(f"🔹 Scanning {len(object_ids)} site(s) for expiry")
+    expired = asyncio.run(scan(object_ids, expiry_cutoff()))
+    print(f"✅ Found {len(expired)} expired site(s)")
+    return expired
@@ -0,0 +1,143 @@
+import os
+import zipfile
+import pytest
+from archive import (
+    ArchiveLimitError, UnsafeArchiveError, extract_archive, filter_archive, rewrite_archive,
+    zip_folder,
+)
+
+
+def write_tree(root, files):
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path) as f:
+                files[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+    return files
+
+
+def read_zip(path):
+    with zipfile.ZipFile(path) as zipf:
+        return {info.filename: zipf.read(info).decode() for info in zipf.infolist()
+                if not info.is_dir()}
+
+
+@pytest.fixture
+def showcase(tmp_path):
+    # showcase 2 owner พร้อม zip เดิมของมัน
+    root = tmp_path / "Site"
+    write_tree(root, {
+        "index.html": "<html>showcase</html>",
+        "0xalice/blog/index.html": "<html>alice</html>" * 50,
+        "0xalice/blog/assets/app.js": "console.log('alice')",
+        "0xbob/shop/index.html": "<html>bob</html>" * 50,
+    })
+    old_zip = tmp_path / "Site.zip"
+    zip_folder(str(root), str(old_zip))
+    return root, old_zip
+
+
+def test_rewrite_archive_matches_the_tree_and_reuses_unchanged_entries(tmp_path, showcase):
+    root, old_zip = showcase
+    write_tree(root, {
+        "0xalice/blog/index.html": "<html>alice v2</html>",
+        "0xcarol/docs/index.html": "<html>carol</html>",
+    })
+    os.remove(root / "0xalice/blog/assets/app.js")
+    new_zip = tmp_path / "new.zip"
+
+    stats = rewrite_archive(str(old_zip), str(root), str(new_zip), changed_prefixes=["0xalice/blog"])
+
+    assert read_zip(new_zip) == read_tree(root)
+    assert stats["reused"] == 2
+    assert stats["dropped"] == 1
+
+
+def test_rewrite_archive_skip_root_leaves_out_top_level_files(tmp_path, showcase):
+    root, old_zip = showcase
+    new_zip = tmp_path / "new.zip"
+
+    rewrite_archive(str(old_zip), str(root), str(new_zip), skip_root=True)
+
+    assert "index.html" not in read_zip(new_zip)
+    assert "0xbob/shop/index.html" in read_zip(new_zip)
+
+
+def test_filter_archive_drops_prefix_without_touching_other_entries(tmp_path, showcase):
+    _, old_zip = showcase
+    new_zip = tmp_path / "new.zip"
+
+    stats = filter_archive(str(old_zip), str(new_zip), drop_prefixes=["0xalice/blog"])
+
+    expected = {name: content for name, content in read_zip(old_zip).items()
+                if not name.startswith("0xalice/")}
+    assert read_zip(new_zip) == expected
+    assert stats["dropped"] == 2
+    with zipfile.ZipFile(old_zip) as old, zipfile.ZipFile(new_zip) as new:
+        assert new.getinfo("0xbob/shop/index.html").compress_size == \
+            old.getinfo("0xbob/shop/index.html").compress_size
+
+
+def test_filter_archive_rewrites_changed_root_files(tmp_path, showcase):
+    root, old_zip = showcase
+    write_tree(root, {"index.html": "<html>new index</html>", "ws-resources.json": "{}"})
+    new_zip = tmp_path / "new.zip"
+
+    filter_archive(str(old_zip), str(new_zip), drop_prefixes=["0xbob"], folder_path=str(root))
+
+    files = read_zip(new_zip)
+    assert files["index.html"] == "<html>new index</html>"
+    assert files["ws-resources.json"] == "{}"
+    assert "0xbob/shop/index.html" not in files
+
+
+def test_filtered_archive_extracts_to_the_remaining_tree(tmp_path, showcase):
+    _, old_zip = showcase
+    new_zip = tmp_path / "new.zip"
+    filter_archive(str(old_zip), str(new_zip), drop_prefixes=["0xbob/shop"])
+    out = tmp_path / "out"
+
+    stats = extract_archive(str(new_zip), str(out))
+
+    assert read_tree(out) == read_zip(new_zip)
+    assert stats["entries"] == 3
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "0xalice/../../evil.txt", "/tmp/evil.txt"])
+def test_extract_archive_rejects_paths_outside_the_folder(tmp_path, name):
+    zip_path = tmp_path / "site.zip"
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        zipf.writestr("index.html", "<html></html>")
+        zipf.writestr(name, "owned")
+    out = tmp_path / "out" / "site"
+
+    with pytest.raises(UnsafeArchiveError):
+        extract_archive(str(zip_path), str(out))
+
+    assert not (tmp_path / "out" / "evil.txt").exists()
+    assert not (tmp_path / "evil.txt").exists()
+    assert not os.path.exists(out / "index.html")
+
+
+def test_extract_archive_checks_the_budget_before_writing(tmp_path):
+    zip_path = tmp_path / "site.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("big.txt", "0" * 10000)
+        zipf.writestr("small.txt", "0")
+    out = tmp_path / "out"
+
+    with pytest.raises(ArchiveLimitError):
+        extract_archive(str(zip_path), str(out), max_bytes=1000)
+    with pytest.raises(ArchiveLimitError):
+        extract_archive(str(zip_path), str(out), max_entries=1)
+
+    assert not (out / "big.txt").exists()
@@ -0,0 +1,129 @@
+import asyncio
+from errors import StepError
+from pipeline import Pipeline, Rerun
+
+
+def test_steps_run_after_their_requirements():
+    order = []
+    pipeline = Pipeline("test")
+
+    @pipeline.step("download")
+    def download():
+        order.append("download")
+        return "tree"
+
+    @pipeline.step("stage")
+    def stage():
+        order.append("stage")
+
+    @pipeline.step("add", requires=["download", "stage"])
+    def add():
+        order.append("add")
+        return pipeline.results["download"] + "+site"
+
+    @pipeline.step("store", requires=["add"])
+    def store():
+        order.append("store")
+
+    assert pipeline.run() is None
+    assert sorted(order[:2]) == ["download", "stage"]
+    assert order[2:] == ["add", "store"]
+    assert pipeline.results["add"] == "tree+site"
+
+
+def test_independent_steps_run_concurrently():
+    # ต่างฝ่ายต่างรออีกฝ่าย: ถ้ารันทีละขั้นจะค้างจน timeout
+    pipeline = Pipeline("test")
+    events = {}
+
+    @pipeline.step("setup")
+    async def setup():
+        events["left"] = asyncio.Event()
+        events["right"] = asyncio.Event()
+
+    @pipeline.step("left", requires=["setup"])
+    async def left():
+        events["left"].set()
+        await asyncio.wait_for(events["right"].wait(), 1)
+
+    @pipeline.step("right", requires=["setup"])
+    async def right():
+        events["right"].set()
+        await asyncio.wait_for(events["left"].wait(), 1)
+
+    assert pipeline.run() is None
+
+
+def test_rerun_repeats_the_step_and_its_dependents():
+    calls = {"check": 0, "download": 0, "store": 0, "swap": 0}
+    pipeline = Pipeline("test", max_reruns=2)
+
+    @pipeline.step("check")
+    def check():
+        calls["check"] += 1
+
+    @pipeline.step("download", requires=["check"])
+    def download():
+        calls["download"] += 1
+
+    @pipeline.step("store", requires=["download"])
+    def store():
+        calls["store"] += 1
+
+    @pipeline.step("swap", requires=["store"])
+    def swap():
+        calls["swap"] += 1
+        if calls["swap"] == 1:
+            raise Rerun("download", "reference moved")
+
+    assert pipeline.run() is None
+    assert calls == {"check": 1, "download": 2, "store": 2, "swap": 2}
+
+
+def test_rerun_over_the_limit_fails_the_pipeline():
+    handled = []
+    finished = []
+    pipeline = Pipeline("test", max_reruns=1)
+
+    @pipeline.step("swap")
+    def swap():
+        raise Rerun("swap", "reference moved", "Showcase is busy.")
+
+    @pipeline.on_error
+    def record_error(e):
+        handled.append(e)
+
+    @pipeline.finally_step
+    def cleanup():
+        finished.append(True)
+
+    error = pipeline.run()
+    assert isinstance(error, Rerun)
+    assert handled == [error]
+    assert finished == [True]
+
+
+def test_failing_step_cancels_the_rest_and_keeps_its_client_error():
+    cancelled = []
+    pipeline = Pipeline("test")
+
+    @pipeline.step("slow")
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    @pipeline.step("broken", client_error_description="Failed to move static site.")
+    def broken():
+        raise RuntimeError("disk full")
+
+    @pipeline.step("after", requires=["broken"])
+    def after():
+        raise AssertionError("must not run")
+
+    error = pipeline.run()
+    assert isinstance(error, StepError)
+    assert error.client_error_description == "Failed to move static site."
+    assert cancelled == [True]
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import pytest
+import showcase_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(showcase_cache, "CACHE_DIR", str(path))
+    return path
+
+
+def make_showcase(root, content):
+    os.makedirs(root / "0xalice" / "blog")
+    (root / "index.html").write_text(content)
+    (root / "0xalice" / "blog" / "index.html").write_text("<html>alice</html>")
+    (root.parent / f"{root.name}.zip").write_text(f"zip of {content}")
+    return root, root.parent / f"{root.name}.zip"
+
+
+def test_refresh_then_checkout_returns_the_tree(tmp_path, cache_dir):
+    root, archive = make_showcase(tmp_path / "job1" / "Site", "v1")
+    showcase_cache.refresh(str(root), str(archive), "blob-1")
+    assert showcase_cache.cached_blob_id() == "blob-1"
+
+    dest = tmp_path / "job2" / "Site"
+    os.makedirs(dest.parent)
+    assert showcase_cache.checkout("blob-1", str(dest), str(dest) + ".zip")
+    assert (dest / "0xalice" / "blog" / "index.html").read_text() == "<html>alice</html>"
+    assert (tmp_path / "job2" / "Site.zip").read_text() == "zip of v1"
+
+
+def test_checkout_and_refresh_keep_the_cache_populated_across_jobs(tmp_path, cache_dir):
+    # publish: checkout ฐาน -> แก้ tree -> store -> refresh ด้วย blob ใหม่; job ถัดไปต้องได้ cache hit
+    root, archive = make_showcase(tmp_path / "job1" / "Site", "v1")
+    showcase_cache.refresh(str(root), str(archive), "blob-1")
+
+    for job, blob_id in [("job2", "blob-2"), ("job3", "blob-3")]:
+        dest = tmp_path / job / "Site"
+        os.makedirs(dest.parent)
+        base = showcase_cache.cached_blob_id()
+        assert showcase_cache.checkout(base, str(dest), str(dest) + ".zip")
+        (dest / "index.html").write_text(blob_id)
+        new_archive = tmp_path / job / "new_showcase.zip"
+        new_archive.write_text(f"zip of {blob_id}")
+        showcase_cache.refresh(str(dest), str(new_archive), blob_id)
+
+        assert showcase_cache.cached_blob_id() == blob_id
+        assert (cache_dir / showcase_cache.TREE_DIR / "index.html").read_text() == blob_id
+
+
+def test_checkout_of_another_blob_misses_and_invalidates(tmp_path, cache_dir):
+    root, archive = make_showcase(tmp_path / "job1" / "Site", "v1")
+    showcase_cache.refresh(str(root), str(archive), "blob-1")
+
+    dest = tmp_path / "job2" / "Site"
+    assert not showcase_cache.checkout("blob-2", str(dest), str(dest) + ".zip")
+    assert showcase_cache.cached_blob_id() is None
+    assert not os.path.exists(cache_dir / showcase_cache.TREE_DIR)
+    assert not os.path.exists(dest)
+
+
+def test_slots_are_cached_separately(tmp_path, cache_dir):
+    legacy, legacy_archive = make_showcase(tmp_path / "a" / "Site", "legacy")
+    shard, shard_archive = make_showcase(tmp_path / "b" / "Site", "shard")
+    showcase_cache.refresh(str(legacy), str(legacy_archive), "blob-legacy")
+    showcase_cache.refresh(str(shard), str(shard_archive), "blob-shard", slot="reference-0")
+
+    assert showcase_cache.cached_blob_id() == "blob-legacy"
+    assert showcase_cache.cached_blob_id("reference-0") == "blob-shard"
+
+
+def test_sync_showcase_site_leaves_the_updated_tree_in_the_cache(tmp_path, cache_dir, monkeypatch):
+    # ขั้น update_site ของ publish/delete: site-builder update แล้ว tree ต้องอยู่ใน cache ไม่ใช่ถูก checkout ออก
+    pytest.importorskip("google.cloud.firestore")
+    import showcase
+    import walrus_cli
+
+    updated = []
+
+    async def update_site(root, site_id, epochs):
+        (tmp_path / "job1" / "Site" / "ws-resources.json").write_text('{"object_id": "0xsite"}')
+        updated.append(root)
+
+    monkeypatch.setattr(walrus_cli, "update_site_async", update_site)
+    monkeypatch.setattr(showcase, "showcase_reference_blob_id", lambda document: "blob-2")
+    monkeypatch.setattr(showcase.content_store, "STORE_DIR", "")
+    root, archive = make_showcase(tmp_path / "job1" / "Site", "v2")
+
+    asyncio.run(showcase.sync_showcase_site(str(root), "blob-2", "6", "Site update failed.",
+                                            archive_path=str(archive)))
+
+    assert updated == [str(root)]
+    assert showcase_cache.cached_blob_id() == "blob-2"
+    assert (cache_dir / showcase_cache.TREE_DIR / "ws-resources.json").exists()
+    dest = tmp_path / "job2" / "Site"
+    os.makedirs(dest.parent)
+    assert showcase_cache.checkout("blob-2", str(dest), str(dest) + ".zip")
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+# timeout (วินาที) ของแต่ละคำสั่ง, 0 = ไม่จำกัด
+WALRUS_TIMEOUT = float(os.environ.get("WALRUS_TIMEOUT", "0")) or None
+SITE_BUILDER_TIMEOUT = float(os.environ.get("SITE_BUILDER_TIMEOUT", "0")) or None
+# store/read ผ่าน JSON mode ของ CLI (walrus json) แทนการ parse output แบบข้อความ, 0 = ใช้แบบข้อความเดิม
+WALRUS_JSON = os.environ.get("WALRUS_JSON", "1") != "0"
+# client config ที่ส่งไปกับทุกคำสั่ง JSON (ว่าง = ค่า default ของ CLI)
+WALRUS_CONFIG = os.environ.get("WALRUS_CONFIG", "")
+
+
+class WalrusOutputError(RuntimeError):
+    # คำสั่งสำเร็จ แต่ไม่พบค่าที่ต้องการใน output
+    pass
+
+
+@dataclass(frozen=True)
+class StoreResult:
+    blob_id: str
+    object_id: str
+
+
+_lock = threading.Lock()
+# cache ของ get-blob-attribute ของ operation ปัจจุบัน (None = นอก operation ไม่ cache)
+# แยกตาม operation เพราะ server รันหลาย operation พร้อมกันได้
+_attributes = ContextVar("attribute_cache", default=None)
+# สถิติคำสั่งของ operation ปัจจุบัน {"walrus read": {"calls": n, "failures": n, "seconds": s}}
+# (None = นอก operation ไม่เก็บ)
+_stats = ContextVar("command_stats", default=None)
+# attribute ที่รอเขียนของ operation ปัจจุบัน {object_id: {key: value}} (None = เขียนทันที)
+_pending = ContextVar("pending_attributes", default=None)
+
+
+@contextmanager
+def attribute_cache():
+    token = _attributes.set({})
+    try:
+        yield
+    finally:
+        _attributes.reset(token)
+
+
+@contextmanager
+def command_stats():
+    # คืนค่า dict ที่เก็บสถิติของทุกคำสั่งภายใน block นี้ (รวมที่รันใน thread/asyncio task ย่อย)
+    collected = {}
+    token = _stats.set(collected)
+    try:
+        yield collected
+    finally:
+        _stats.reset(token)
+
+
+def _record(name, seconds, ok):
+    collected = _stats.get()
+    if collected is None:
+        return
+    with _lock:
+        stats = collected.setdefault(name, {"calls": 0, "failures": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        if not ok:
+            stats["failures"] += 1
+
+
+def run(command, input=None, timeout=None, name=None):
+    # จุดเดียวที่เรียก CLI: check=True, เก็บเวลา และ timeout
+    name = name or " ".join(command[:2])
+    started = time.monotonic()
+    ok = False
+    try:
+        result = subprocess.run(
+            command, input=input, timeout=timeout,
+            check=True, capture_output=True, text=True
+        )
+        ok = True
+        return result
+    finally:
+        _record(name, time.monotonic() - started, ok)
+
+
+async def run_async(command, input=None, timeout=None):
+    # เหมือน run() แต่ใช้ asyncio subprocess ให้หลายคำสั่งรันพร้อมกันใน event loop เดียว
+    name = " ".join(command[:2])
+    started = time.monotonic()
+    ok = False
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input.encode() if input is not None else None), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, timeout)
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+        stdout, stderr = stdout.decode(), stderr.decode()
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        ok = True
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+    finally:
+        _record(name, time.monotonic() - started, ok)
+
+
+def walrus(*args, input=None):
+    return run(["walrus", *args], input=input, timeout=WALRUS_TIMEOUT)
+
+
+def site_builder(*args):
+    return run(["site-builder", *args], timeout=SITE_BUILDER_TIMEOUT)
+
+
+def run_json(request):
+    # ส่ง request ทาง stdin ของ walrus json แล้วคืนค่า JSON ที่ CLI พิมพ์ (สถิติแยกตามคำสั่งเหมือนแบบข้อความ)
+    command = next(iter(request["command"]))
+    result = run(["walrus", "json"], input=json.dumps(request), timeout=WALRUS_TIMEOUT,
+                 name=f"walrus {command}")
+    try:
+        return json.loads(result.stdout)
+    except ValueError:
+        raise WalrusOutputError(f"Invalid JSON output from walrus {command}: {result.stdout[:200]}")
+
+
+def walrus_json(command, **args):
+    # {"config": ..., "command": {"store": {"files": [...], "epochs": 2}}} ชื่อ option เป็น camelCase
+    request = {"command": {command: args}}
+    if WALRUS_CONFIG:
+        request["config"] = WALRUS_CONFIG
+    return run_json(request)
+
+
+async def walrus_async(*args, input=None):
+    return await run_async(["walrus", *args], input=input, timeout=WALRUS_TIMEOUT)
+
+
+async def site_builder_async(*args):
+    return await run_async(["site-builder", *args], timeout=SITE_BUILDER_TIMEOUT)
+
+
+def parse_attributes(stdout):
+    attributes = {}
+    for line in stdout.strip().splitlines():
+        if ':' in line:
+            key, value = line.split(':', 1)
+            attributes[key.strip()] = value.strip()
+    return attributes
+
+
+def parse_store_output(stdout):
+    blob_id = None
+    object_id = None
+
+    for line in stdout.strip().splitlines():
+        if line.startswith("Blob ID:"):
+            blob_id = line.split(":", 1)[1].strip()
+        elif line.startswith("Sui object ID:"):
+            object_id = line.split(":", 1)[1].strip()
+
+    if not blob_id or not object_id:
+        raise WalrusOutputError("⚠️ ไม่พบค่า Blob ID หรือ Sui object ID จากผลลัพธ์ของคำสั่ง walrus store")
+    return StoreResult(blob_id, object_id)
+
+
+def list_blob_object_ids():
+    # object id ของทุก blob ใน wallet ของ Job รวมที่หมดอายุแล้ว (มีแค่ใน JSON mode ที่อ่านได้แน่นอน)
+    # แต่ละรายการเป็น blob object หรือ {"blob": blob object, "attribute": ...}
+    response = walrus_json("listBlobs", includeExpired=True)
+    return [item.get("blob", item)["id"] for item in response]
+
+
+def parse_store_response(response):
+    # [{"blobStoreResult": {"newlyCreated": {"blobObject": {"id": ..., "blobId": ...}}}, "path": ...}]
+    results = []
+    for item in response:
+        outcome = item.get("blobStoreResult", {})
+        blob_object = outcome.get("newlyCreated", {}).get("blobObject", {})
+        if not blob_object.get("blobId") or not blob_object.get("id"):
+            raise WalrusOutputError(
+                f"⚠️ ไม่พบ blobId หรือ object id ของ {item.get('path')} จาก walrus store ({', '.join(outcome)})")
+        results.append(StoreResult(blob_object["blobId"], blob_object["id"]))
+    return results
+
+
+def get_blob_attributes(object_id, refresh=False):
+    cache = _attributes.get()
+    with _lock:
+        cached = None if refresh or cache is None else cache.get(object_id)
+    if cached is not None:
+        return dict(cached)
+
+    attributes = parse_attributes(walrus("get-blob-attribute", object_id).stdout)
+    pending = _pending.get()
+    with _lock:
+        # ค่าที่ยังรอเขียนใหม่กว่าค่าบน chain
+        if pending is not None and object_id in pending:
+            attributes.update(pending[object_id])
+        if cache is not None:
+            cache[object_id] = attributes
+    return dict(attributes)
+
+
+def _update_cache(object_id, attributes):
+    cache = _attributes.get()
+    with _lock:
+        if cache is not None and object_id in cache:
+            cache[object_id].update(attributes)
+
+
+def set_blob_attributes(object_id, attributes):
+    pending = _pending.get()
+    if pending is None:
+        write_blob_attributes(object_id, attributes)
+        return
+
+    with _lock:
+        pending.setdefault(object_id, {}).update(attributes)
+    _update_cache(object_id, attributes)
+
+
+@contextmanager
+def attribute_batch():
+    # รวม set-blob-attribute ทั้งหมดของ operation เป็น transaction เดียวต่อ blob
+    # เขียนตอนจบ operation เสมอ แม้ operation จะ fail
+    pending = {}
+    token = _pending.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending.reset(token)
+        flush_attributes(pending)
+
+
+def flush_attributes(pending):
+    for object_id, attributes in pending.items():
+        try:
+            write_blob_attributes(object_id, attributes)
+            print(f"✅ Blob attributes written ({object_id}, {len(attributes)} attribute(s))")
+        except subprocess.SubprocessError as e:
+            print(f"❌ Cannot write blob attributes ({object_id}):", e.stderr or str(e))
+
+
+def write_blob_attributes(object_id, attributes):
+    command = ["set-blob-attribute", object_id]
+    for key, value in attributes.items():
+        command += ["--attr", key, value]
+
+    try:
+        walrus(*command)
+    except Exception:
+        cache = _attributes.get()
+        with _lock:
+            if cache is not None:
+                cache.pop(object_id, None)
+        raise
+
+    # เขียนสำเร็จ: cache เป็นค่าล่าสุดที่เพิ่งเขียน ไม่ต้องอ่านซ้ำ
+    _update_cache(object_id, attributes)
+
+
+def read_blob(blob_id, out_path):
+    if WALRUS_JSON:
+        walrus_json("read", blobId=blob_id, out=out_path)
+        return
+    walrus("read", blob_id, "--out", out_path)
+
+
+def store_blob(path, epochs, deletable=True, force=True):
+    if WALRUS_JSON:
+        response = walrus_json("store", files=[path], epochs=int(epochs),
+                               deletable=deletable, force=force)
+        return parse_store_response(response)[0]
+
+    command = ["store", path, "--epochs", str(epochs)]
+    if deletable:
+        command.append("--deletable")
+    if force:
+        command.append("--force")
+    return parse_store_output(walrus(*command).stdout)
+
+
+async def delete_blob_async(blob_id):
+    await walrus_async("delete", "--blob-id", blob_id, "--yes", "--no-status-check")
+
+
+async def burn_blobs_async(object_ids=None):
+    # object_ids = None คือ burn ทุก blob (--all)
+    if object_ids is None:
+        await walrus_async("burn-blobs", "--all", input="y\n")
+    else:
+        await walrus_async("burn-blobs", "--object-ids", *object_ids, input="y\n")
+
+
+async def extend_blob_async(object_id, epochs):
+    await walrus_async("extend", "--blob-obj-id", object_id, "--epochs-extended", str(epochs))
+
+
+def info():
+    return walrus("info").stdout
+
+
+def parse_site_id(output):
+    # ใช้ regex เพื่อดึง site object ID
+    match = re.search(r"New site object ID:\s+(0x[a-fA-F0-9]+)", output)
+    if not match:
+        raise WalrusOutputError("Site ID not found in the output.")
+    return match.group(1)
+
+
+async def publish_site_async(directory, epochs):
+    result = await site_builder_async("publish", directory, "--epochs", str(epochs))
+    return parse_site_id(result.stdout)
+
+
+async def update_site_async(directory, site_id, epochs):
+    await site_builder_async("update", "--epochs", str(epochs), directory, site_id)
+
+
+async def destroy_site_async(site_id):
+    await site_builder_async("destroy", site_id)
@@ -1,68 +1,181 @@
-from datetime import datetime, timezone
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+import json
 import re
 import subprocess
+import threading
 import os
+import walrus_cli
 
-def get_walrus_info():
+# cache ของ `walrus info` บน disk (ว่าง = cache ใน memory อย่างเดียว)
+# ค่าพวกนี้เปลี่ยนได้อย่างมากครั้งเดียวต่อ epoch จึงใช้ได้จนถึง end_time ของ epoch ปัจจุบัน
+CACHE_FILE = os.environ.get("WALRUS_INFO_CACHE", ".walrus-info.json")
+# อายุ cache (วินาที) เมื่อ parse end_time ไม่ได้
+FALLBACK_TTL = float(os.environ.get("WALRUS_INFO_TTL", "3600"))
+# อายุขั้นต่ำ (วินาที) เมื่อ end_time ผ่านไปแล้วแต่ walrus ยังไม่ขึ้น epoch ใหม่
+MIN_TTL = 60
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f %Z"
+GIB = 1024 ** 3
+
+
+@dataclass(frozen=True)
+class WalrusInfo:
+    current_epoch: int = None
+    start_time: datetime = None
+    end_time: datetime = None
+    epoch_duration_days: float = None
+    max_epochs: int = None
+    maximum_blob_size_gib: float = None
+    price_per_encoded_storage_unit_wal: float = None
+    additional_price_per_write_frost: int = None
+
+    @property
+    def maximum_blob_size_bytes(self):
+        if self.maximum_blob_size_gib is None:
+            return None
+        return int(self.maximum_blob_size_gib * GIB)
+
+    def expires_at(self, now):
+        if self.end_time is None:
+            return now + timedelta(seconds=FALLBACK_TTL)
+        return max(self.end_time, now + timedelta(seconds=MIN_TTL))
+
+    def to_dict(self):
+        # ชื่อ key เดิมของ get_walrus_info
+        data = {
+            "current_epoch": self.current_epoch,
+            "start_time": format_time(self.start_time),
+            "end_time": format_time(self.end_time),
+            "epoch_duration_Days": self.epoch_duration_days,
+            "max_epoch": self.max_epochs,
+            "maximum_blob_size_GiB": self.maximum_blob_size_gib,
+            "price_per_encoded_storage_unit_WAL": self.price_per_encoded_storage_unit_wal,
+            "additional_price_per_write_FROST": self.additional_price_per_write_frost,
+        }
+        return {key: value for key, value in data.items() if value is not None}
+
+
+_lock = threading.Lock()
+# (WalrusInfo, หมดอายุเมื่อ)
+_cached = None
+
+
+def parse_time(raw_time):
     try:
-        result = subprocess.run(["walrus", "info"],
-                                capture_output=True, text=True)
+        return datetime.strptime(raw_time, TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def format_time(dt):
+    if dt is None:
+        return None
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def parse_info(stdout):
+    fields = {}
+    for line in stdout.strip().splitlines():
+        line = line.strip()
+        if line.startswith("Current epoch:"):
+            fields["current_epoch"] = int(line.split(":")[1].strip())
+        elif line.startswith("Start time:"):
+            fields["start_time"] = parse_time(line.split(": ", 1)[1].strip())
+        elif line.startswith("End time:"):
+            fields["end_time"] = parse_time(line.split(": ", 1)[1].strip())
+        elif line.startswith("Epoch duration:"):
+            match = re.search(r"(\d+)", line)
+            if match:
+                fields["epoch_duration_days"] = float(match.group(1))
+        elif "stored for at most" in line:
+            match = re.search(r"at most (\d+) epochs", line)
+            if match:
+                fields["max_epochs"] = int(match.group(1))
+        elif line.startswith("Maximum blob size:"):
+            fields["maximum_blob_size_gib"] = float(line.split(":")[1].strip().split(" ")[0])
+        elif "Price per encoded storage unit" in line:
+            match = re.search(r"([\d.]+) WAL", line)
+            if match:
+                fields["price_per_encoded_storage_unit_wal"] = float(match.group(1))
+        elif "Additional price for each write" in line:
+            match = re.search(r"([\d,]+) FROST", line)
+            if match:
+                fields["additional_price_per_write_frost"] = int(match.group(1).replace(",", ""))
+    return WalrusInfo(**fields)
 
-        if result.returncode != 0:
+
+def _load_cache_file():
+    if not CACHE_FILE:
+        return None
+    try:
+        with open(CACHE_FILE) as f:
+            data = json.load(f)
+        fields = data["info"]
+        for key in ("start_time", "end_time"):
+            if fields.get(key):
+                fields[key] = datetime.fromisoformat(fields[key])
+        return WalrusInfo(**fields), datetime.fromisoformat(data["expires_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_cache_file(info, expires_at):
+    if not CACHE_FILE:
+        return
+    fields = asdict(info)
+    for key in ("start_time", "end_time"):
+        if fields[key] is not None:
+            fields[key] = fields[key].isoformat()
+    try:
+        tmp_path = CACHE_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"info": fields, "expires_at": expires_at.isoformat()}, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Cannot cache walrus info:", str(e))
+
+
+def walrus_info(refresh=False):
+    # WalrusInfo ของ epoch ปัจจุบัน: เรียก `walrus info` เฉพาะเมื่อ cache หมดอายุ (ขึ้น epoch ใหม่)
+    # raise CalledProcessError ถ้าเรียก walrus ไม่สำเร็จ
+    global _cached
+    now = datetime.now(timezone.utc)
+    with _lock:
+        if not refresh:
+            if _cached is None or now >= _cached[1]:
+                _cached = _load_cache_file()
+            if _cached is not None and now < _cached[1]:
+                return _cached[0]
+
+        info = parse_info(walrus_cli.info())
+        expires_at = info.expires_at(now)
+        _cached = (info, expires_at)
+        _save_cache_file(info, expires_at)
+        return info
+
+
+def get_walrus_info():
+    try:
+        try:
+            info = walrus_info()
+        except subprocess.CalledProcessError as e:
             print({
                 "success": False,
-                "stderr": result.stderr.strip().split("\n"),
-                "exit_code": result.returncode
+                "stderr": (e.stderr or "").strip().split("\n"),
+                "exit_code": e.returncode
             })
-            return
-
-        stdout_lines = result.stdout.strip().splitlines()
-        response = {}
-
-        for line in stdout_lines:
-            if line.startswith("Current epoch:"):
-                response["current_epoch"] = int(line.split(":")[1].strip())
-            elif line.startswith("Start time:"):
-                raw_time = line.split(": ", 1)[1].strip()
-                try:
-                    dt = datetime.strptime(raw_time, "%Y-%m-%d %H:%M:%S.%f %Z")
-                    response["start_time"] = dt.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
-                except ValueError:
-                    response["start_time"] = raw_time
-            elif line.startswith("End time:"):
-                raw_time = line.split(": ", 1)[1].strip()
-                try:
-                    dt = datetime.strptime(raw_time, "%Y-%m-%d %H:%M:%S.%f %Z")
-                    response["end_time"] = dt.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
-                except ValueError:
-                    response["end_time"] = raw_time
-            elif line.startswith("Epoch duration:"):
-                match = re.search(r"(\d+)", line)
-                if match:
-                    response["epoch_duration_Days"] = float(match.group(1))
-            elif "stored for at most" in line:
-                match = re.search(r"at most (\d+) epochs", line)
-                if match:
-                    response["max_epoch"] = int(match.group(1))
-            elif line.startswith("Maximum blob size:"):
-                response["maximum_blob_size_GiB"] = float(line.split(":")[1].strip().split(" ")[0])
-            elif "Price per encoded storage unit" in line:
-                match = re.search(r"([\d.]+) WAL", line)
-                if match:
-                    response["price_per_encoded_storage_unit_WAL"] = float(match.group(1))
-            elif "Additional price for each write" in line:
-                match = re.search(r"([\d,]+) FROST", line)
-                if match:
-                    response["additional_price_per_write_FROST"] = int(match.group(1).replace(",", ""))
+            return None
 
         print({
             "success": True,
-            "data": response ,
+            "data": info.to_dict(),
             "check_client" : os.environ.get("SUI_KEYSTORE_CONTENT")
         })
+        return info
 
     except Exception as e:
         print({
             "success": False,
             "error": str(e)
-        })
\ No newline at end of file
+        })
+        return None
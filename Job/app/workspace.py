@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from errors import StepError
+
+# โฟลเดอร์ทำงานของแต่ละ operation (Site, Site.zip, staging, new_showcase.zip ...) อยู่ใต้ WORKSPACE_DIR
+# ถ้าใช้ tmpfs (เช่น /dev/shm/ivory) ให้ SHOWCASE_CACHE_DIR และ CONTENT_STORE_DIR อยู่ filesystem เดียวกัน
+# เพื่อให้ย้าย tree/hardlink ได้โดยไม่ต้องคัดลอก
+WORKSPACE_DIR = os.environ.get("JOB_WORKSPACE_DIR", ".workspaces")
+# พื้นที่สูงสุดของหนึ่ง workspace (MiB, 0 = ไม่จำกัด) ตรวจทุกครั้งที่จบแต่ละขั้นของ pipeline
+QUOTA_BYTES = int(os.environ.get("JOB_WORKSPACE_QUOTA_MB", "0")) * 1024 * 1024
+
+_current = ContextVar("workspace", default=None)
+_lock = threading.Lock()
+# workspace ที่สร้างไว้ล่วงหน้า (โหมด server) และตัวที่ว่างอยู่
+_preallocated = set()
+_free = []
+
+
+class WorkspaceQuotaError(StepError):
+    def __init__(self, used):
+        super().__init__(f"Workspace uses {used} bytes, quota is {QUOTA_BYTES} bytes.",
+                         "Site is too large to process.")
+
+
+def path(*parts):
+    # path ภายใน workspace ของ operation ปัจจุบัน (นอก operation = working directory เดิม)
+    root = _current.get()
+    return os.path.join(root, *parts) if root else os.path.join(*parts)
+
+
+def clear(root, prefixes=None):
+    for entry in os.scandir(root):
+        if prefixes is not None and not entry.name.startswith(prefixes):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def preallocate(count):
+    # worker ที่อยู่นานสร้าง workspace ไว้ครั้งเดียวแล้วใช้ซ้ำ (ลบของค้างจาก process ก่อนหน้า)
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    clear(WORKSPACE_DIR, prefixes=("ws-", "job-"))
+    with _lock:
+        for index in range(count):
+            root = os.path.join(WORKSPACE_DIR, f"ws-{index}")
+            os.makedirs(root)
+            _preallocated.add(root)
+            _free.append(root)
+
+
+def _acquire():
+    with _lock:
+        if _free:
+            return _free.pop()
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix="job-", dir=WORKSPACE_DIR)
+
+
+def _release(root):
+    if root in _preallocated:
+        clear(root)
+        with _lock:
+            _free.append(root)
+    else:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@contextmanager
+def scope():
+    # ทุกอย่างที่ operation เขียนลง workspace ถูกลบเมื่อจบ ไม่ว่าจะสำเร็จหรือไม่
+    root = _acquire()
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        _current.reset(token)
+        _release(root)
+
+
+def usage(root):
+    # byte ที่ใช้จริงบน disk (hardlink นับครั้งเดียว)
+    used = 0
+    seen = set()
+    stack = [root]
+    while stack:
+        for entry in os.scandir(stack.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_ino not in seen:
+                seen.add(stat.st_ino)
+                used += stat.st_blocks * 512
+    return used
+
+
+def check_quota():
+    root = _current.get()
+    if not QUOTA_BYTES or root is None:
+        return
+    used = usage(root)
+    if used > QUOTA_BYTES:
+        raise WorkspaceQuotaError(used)
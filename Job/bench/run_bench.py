@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# Benchmark ของ Job operation (publish, get_site_id, delete_site, set_zero) กับ showcase สังเคราะห์หลายขนาด
+# ใช้ walrus/site-builder จำลองใน fakebin/ และ Firestore จำลองใน stubs/ จึงไม่เสีย WAL
+#
+#   python3 Job/bench/run_bench.py --sizes 10 100 1000 --walrus-latency 0.05 --site-builder-latency 0.5
+#
+# เวลาแต่ละ step มาจาก JSON metrics log ของ Job (metrics.py)
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+FAKEBIN_DIR = os.path.join(BENCH_DIR, "fakebin")
+STUBS_DIR = os.path.join(BENCH_DIR, "stubs")
+
+SHOWCASE_BLOB_ID = "bench-showcase"
+SHOWCASE_OBJECT_ID = "0xbenchshowcase"
+SITE_BLOB_ID = "bench-site"
+SITE_OBJECT_ID = "0xbenchsite"
+OPERATIONS = [
+    ("publish", SITE_OBJECT_ID),
+    ("get_site_id", SITE_OBJECT_ID),
+    ("delete_site", SITE_OBJECT_ID),
+    ("set_zero", None),
+]
+WORDS = ["walrus", "site", "blob", "epoch", "sui", "ivory", "showcase", "static",
+         "function", "return", "const", "div", "class", "style", "render", "owner"]
+SITES_PER_OWNER = 5
+
+
+def text(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def write_site(zipf, prefix, index, rng, vendor):
+    # ไฟล์หน้าตาเหมือนเว็บ build จริง: html/js/css ที่บีบอัดได้, รูปที่บีบอัดไม่ได้ และ bundle ที่ซ้ำกันทุกเว็บ
+    zipf.writestr(f"{prefix}index.html", f"<html><body><h1>Site {index}</h1>{text(rng, 2048)}</body></html>")
+    zipf.writestr(f"{prefix}assets/app-{index}.js", text(rng, 16 * 1024))
+    zipf.writestr(f"{prefix}assets/style.css", text(rng, 4 * 1024))
+    zipf.writestr(f"{prefix}assets/vendor.js", vendor)
+    zipf.writestr(f"{prefix}images/logo.png", rng.randbytes(8 * 1024))
+
+
+def make_showcase(path, sites, seed=0):
+    rng = random.Random(seed)
+    vendor = text(random.Random(-1), 64 * 1024)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("index.html", "<html><body>IVORY showcase</body></html>")
+        for index in range(sites):
+            owner = f"0xowner{index // SITES_PER_OWNER:04d}"
+            write_site(zipf, f"{owner}/site{index % SITES_PER_OWNER}/", index, rng, vendor)
+
+
+def make_site(path, seed=1):
+    rng = random.Random(seed)
+    vendor = text(random.Random(-1), 64 * 1024)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        write_site(zipf, "", "bench", rng, vendor)
+
+
+def prepare(workdir, sites):
+    store = os.path.join(workdir, "store")
+    run_dir = os.path.join(workdir, "app")
+    os.makedirs(os.path.join(store, "blobs"))
+    os.makedirs(os.path.join(store, "attributes"))
+    os.makedirs(run_dir)
+
+    make_showcase(os.path.join(store, "blobs", SHOWCASE_BLOB_ID), sites)
+    make_site(os.path.join(store, "blobs", SITE_BLOB_ID))
+
+    # set_zero ใช้ IVORY-SHOWCASE(.zip) ใน working directory
+    shutil.copyfile(os.path.join(store, "blobs", SHOWCASE_BLOB_ID),
+                    os.path.join(run_dir, "IVORY-SHOWCASE.zip"))
+    with zipfile.ZipFile(os.path.join(run_dir, "IVORY-SHOWCASE.zip")) as zipf:
+        zipf.extractall(os.path.join(run_dir, "IVORY-SHOWCASE"))
+
+    with open(os.path.join(store, "attributes", f"{SITE_OBJECT_ID}.json"), "w") as f:
+        json.dump({
+            "site-name": "bench-site", "owner": "0xbenchowner", "epochs": "2",
+            "start_date": "2026-01-01", "end_date": "2026-01-29",
+            "status": "0", "site_status": "0", "blobId": SITE_BLOB_ID,
+        }, f)
+    with open(os.path.join(workdir, "firestore.json"), "w") as f:
+        json.dump({"showcase-data/reference": {"BlobID": SHOWCASE_BLOB_ID,
+                                               "ObjID": SHOWCASE_OBJECT_ID}}, f)
+    return run_dir
+
+
+def bench_env(workdir, args):
+    env = dict(os.environ)
+    env.pop("SUI_KEYSTORE_CONTENT", None)
+    env.pop("JOB_METRICS_FILE", None)
+    env.update({
+        "PATH": FAKEBIN_DIR + os.pathsep + env.get("PATH", ""),
+        "PYTHONPATH": STUBS_DIR,
+        "BENCH_STORE": os.path.join(workdir, "store"),
+        "BENCH_FIRESTORE": os.path.join(workdir, "firestore.json"),
+        "BENCH_WALRUS_LATENCY": str(args.walrus_latency),
+        "BENCH_WALRUS_SECONDS_PER_MIB": str(args.walrus_seconds_per_mib),
+        "BENCH_SITE_BUILDER_LATENCY": str(args.site_builder_latency),
+        "BENCH_SITE_BUILDER_SECONDS_PER_FILE": str(args.site_builder_seconds_per_file),
+        "JOB_METRICS_LOG": "1",
+    })
+    return env
+
+
+def run_operation(run_dir, env, operation, object_id, cold):
+    if cold:
+        for cache in (".showcase-cache", ".content-store"):
+            shutil.rmtree(os.path.join(run_dir, cache), ignore_errors=True)
+
+    command = [sys.executable, os.path.join(APP_DIR, "main.py"), operation]
+    if object_id:
+        command.append(object_id)
+    started = time.monotonic()
+    result = subprocess.run(command, cwd=run_dir, env=env, capture_output=True, text=True)
+    wall = time.monotonic() - started
+
+    steps = []
+    errors = []
+    for line in result.stdout.splitlines():
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("metric") == "job_step":
+                steps.append(record)
+        elif line.startswith("❌"):
+            errors.append(line)
+    if result.returncode:
+        errors.append(result.stderr.strip())
+    return {"operation": operation, "wall_seconds": wall, "steps": steps, "errors": errors}
+
+
+def bench_size(sites, args):
+    workdir = tempfile.mkdtemp(prefix=f"ivory-bench-{sites}-", dir=args.workdir)
+    try:
+        print(f"🔹 Preparing showcase with {sites} sites in {workdir}", file=sys.stderr)
+        run_dir = prepare(workdir, sites)
+        env = bench_env(workdir, args)
+        runs = []
+        for operation, object_id in OPERATIONS:
+            run = run_operation(run_dir, env, operation, object_id, args.cold)
+            print(f"   {operation}: {run['wall_seconds']:.2f}s"
+                  + (f" ({len(run['errors'])} error(s))" if run["errors"] else ""), file=sys.stderr)
+            for error in run["errors"]:
+                print(f"      {error}", file=sys.stderr)
+            runs.append(run)
+        return runs
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(results, sizes):
+    # ตาราง wall time ของแต่ละ step ต่อขนาด showcase และอัตราโตจากขนาดเล็กสุดถึงใหญ่สุด
+    for index, (operation, _) in enumerate(OPERATIONS):
+        rows = {}
+        for sites in sizes:
+            run = results[sites][index]
+            for record in run["steps"]:
+                key = f"{record['operation']}:{record['step']}"
+                values = rows.setdefault(key, {})
+                values[sites] = values.get(sites, 0) + record["wall_seconds"]
+            rows.setdefault("process", {})[sites] = run["wall_seconds"]
+
+        print(f"\n## {operation}")
+        header = f"{'step':<40}" + "".join(f"{str(sites) + ' sites':>14}" for sites in sizes) + f"{'growth':>10}"
+        print(header)
+        print("-" * len(header))
+        for key, values in rows.items():
+            cells = "".join(f"{values[sites]:>13.3f}s" if sites in values else f"{'-':>14}"
+                            for sites in sizes)
+            first, last = values.get(sizes[0]), values.get(sizes[-1])
+            growth = f"{last / first:>9.1f}x" if first and last and len(sizes) > 1 else f"{'-':>10}"
+            print(f"{key:<40}{cells}{growth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVORY Job operations against fake walrus/site-builder.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="number of sites in the synthetic showcase")
+    parser.add_argument("--walrus-latency", type=float, default=0.0,
+                        help="seconds added to every walrus command")
+    parser.add_argument("--walrus-seconds-per-mib", type=float, default=0.0,
+                        help="seconds per MiB read or stored")
+    parser.add_argument("--site-builder-latency", type=float, default=0.0,
+                        help="seconds added to every site-builder command")
+    parser.add_argument("--site-builder-seconds-per-file", type=float, default=0.0,
+                        help="seconds per file in a published/updated site")
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the showcase cache and content store before every operation")
+    parser.add_argument("--workdir", default=None, help="parent directory for benchmark workspaces")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark workspaces")
+    parser.add_argument("--json", dest="json_path", help="write raw step records to this file")
+    args = parser.parse_args()
+
+    results = {sites: bench_size(sites, args) for sites in args.sizes}
+    report(results, args.sizes)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({str(sites): runs for sites, runs in results.items()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Firestore จำลองสำหรับ benchmark: เก็บ document ทั้งหมดเป็น JSON ไฟล์เดียว (BENCH_FIRESTORE)
+import fcntl
+import json
+import os
+import threading
+
+STORE = os.environ.get("BENCH_FIRESTORE", "firestore.json")
+_lock = threading.Lock()
+
+
+def _load():
+    try:
+        with open(STORE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save(data):
+    tmp_path = STORE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, STORE)
+
+
+class DocumentSnapshot:
+    def __init__(self, id, data):
+        self.id = id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data is not None else None
+
+
+class DocumentReference:
+    def __init__(self, collection, id):
+        self.id = id
+        self.path = f"{collection}/{id}"
+
+    def get(self, transaction=None):
+        with _lock:
+            return DocumentSnapshot(self.id, _load().get(self.path))
+
+    def set(self, data, merge=False):
+        with _lock:
+            documents = _load()
+            if merge and self.path in documents:
+                documents[self.path].update(data)
+            else:
+                documents[self.path] = dict(data)
+            _save(documents)
+
+    def update(self, data):
+        with _lock:
+            documents = _load()
+            if self.path not in documents:
+                raise KeyError(f"No document to update: {self.path}")
+            documents[self.path].update(data)
+            _save(documents)
+
+    def delete(self):
+        with _lock:
+            documents = _load()
+            documents.pop(self.path, None)
+            _save(documents)
+
+
+class CollectionReference:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, id):
+        return DocumentReference(self.name, id)
+
+    def stream(self):
+        prefix = self.name + "/"
+        with _lock:
+            documents = _load()
+        return [DocumentSnapshot(path[len(prefix):], data) for path, data in documents.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]]
+
+
+class Client:
+    def collection(self, name):
+        return CollectionReference(name)
+
+    def transaction(self):
+        return Transaction()
+
+
+class Transaction:
+    def __init__(self):
+        self._writes = []
+
+    def update(self, reference, data):
+        self._writes.append((reference.update, data))
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((lambda values: reference.set(values, merge=merge), data))
+
+
+def transactional(func):
+    # อ่านและเขียนทั้งหมดภายใต้ lock ของไฟล์ (กัน process อื่นที่รันพร้อมกัน)
+    def run(transaction, *args, **kwargs):
+        with open(STORE + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                result = func(transaction, *args, **kwargs)
+                for write, data in transaction._writes:
+                    write(data)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return run
@@ -369,7 +369,7 @@ export const PreviewSummary: React.FC<PreviewSummaryProps> = ({
                     values={{
                       showcaseUrl: (
                         <Link
-                          to={`https://kursui.wal.app/${projectShowcaseUrl}/index.html`}
+                          to={projectShowcaseUrl ?? ''}
                           className="font-medium underline underline-offset-2 hover:text-green-600 transition-colors duration-300"
                         >
                           Click here to view
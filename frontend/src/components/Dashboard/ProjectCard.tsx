@@ -54,6 +54,7 @@ import axios from 'axios'
 import { FormattedMessage, useIntl } from 'react-intl';
 import { ProjectCardProps } from '@/types/project'
 import { linkSuinsToSite } from '@/utils/suinsUtils'
+import { getShowcaseUrl } from '@/utils/metadataUtils'
 
 const formatDate = (date: Date) => {
   return date.toLocaleDateString('en-GB', {
@@ -782,15 +783,15 @@ const ProjectCard = memo(
                   </a>
                 ) : project.showcase_url ? (
                   <a
-                    href={`https://kursui.wal.app/${project.showcase_url}/index.html`}
+                    href={getShowcaseUrl(project.showcase_url, project.showcase_base_url)}
                     target="_blank"
                     rel="noopener noreferrer"
                     className="flex items-center h-[24px] hover:underline transition-colors duration-200 text-secondary-200/80 hover:text-secondary-100/90 max-w-[340px] cursor-pointer"
-                    title={`https://kursui.wal.app/${project.showcase_url}/index.html`}
+                    title={getShowcaseUrl(project.showcase_url, project.showcase_base_url)}
                   >
                     <span className="flex-shrink-0">https://</span>
                     <span className="truncate" style={{ minWidth: 0 }}>
-                      kursui.wal.app/{project.showcase_url}/index.html
+                      {getShowcaseUrl(project.showcase_url, project.showcase_base_url).replace(/^https:\/\//, '')}
                     </span>
                     <span className="ml-1 group-hover:translate-x-0.5 transition-transform duration-200">
                       <ExternalLink className="h-4 w-4 flex-shrink-0" />
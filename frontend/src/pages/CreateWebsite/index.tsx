@@ -44,7 +44,7 @@ import HelpCenter from '@/components/CreateWebsite/HelpCenter'
 import { FileItem } from '@/components/CreateWebsite/FileUploadPreview'
 import JSZip from 'jszip'
 import { useSuiData } from '@/hooks/useSuiData'
-import { transformMetadataToProject } from '@/utils/metadataUtils'
+import { getShowcaseUrl, transformMetadataToProject } from '@/utils/metadataUtils'
 import { Project } from '@/types/project'
 import { useAuth } from '@/context/AuthContext'
 import Loading from '@/components/Loading'
@@ -619,7 +619,7 @@ export default function CreateWebsitePage() {
             const project = firstProject as Project;
             if (project.showcase_url) {
               setBuildingState(BuildingState.Built);
-              setProjectShowcaseUrl(project.showcase_url);
+              setProjectShowcaseUrl(getShowcaseUrl(project.showcase_url, project.showcase_base_url));
               return true;
             }
           } else if (firstProject.status === 2) {
@@ -20,6 +20,7 @@ export interface Project {
   client_error_description?: string
   parentId?: string
   showcase_url?: string
+  showcase_base_url?: string
   site_status?: number
 }
 
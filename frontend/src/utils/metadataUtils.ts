@@ -1,5 +1,8 @@
 import { DEFAULT_EXPIRY_BUFFER } from '@/constants/time'
 
+// Single showcase site used when a project has no showcase_base_url
+export const DEFAULT_SHOWCASE_BASE_URL = 'https://kursui.wal.app'
+
 interface MetadataMap {
   [key: string]: string
 }
@@ -76,7 +79,11 @@ export const transformMetadataToProject = (metadata: any, index: number) => {
     parentId: metadata.parentId || '',
     client_error_description: metadataMap['client_error_description'] || '',
     showcase_url: metadataMap['showcase_url'] || '',
+    showcase_base_url: metadataMap['showcase_base_url'] || '',
     ...(metadataMap['site_status'] ? { site_status: parseInt(metadataMap['site_status']) } : {}),
   }
   return project
-} 
\ No newline at end of file
+} 
+// A sharded showcase serves each shard from its own site (showcase_base_url)
+export const getShowcaseUrl = (showcaseUrl: string, showcaseBaseUrl?: string) =>
+  `${showcaseBaseUrl || DEFAULT_SHOWCASE_BASE_URL}/${showcaseUrl}/index.html`